@@ -1,5 +1,34 @@
-from .core import Frameko
-from .config import FramekoConfig
+from __future__ import annotations
 
-__all__ = ["Frameko", "FramekoConfig"]
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .config import FramekoConfig
+    from .core import ExtractedFrame, Frameko, IngestResult
+
+__all__ = ["Frameko", "FramekoConfig", "ExtractedFrame", "IngestResult"]
 __version__ = "0.1.0"
+
+# `import frameko` stays cheap (CLI start-up, short-lived workers): the pipeline
+# and its NumPy/Pillow imports load on first access to one of these names
+_LAZY = {
+    "Frameko": ".core",
+    "ExtractedFrame": ".core",
+    "IngestResult": ".core",
+    "FramekoConfig": ".config",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + list(_LAZY))
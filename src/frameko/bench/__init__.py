@@ -0,0 +1,27 @@
+"""Reproducible benchmarks on synthetic videos (`frameko bench`)."""
+
+from .runner import (
+    IMPORT_BUDGETS_MS,
+    Regression,
+    bench_video,
+    compare,
+    measure_imports,
+    over_budget,
+    run_bench,
+)
+from .videos import SUITES, Segment, VideoSpec, ensure_video, suite
+
+__all__ = [
+    "IMPORT_BUDGETS_MS",
+    "SUITES",
+    "Regression",
+    "Segment",
+    "VideoSpec",
+    "bench_video",
+    "compare",
+    "ensure_video",
+    "measure_imports",
+    "over_budget",
+    "run_bench",
+    "suite",
+]
@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import os
+import platform
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+from .. import __version__
+from ..config import FramekoConfig
+from ..pipelines.dedup import dhash_batch, greedy_dedup
+from ..pipelines.image import load_gray
+from ..pipelines.quality import variance_of_laplacian
+from ..pipelines.sampling import sample_every_seconds, sample_timestamps
+from ..scenes.ffmpeg_scenes import detect_scenes_ffmpeg
+from ..scenes.scenedetect_adapter import detect_scenes
+from ..video.extract import extract_frame
+from ..errors import FramekoError
+from ..video.ffmpeg import ffmpeg_capabilities, probe_video
+from .videos import VideoSpec, ensure_video, expected_cuts
+
+SCHEMA = 1
+
+# Start-up budgets: milliseconds a fresh interpreter spends importing each module
+# on top of a bare `python -c pass`. `frameko bench` fails when one is exceeded.
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    "frameko": 25.0,
+    "frameko.config": 40.0,
+    "frameko.cli": 40.0,
+    "frameko.core": 400.0,
+}
+
+# Dependencies reported as loaded (or not) by each import
+_HEAVY = ("numpy", "PIL", "yaml", "asyncio", "multiprocessing", "scenedetect", "cv2")
+
+
+def _reset_peak_rss() -> None:
+    """Reset the kernel's peak-RSS mark (Linux); elsewhere peaks only grow."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _children_peak_rss_mb() -> Optional[float]:
+    """Largest RSS of any finished subprocess (ffmpeg/ffprobe) so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _tree_size(root: Path) -> Tuple[int, int]:
+    files = size = 0
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(dirpath, name))
+    return files, size
+
+
+@dataclass
+class StageResult:
+    wall_sec: float  # median over repeats
+    items: int
+    peak_rss_mb: Optional[float]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_sec": round(self.wall_sec, 6),
+            "items": self.items,
+            "items_per_sec": round(self.items / self.wall_sec, 3) if self.wall_sec > 0 else None,
+            "peak_rss_mb": None if self.peak_rss_mb is None else round(self.peak_rss_mb, 1),
+        }
+
+
+def _measure(fn: Callable[[int], Tuple[int, Any]], repeat: int) -> Tuple[StageResult, Any]:
+    """Run `fn(attempt) -> (items, value)` `repeat` times; wall time is the median.
+    Returns the last value."""
+    walls: List[float] = []
+    peak: Optional[float] = None
+    items, value = 0, None
+    for attempt in range(max(1, int(repeat))):
+        _reset_peak_rss()
+        t0 = time.perf_counter()
+        items, value = fn(attempt)
+        walls.append(time.perf_counter() - t0)
+        rss = _peak_rss_mb()
+        if rss is not None:
+            peak = rss if peak is None else max(peak, rss)
+    return StageResult(statistics.median(walls), items, peak), value
+
+
+def _per_call(
+    fn: Callable[[], List[Any]], min_sec: float = 0.05
+) -> Callable[[int], Tuple[int, Any]]:
+    """Wrap a stage too quick to time once: call it until `min_sec` has passed and
+    return `(items, (calls, result))`."""
+
+    def go(_: int) -> Tuple[int, Any]:
+        calls, t0 = 0, time.perf_counter()
+        while True:
+            out = fn()
+            calls += 1
+            if time.perf_counter() - t0 >= min_sec:
+                return len(out), (calls, out)
+
+    return go
+
+
+def bench_video(
+    spec: VideoSpec,
+    work_dir: Path,
+    *,
+    repeat: int = 3,
+    preset: str = "default",
+    max_extract: int = 24,
+    keep: bool = False,
+) -> Dict[str, Any]:
+    """Time every pipeline stage and a full `ingest` on one synthetic video."""
+    from ..core import Frameko
+
+    work_dir = Path(work_dir)
+    video = ensure_video(spec, work_dir / "videos")
+    run_root = work_dir / "runs" / f"{spec.name}-{spec.key()}"
+    cfg = FramekoConfig.load_preset(preset)
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    def stage(name: str, fn: Callable[[int], Tuple[int, Any]]) -> Any:
+        res, value = _measure(fn, repeat)
+        stages[name] = res.to_dict()
+        return value
+
+    info = stage("probe_video", lambda _: (1, probe_video(video)))
+    duration = float(info.get("duration") or spec.duration)
+    fps = info.get("fps")
+
+    # Scene detection: PySceneDetect (returns nothing when it is not installed) and ffmpeg
+    expected = len(expected_cuts(spec)) + 1
+    detector = cfg.scene_detector if cfg.scene_detector in ("adaptive", "content") else "adaptive"
+    threshold, min_len = float(cfg.scene_threshold), int(cfg.min_scene_len_frames)
+
+    def detect(_: int) -> Tuple[int, Any]:
+        found = detect_scenes(video, detector, threshold, min_len)
+        return len(found), found
+
+    def detect_ffmpeg(_: int) -> Tuple[int, Any]:
+        found = detect_scenes_ffmpeg(video, threshold, min_len, duration=duration, fps=fps)
+        return len(found), found
+
+    scenes = [(float(a), float(b)) for a, b in stage("detect_scenes", detect)]
+    scenes_ff = [(float(a), float(b)) for a, b in stage("detect_scenes_ffmpeg", detect_ffmpeg)]
+    stages["detect_scenes"]["expected_scenes"] = expected
+    stages["detect_scenes_ffmpeg"]["expected_scenes"] = expected
+    scenes = scenes or scenes_ff
+
+    # Sampling is pure Python; report the time of one call
+    per_scene = int(cfg.frames_per_scene)
+    sampled = {
+        "sample_timestamps": stage(
+            "sample_timestamps", _per_call(lambda: sample_timestamps(scenes, per_scene))
+        ),
+        "sample_every_seconds": stage(
+            "sample_every_seconds",
+            _per_call(lambda: sample_every_seconds(duration=duration, every_sec=0.5)),
+        ),
+    }
+    for name, (calls, _) in sampled.items():
+        stages[name]["wall_sec"] = round(stages[name]["wall_sec"] / calls, 9)
+        stages[name]["items_per_sec"] = None
+        stages[name]["calls"] = calls
+    times = [t for t, _ in sampled["sample_every_seconds"][1]][: max(1, int(max_extract))]
+
+    def extract(attempt: int) -> Tuple[int, Any]:
+        paths = []
+        for i, t in enumerate(times):
+            out = run_root / "extract" / f"{attempt}-{i:05d}.jpg"
+            extract_frame(video, t, out, jpeg_quality=int(cfg.jpeg_quality))
+            paths.append(out)
+        return len(paths), paths
+
+    grays = [load_gray(p) for p in stage("extract_frame", extract)]
+
+    def dedup(_: int) -> Tuple[int, Any]:
+        return len(grays), int(greedy_dedup(dhash_batch(grays), int(cfg.max_hamming)).sum())
+
+    def blur(_: int) -> Tuple[int, Any]:
+        return len(grays), [variance_of_laplacian(g) for g in grays]
+
+    kept = stage("dedup", dedup)
+    stages["dedup"]["kept"] = kept
+    stage("blur", blur)
+
+    def ingest(attempt: int) -> Tuple[int, Any]:
+        index_dir = run_root / f"ingest-{attempt}"
+        shutil.rmtree(index_dir, ignore_errors=True)
+        fk = Frameko(index_dir, config=FramekoConfig.from_dict(cfg.to_dict()))
+        try:
+            report = fk.ingest(video, refresh_cache=True, return_report=True)
+        finally:
+            fk.close()
+        files, size = _tree_size(index_dir)
+        return report.counters.get("frames_accepted", 0), {
+            "files_written": files,
+            "bytes_written": size,
+            "breakdown": {k: round(v, 6) for k, v in report.stages.items()},
+            "subprocesses": report.subprocesses,
+            "rejected": report.rejected,
+        }
+
+    written = stage("ingest", ingest)
+    stages["ingest"].update(written)
+    if not keep:
+        shutil.rmtree(run_root, ignore_errors=True)
+
+    return {
+        "name": spec.name,
+        "key": spec.key(),
+        "spec": spec.to_dict(),
+        "stages": stages,
+    }
+
+
+def _import_run(code: str) -> Tuple[float, List[str]]:
+    t0 = time.perf_counter()
+    p = subprocess.run(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    wall = time.perf_counter() - t0
+    if p.returncode != 0:
+        raise RuntimeError(f"python -c {code!r} failed: {p.stderr[-500:]}")
+    return wall, json.loads(p.stdout or "[]")
+
+
+def measure_imports(
+    modules: Sequence[str] = tuple(IMPORT_BUDGETS_MS), repeat: int = 5
+) -> Dict[str, Dict[str, Any]]:
+    """Cold import time of each module in a fresh interpreter, minus the
+    interpreter's own start-up (medians over `repeat` runs), and the heavy
+    dependencies each import pulled in."""
+    probe = f"import json, sys; print(json.dumps([m for m in {_HEAVY!r} if m in sys.modules]))"
+    runs = max(1, int(repeat))
+    base = statistics.median(_import_run(probe)[0] for _ in range(runs))
+    out: Dict[str, Dict[str, Any]] = {}
+    for mod in modules:
+        walls: List[float] = []
+        loaded: List[str] = []
+        for _ in range(runs):
+            wall, loaded = _import_run(f"import {mod}; {probe}")
+            walls.append(wall)
+        out[mod] = {
+            "import_ms": round(max(0.0, statistics.median(walls) - base) * 1000, 2),
+            "loads": loaded,
+            "budget_ms": IMPORT_BUDGETS_MS.get(mod),
+        }
+    return out
+
+
+def over_budget(imports: Dict[str, Dict[str, Any]]) -> List["Regression"]:
+    """Imports slower than their `budget_ms`."""
+    return [
+        Regression("imports", mod, "import_ms", r["budget_ms"], r["import_ms"])
+        for mod, r in imports.items()
+        if r.get("budget_ms") is not None and r["import_ms"] > r["budget_ms"]
+    ]
+
+
+def _ffmpeg_version() -> Optional[str]:
+    try:
+        caps = ffmpeg_capabilities()
+    except (OSError, RuntimeError, FramekoError):
+        return None
+    return caps.get("version")
+
+
+def run_bench(
+    specs: Sequence[VideoSpec],
+    *,
+    work_dir: Optional[Path] = None,
+    repeat: int = 3,
+    preset: str = "default",
+    keep: bool = False,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Benchmark every spec and return the JSON-ready report.
+
+    Videos are rendered once into `work_dir/videos` and reused by later runs that
+    pass the same `work_dir`; by default a temporary directory is used and removed.
+    Import times (`measure_imports`) are always part of the report.
+    """
+    if progress is not None:
+        progress("imports")
+    imports = measure_imports(repeat=max(3, int(repeat)))
+    tmp = None
+    if work_dir is None:
+        tmp = tempfile.mkdtemp(prefix="frameko-bench-")
+        work_dir = Path(tmp)
+    try:
+        videos = []
+        for spec in specs:
+            if progress is not None:
+                progress(spec.name)
+            videos.append(
+                bench_video(spec, Path(work_dir), repeat=repeat, preset=preset, keep=keep)
+            )
+    finally:
+        if tmp is not None and not keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "schema": SCHEMA,
+        "frameko_version": __version__,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "preset": preset,
+        "repeat": int(repeat),
+        "platform": {
+            "python": platform.python_version(),
+            "system": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": _ffmpeg_version(),
+        },
+        "children_peak_rss_mb": _children_peak_rss_mb(),
+        "imports": imports,
+        "videos": videos,
+    }
+
+
+@dataclass(frozen=True)
+class Regression:
+    video: str
+    stage: str
+    metric: str
+    baseline: Any
+    current: Any
+
+    def __str__(self) -> str:
+        if isinstance(self.baseline, (int, float)) and isinstance(self.current, (int, float)):
+            ratio = self.current / self.baseline if self.baseline else float("inf")
+            return (
+                f"{self.video}/{self.stage}: {self.metric} {self.baseline:g} -> "
+                f"{self.current:g} ({ratio:.2f}x)"
+            )
+        return f"{self.video}/{self.stage}: {self.metric} {self.baseline!r} -> {self.current!r}"
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    *,
+    tolerance: float = 0.25,
+    min_sec: float = 0.02,
+    min_rss_mb: float = 32.0,
+    min_import_ms: float = 10.0,
+) -> List[Regression]:
+    """Stages that got slower or hungrier than `baseline` allows.
+
+    A stage regresses when its wall time grows by more than `tolerance` (relative)
+    and `min_sec` (absolute, to ignore timer noise), or its peak RSS by more than
+    `tolerance` and `min_rss_mb`. Changes in frames or files produced by `ingest`
+    are reported too. Videos are matched by spec key, so a changed spec is
+    skipped rather than compared. Import times regress like stages, with
+    `min_import_ms` as the absolute margin.
+    """
+    out: List[Regression] = []
+    base_imports = baseline.get("imports", {})
+    for mod, cur in current.get("imports", {}).items():
+        b, c = base_imports.get(mod, {}).get("import_ms"), cur.get("import_ms")
+        if b is not None and c is not None and c > b * (1 + tolerance) and c - b > min_import_ms:
+            out.append(Regression("imports", mod, "import_ms", b, c))
+    base_videos = {v["key"]: v for v in baseline.get("videos", [])}
+    for video in current.get("videos", []):
+        base = base_videos.get(video["key"])
+        if base is None:
+            continue
+        for name, cur in video["stages"].items():
+            old = base["stages"].get(name)
+            if old is None:
+                continue
+            b, c = old.get("wall_sec"), cur.get("wall_sec")
+            if b is not None and c is not None and c > b * (1 + tolerance) and c - b > min_sec:
+                out.append(Regression(video["name"], name, "wall_sec", b, c))
+            b, c = old.get("peak_rss_mb"), cur.get("peak_rss_mb")
+            if b is not None and c is not None and c > b * (1 + tolerance) and c - b > min_rss_mb:
+                out.append(Regression(video["name"], name, "peak_rss_mb", b, c))
+            if name == "ingest":
+                for metric in ("items", "files_written"):
+                    b, c = old.get(metric), cur.get(metric)
+                    if b != c:
+                        out.append(Regression(video["name"], name, metric, b, c))
+    return out
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from ..video.ffmpeg import require_ffmpeg_features, run
+
+# Looks used for the cut segments, cycled in order. Consecutive segments always
+# differ, so every boundary is a hard cut.
+_LOOKS = (
+    "testsrc2",
+    "smptebars",
+    "testsrc",
+    "rgbtestsrc",
+    "yuvtestsrc",
+)
+# Every lavfi source and filter `build_command` may use
+_FILTERS = _LOOKS + ("gblur", "null", "format", "setsar", "concat")
+
+
+@dataclass(frozen=True)
+class Segment:
+    """One stretch of a synthetic video.
+
+    kind:
+      - "cut": the next look from `_LOOKS` (a hard cut from the previous segment)
+      - "blur": `testsrc2` under a strong Gaussian blur (fails the blur filter)
+      - "dup": an exact repeat of the first segment (removed by dedup)
+    """
+
+    kind: str
+    seconds: float
+
+
+@dataclass(frozen=True)
+class VideoSpec:
+    name: str
+    width: int
+    height: int
+    fps: int
+    gop: int  # keyframe interval in frames; scene-cut keyframes are disabled
+    segments: Tuple[Segment, ...] = field(default_factory=tuple)
+
+    @property
+    def duration(self) -> float:
+        return float(sum(s.seconds for s in self.segments))
+
+    def to_dict(self) -> Dict[str, object]:
+        d = asdict(self)
+        d["duration"] = self.duration
+        return d
+
+    def key(self) -> str:
+        """Stable id of the spec (and of the generator below) for file names and
+        for matching results against a baseline."""
+        blob = json.dumps({"spec": asdict(self), "v": 1}, sort_keys=True)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:12]
+
+
+def _segments(n_cuts: int, seconds: float, *, blur: int = 1, dup: int = 1) -> Tuple[Segment, ...]:
+    out = [Segment("cut", seconds) for _ in range(n_cuts)]
+    # Put blurred and duplicated stretches between cuts, not at the ends
+    for i in range(blur):
+        out.insert(1 + 2 * i, Segment("blur", seconds))
+    for i in range(dup):
+        out.insert(len(out) - 1 - i, Segment("dup", seconds))
+    return tuple(out)
+
+
+SUITES: Dict[str, List[VideoSpec]] = {
+    "quick": [
+        VideoSpec("180p-10s-gop12", 320, 180, 24, 12, _segments(3, 2.0)),
+        VideoSpec("360p-10s-gop250", 640, 360, 24, 250, _segments(3, 2.0)),
+    ],
+    "standard": [
+        VideoSpec("360p-30s-gop12", 640, 360, 30, 12, _segments(8, 3.0, blur=1, dup=1)),
+        VideoSpec("360p-30s-gop250", 640, 360, 30, 250, _segments(8, 3.0, blur=1, dup=1)),
+        VideoSpec("720p-30s-gop48", 1280, 720, 30, 48, _segments(8, 3.0, blur=1, dup=1)),
+        VideoSpec("1080p-20s-gop48", 1920, 1080, 30, 48, _segments(6, 2.5, blur=1, dup=1)),
+        VideoSpec("360p-120s-gop48", 640, 360, 30, 48, _segments(20, 5.0, blur=2, dup=2)),
+    ],
+}
+
+
+def _source(spec: VideoSpec, seg: Segment, look: str) -> str:
+    size = f"{spec.width}x{spec.height}"
+    return f"{look}=size={size}:rate={spec.fps}:duration={seg.seconds:g}"
+
+
+def build_command(spec: VideoSpec, out_path: Path) -> List[str]:
+    """ffmpeg command that renders `spec` from lavfi sources into an H.264 mp4."""
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error", "-y"]
+    graph: List[str] = []
+    looks = iter(_LOOKS * (len(spec.segments) // len(_LOOKS) + 1))
+    first = ""
+    for i, seg in enumerate(spec.segments):
+        if seg.kind == "cut":
+            look = next(looks)
+            first = first or look
+            src, post = _source(spec, seg, look), "null"
+        elif seg.kind == "blur":
+            src, post = _source(spec, seg, "testsrc2"), "gblur=sigma=12"
+        elif seg.kind == "dup":
+            src, post = _source(spec, seg, first or _LOOKS[0]), "null"
+        else:
+            raise ValueError(f"Unknown segment kind: {seg.kind}")
+        cmd += ["-f", "lavfi", "-i", src]
+        graph.append(f"[{i}:v]{post},format=yuv420p,setsar=1[v{i}]")
+    links = "".join(f"[v{i}]" for i in range(len(spec.segments)))
+    graph.append(f"{links}concat=n={len(spec.segments)}:v=1:a=0[out]")
+    cmd += ["-filter_complex", ";".join(graph), "-map", "[out]"]
+    cmd += ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p"]
+    cmd += ["-g", str(spec.gop), "-keyint_min", str(spec.gop), "-sc_threshold", "0"]
+    # Single-threaded encode + no metadata: the same spec yields the same bytes
+    cmd += ["-threads", "1", "-map_metadata", "-1", "-fflags", "+bitexact"]
+    cmd += ["-flags:v", "+bitexact", str(out_path)]
+    return cmd
+
+
+def ensure_video(spec: VideoSpec, video_dir: Path) -> Path:
+    """Render `spec` under `video_dir` unless it is already there."""
+    video_dir = Path(video_dir)
+    video_dir.mkdir(parents=True, exist_ok=True)
+    out = video_dir / f"{spec.name}-{spec.key()}.mp4"
+    if out.exists() and out.stat().st_size > 0:
+        return out
+    require_ffmpeg_features(
+        f"Rendering bench video {spec.name}", filters=_FILTERS, encoders=("libx264",)
+    )
+    tmp = out.with_name(f".tmp-{out.name}")
+    p = run(build_command(spec, tmp))
+    if p.returncode != 0 or not tmp.exists():
+        tmp.unlink(missing_ok=True)
+        raise RuntimeError(f"ffmpeg failed to render {spec.name}: {p.stderr[:500]}")
+    tmp.replace(out)
+    return out
+
+
+def expected_cuts(spec: VideoSpec) -> List[float]:
+    """Segment boundaries in seconds (every one is a visible cut)."""
+    out: List[float] = []
+    t = 0.0
+    for seg in spec.segments[:-1]:
+        t += seg.seconds
+        out.append(t)
+    return out
+
+
+def suite(name: str) -> Sequence[VideoSpec]:
+    if name not in SUITES:
+        raise ValueError(f"Unknown bench suite: {name} (known: {sorted(SUITES)})")
+    return SUITES[name]
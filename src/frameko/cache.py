@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+def fingerprint(
+    path: Union[str, Path], block_size: int = 1 << 20, include_mtime: bool = True
+) -> str:
+    """Cheap content fingerprint: file size (+ mtime) and hashes of the first and
+    last `block_size` bytes. Reads at most 2 * block_size bytes."""
+    path = Path(path)
+    st = path.stat()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(st.st_size).encode("ascii"))
+    if include_mtime:
+        h.update(b":" + str(st.st_mtime_ns).encode("ascii"))
+    with path.open("rb") as f:
+        h.update(f.read(block_size))
+        if st.st_size > block_size:
+            f.seek(max(block_size, st.st_size - block_size))
+            h.update(f.read(block_size))
+    return h.hexdigest()
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable key for JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class DiskCache:
+    """Tiny JSON file cache with LRU eviction.
+
+    Entries live at `<root>/<namespace>/<key>.json`. Reads refresh the entry's
+    mtime, and writes evict the least recently used entries once the cache holds
+    more than `max_bytes` or `max_entries`.
+    """
+
+    def __init__(
+        self, root: Union[str, Path], max_bytes: int = 256 << 20, max_entries: int = 10_000
+    ) -> None:
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.root / namespace / f"{key}.json"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        p = self._path(namespace, key)
+        try:
+            value = json.loads(p.read_text(encoding="utf-8"))
+            os.utime(p)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        p = self._path(namespace, key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=p.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp, p)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._evict()
+
+    def invalidate(self, namespace: Optional[str] = None, key: Optional[str] = None) -> None:
+        """Drop one entry, one namespace, or (no arguments) the whole cache."""
+        if namespace is not None and key is not None:
+            self._path(namespace, key).unlink(missing_ok=True)
+        elif namespace is not None:
+            shutil.rmtree(self.root / namespace, ignore_errors=True)
+        else:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for p in self.root.glob("*/*.json"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+            if total <= self.max_bytes and len(entries) <= self.max_entries:
+                return
+            entries.sort()
+            count = len(entries)
+            for _, size, p in entries:
+                if total <= self.max_bytes and count <= self.max_entries:
+                    break
+                p.unlink(missing_ok=True)
+                total -= size
+                count -= 1
+
+    def stats(self) -> Dict[str, int]:
+        files = list(self.root.glob("*/*.json"))
+        return {"entries": len(files), "bytes": sum(p.stat().st_size for p in files)}
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, TextIO, Tuple
+
+
+def checkpoint_path(index_dir: Path, video_id: str) -> Path:
+    return Path(index_dir) / "checkpoints" / f"{video_id}.json"
+
+
+def load_checkpoint(index_dir: Path, video_id: str) -> Optional[Dict[str, Any]]:
+    """Ingest progress for a video, or None if it was never started."""
+    try:
+        data = json.loads(checkpoint_path(index_dir, video_id).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def save_checkpoint(
+    index_dir: Path, video_id: str, *, next_index: int, total: int, done: bool = False
+) -> None:
+    """Atomically record that every candidate before `next_index` is handled."""
+    p = checkpoint_path(index_dir, video_id)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "video_id": video_id,
+        "next_index": int(next_index),
+        "total": int(total),
+        "done": bool(done),
+        "updated_at": time.time(),
+    }
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=p.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, p)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class DedupLog:
+    """Hashes a video added to its dedup index, by position, appended as it goes.
+
+    Frames that pass dedup but fail a later check (blur, luma, ...) are not
+    recorded anywhere else, yet later frames are still compared with them. On
+    resume the entries before the checkpoint are replayed into the index, so the
+    resumed run keeps the same frames as an uninterrupted one. Call `flush`
+    before saving a checkpoint that covers the entries added so far.
+    """
+
+    def __init__(self, index_dir: Path, video_id: str) -> None:
+        self.path = Path(index_dir) / "checkpoints" / f"{video_id}.dedup.jsonl"
+        self._f: Optional[TextIO] = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def replay(self, before: int) -> List[Tuple[int, int]]:
+        """`(position, hash)` entries for positions before `before`, in the order
+        they were added. Later entries are dropped from the file."""
+        entries: List[Tuple[int, int]] = []
+        if self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                try:
+                    pos, h = json.loads(line)
+                except ValueError:
+                    continue  # torn final line of an interrupted run
+                if int(pos) < before:
+                    entries.append((int(pos), int(h)))
+        self.reset(entries)
+        return entries
+
+    def reset(self, entries: Sequence[Tuple[int, int]] = ()) -> None:
+        """Replace the log with `entries`."""
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(f"[{pos}, {h}]\n" for pos, h in entries)
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def add(self, pos: int, h: int) -> None:
+        if self._f is None:
+            self._f = self.path.open("a", encoding="utf-8")
+        self._f.write(f"[{int(pos)}, {int(h)}]\n")
+
+    def flush(self) -> None:
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def remove(self) -> None:
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+
+def _cmd_bench(args: argparse.Namespace) -> int:
+    from .bench import compare, over_budget, run_bench, suite
+
+    def progress(name: str) -> None:
+        print(f"bench: {name}", file=sys.stderr)
+
+    report = run_bench(
+        [] if args.imports_only else suite(args.suite),
+        work_dir=Path(args.work_dir) if args.work_dir else None,
+        repeat=args.repeat,
+        preset=args.preset,
+        keep=args.keep,
+        progress=progress,
+    )
+    report["suite"] = args.suite
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    for mod, imp in report["imports"].items():
+        budget = f" (budget {imp['budget_ms']:g} ms)" if imp.get("budget_ms") else ""
+        print(f"{'imports':>18} {mod:<22} {imp['import_ms']:>10.2f}ms{budget}", file=sys.stderr)
+    for video in report["videos"]:
+        for name, st in video["stages"].items():
+            rate = st.get("items_per_sec")
+            print(
+                f"{video['name']:>18} {name:<22} {st['wall_sec']:>12.6f}s"
+                + (f" {rate:>9.1f}/s" if rate else "")
+                + (f" {st['peak_rss_mb']:>7.1f} MB" if st.get("peak_rss_mb") else ""),
+                file=sys.stderr,
+            )
+
+    regressions = over_budget(report["imports"])
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions += compare(report, baseline, tolerance=args.tolerance)
+    elif not regressions:
+        return 0
+    for r in regressions:
+        print(f"REGRESSION {r}", file=sys.stderr)
+    if not regressions:
+        print(f"bench: no regressions against {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def _load_config(args: argparse.Namespace):
+    from .config import FramekoConfig
+
+    if getattr(args, "config", None):
+        data = json.loads(Path(args.config).read_text(encoding="utf-8"))
+        return FramekoConfig.from_dict(data)
+    return FramekoConfig.load_preset(args.preset)
+
+
+def _cmd_worker(args: argparse.Namespace) -> int:
+    from .distributed import read_manifest, run_worker
+
+    def progress(res) -> None:
+        status = f"{res.n_frames} frames" if res.ok else f"FAILED {res.error}"
+        print(f"worker: {res.video_path}: {status} ({res.elapsed_sec:.1f}s)", file=sys.stderr)
+
+    results = run_worker(
+        args.root,
+        read_manifest(args.manifest),
+        worker_id=args.worker_id,
+        config=_load_config(args),
+        lease_ttl_sec=args.lease_ttl,
+        max_videos=args.max_videos,
+        retry_failed=args.retry_failed,
+        progress=progress,
+        max_workers=args.max_workers,
+    )
+    failed = sum(1 for r in results if not r.ok)
+    print(f"worker: {len(results) - failed} ingested, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _cmd_merge(args: argparse.Namespace) -> int:
+    from .distributed import merge_indexes, worker_dirs
+
+    sources = [Path(s) for s in args.sources]
+    if args.root:
+        sources = worker_dirs(args.root) + sources
+    if not sources:
+        print("merge: no source indexes", file=sys.stderr)
+        return 2
+    config = _load_config(args) if args.config else None
+    res = merge_indexes(sources, args.out, dedup=args.dedup, config=config, link=args.link)
+    print(
+        f"merge: {res.videos} videos, {res.frames} frames, {res.duplicates} duplicates "
+        f"dropped, {res.skipped} videos skipped",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="frameko")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    bench = sub.add_parser(
+        "bench",
+        help="benchmark the pipeline on synthetic videos",
+        description=(
+            "Render deterministic synthetic videos with ffmpeg (lavfi), time every "
+            "stage and a full ingest, and print a JSON report with cold import times. "
+            "Exit with status 1 when an import exceeds its budget or, with --baseline, "
+            "when a stage regressed."
+        ),
+    )
+    bench.add_argument("--suite", default="quick", help="quick (default) or standard")
+    bench.add_argument("--repeat", type=int, default=3, help="runs per stage (median is kept)")
+    bench.add_argument("--preset", default="default", help="config preset used for ingest")
+    bench.add_argument("--work-dir", help="where videos are rendered and reused between runs")
+    bench.add_argument("--keep", action="store_true", help="keep extracted frames and indexes")
+    bench.add_argument(
+        "--imports-only", action="store_true", help="only measure import times (no videos)"
+    )
+    bench.add_argument("--out", help="write the JSON report here instead of stdout")
+    bench.add_argument("--baseline", help="earlier JSON report to compare against")
+    bench.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown before a stage counts as regressed (default 0.25)",
+    )
+    bench.set_defaults(func=_cmd_bench)
+
+    worker = sub.add_parser(
+        "worker",
+        help="ingest videos from a manifest alongside other workers",
+        description=(
+            "Claim videos listed in MANIFEST through lease files under ROOT/leases and "
+            "ingest them into ROOT/workers/<worker-id>. Start any number of workers, on "
+            "any machine sharing ROOT, then combine their output with `frameko merge`."
+        ),
+    )
+    worker.add_argument("root", help="shared directory for leases and worker indexes")
+    worker.add_argument("manifest", help="text file with one video path per line")
+    worker.add_argument("--worker-id", help="stable id for resuming (default: host-pid)")
+    worker.add_argument("--preset", default="default", help="config preset (default: default)")
+    worker.add_argument("--config", help="JSON config file (overrides --preset)")
+    worker.add_argument(
+        "--lease-ttl",
+        type=float,
+        default=600.0,
+        help="seconds without a heartbeat before another worker takes a video over",
+    )
+    worker.add_argument("--max-videos", type=int, help="stop after this many videos")
+    worker.add_argument("--max-workers", type=int, help="extraction/scoring threads per video")
+    worker.add_argument("--retry-failed", action="store_true", help="retry videos marked failed")
+    worker.set_defaults(func=_cmd_worker)
+
+    merge = sub.add_parser(
+        "merge",
+        help="merge worker indexes into one",
+        description=(
+            "Copy the finished videos of every worker index (and any extra SOURCES) into "
+            "one index sorted by video id. Running it again adds only new videos."
+        ),
+    )
+    merge.add_argument("sources", nargs="*", help="index directories to merge")
+    merge.add_argument("--root", help="merge every index under ROOT/workers")
+    merge.add_argument("--out", required=True, help="destination index directory")
+    merge.add_argument("--dedup", action="store_true", help="drop near-duplicates across videos")
+    merge.add_argument("--config", help="JSON config for the destination (default: first source's)")
+    merge.add_argument("--link", action="store_true", help="hard-link frame files, don't copy")
+    merge.set_defaults(func=_cmd_merge)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return int(args.func(args))
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import contextvars
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def ordered_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int = 1,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[R]:
+    """Apply `fn` to `items` on a thread pool, yielding results in input order.
+
+    At most `max_in_flight` tasks (default 2 * max_workers) are queued at a time, so
+    `items` can be a lazy stream of large objects. `max_workers <= 1` runs inline.
+    Tasks run in a copy of the caller's context, so context variables (such as
+    the active ingest recorder) carry over to the worker threads.
+    """
+    if max_workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    limit = max(1, int(max_in_flight or 2 * max_workers))
+    pending: Deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="frameko") as pool:
+        try:
+            for item in items:
+                pending.append(pool.submit(contextvars.copy_context().run, fn, item))
+                if len(pending) >= limit:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for fut in pending:
+                fut.cancel()
@@ -5,7 +5,8 @@ from pathlib import Path
 from typing import Any, Dict, Optional
 
 import json
-import yaml
+import os
+import tempfile
 
 from .errors import ConfigError
 
@@ -13,9 +14,13 @@ from .errors import ConfigError
 @dataclass
 class FramekoConfig:
     # Scene detection
-    scene_detector: str = "adaptive"  # "adaptive" | "content" | "none"
+    scene_detector: str = "adaptive"  # "adaptive" | "content" | "ffmpeg" | "none"
     scene_threshold: float = 27.0
     min_scene_len_frames: int = 15
+    ffmpeg_scene_width: int = 320  # decode width for the "ffmpeg" detector
+    scene_chunk_sec: Optional[float] = None  # detect in parallel windows of this length
+    scene_chunk_overlap_sec: float = 5.0
+    scene_workers: Optional[int] = None  # processes for chunked detection (default: CPUs)
 
     # Sampling
     frames_per_scene: int = 1  # 1 or 3
@@ -26,20 +31,86 @@ class FramekoConfig:
     enable_dedup: bool = True
     dhash_size: int = 8
     max_hamming: int = 6
+    dedup_scope: str = "video"  # "video" | "run" | "global" (persisted under index_dir/dedup)
 
     # Blur filter
     enable_blur_filter: bool = False
     blur_var_threshold: float = 80.0
 
+    # Extra quality rules, computed in the same pass as dHash/blur
+    enable_luma_filter: bool = False  # reject black/white frames
+    min_mean_luma: float = 16.0
+    max_mean_luma: float = 240.0
+    enable_contrast_filter: bool = False
+    min_contrast: float = 10.0  # RMS contrast (std of luma, 0..255)
+    enable_uniform_filter: bool = False
+    max_uniform_frac: float = 0.95  # share of pixels with |Laplacian| <= uniform_tol
+    uniform_tol: float = 2.0
+
+    # Record every sampled frame's scores and filter outcome so `Frameko.refilter`
+    # can re-tune dedup/blur without decoding again
+    record_candidates: bool = False
+
+    # Low-resolution prefilter: dedup/blur on a small gray decode, full-res extraction
+    # only for survivors
+    prefilter: bool = False
+    prefilter_width: int = 160
+    prefilter_blur_var_threshold: Optional[float] = None  # None = calibrate per video
+    prefilter_calibration_frames: int = 12
+
     # Extraction
     image_format: str = "jpg"
     jpeg_quality: int = 2
-
-    sampling_mode: str = "scene"   # "scene" | "seconds"
+    extract_strategy: str = "auto"  # "auto" | "single_pass" | "seek" | "gop" | "keyframes"
+    keyframe_snap: str = "off"  # "off" | "snap" (within keyframe_tolerance_sec) | "only"
+    keyframe_tolerance_sec: float = 0.5
+    ingest_mode: str = "files"  # "files" | "pipe" (raw frames in memory, encode survivors only)
+    encoder_workers: int = 4
+    max_workers: int = 1  # threads for extraction + per-frame scoring
+    checkpoint_every: int = 25  # candidate frames between resume checkpoints
+    extract_batch: int = 200  # "files" mode: frames per extraction batch (checkpointed)
+
+    # Output: "files" (one image per frame) | "tar" (WebDataset shards) | "npy" (uint8 arrays)
+    output_format: str = "files"
+    frames_fanout: int = 0  # hashed subdirectory levels under frames/ ("files")
+    shard_size: int = 1000  # frames per tar/npy shard
+    shard_width: Optional[int] = None  # npy frame size (default: decoded size)
+    shard_height: Optional[int] = None
+
+    sampling_mode: str = "scene"   # "scene" | "seconds" | "adaptive"
     every_sec: float = 1.0
     start_sec: float = 0.0
     end_sec: Optional[float] = None
 
+    # Adaptive sampling: a low-res decode at adaptive_signal_fps scores how much each
+    # frame changes, and the frames go where it changes most
+    adaptive_budget: Optional[int] = None  # frames to spend; None: as many as "seconds" takes
+    adaptive_signal: str = "diff"  # "diff" (mean luma difference) | "dhash" (hash distance)
+    adaptive_signal_fps: float = 4.0
+    adaptive_signal_width: int = 64
+    adaptive_threshold: Optional[float] = None  # change ignored as noise (None: per signal)
+    adaptive_min_gap_sec: float = 0.5
+    adaptive_max_gap_sec: Optional[float] = 30.0  # longest stretch without a frame
+
+    # Embeddings: None (off) | "color_gradient" (CPU, no download); vectors go to the
+    # vector index under index_dir/vectors/<embedder>/
+    embedder: Optional[str] = None
+    embed_batch_size: int = 64
+    embed_workers: int = 4  # threads prefetching decoded frames for the embedder
+    vector_dtype: str = "float32"  # "float32" | "float16" (half the disk and page cache)
+
+    # Frame/video metadata: "jsonl" (videos.jsonl + frames.jsonl) | "sqlite" (metadata.sqlite)
+    metadata_backend: str = "jsonl"
+    metadata_batch_size: int = 256  # records buffered before a write
+
+    # Per-stage timings and counters for every ingest (`fk.last_report`, and a `report`
+    # field on the video's record); off costs one context-variable lookup per probe point
+    ingest_report: bool = False
+
+    # Probe/scene-detection cache under index_dir/cache
+    enable_cache: bool = True
+    cache_max_mb: float = 256.0
+
     extra: Dict[str, Any] = field(default_factory=dict)
 
     @staticmethod
@@ -51,6 +122,8 @@ class FramekoConfig:
         p = cls.presets_dir() / f"{name}.yaml"
         if not p.exists():
             raise ConfigError(f"Preset not found: {name} ({p})")
+        import yaml  # only presets need it
+
         data = yaml.safe_load(p.read_text(encoding="utf-8")) or {}
         if not isinstance(data, dict):
             raise ConfigError("Preset YAML must be a mapping")
@@ -70,5 +143,25 @@ class FramekoConfig:
         d = {k: getattr(self, k) for k in self.__dataclass_fields__.keys()}  # type: ignore[attr-defined]
         return d
 
-    def save_json(self, path: Path) -> None:
-        path.write_text(json.dumps(self.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
+    def save_json(self, path: Path) -> bool:
+        """Write the config to `path` unless the file already holds it.
+
+        Returns whether the file was written. The write goes through a temporary
+        file, so processes sharing an index never read a half-written config.
+        """
+        text = json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+        path = Path(path)
+        try:
+            if path.read_text(encoding="utf-8") == text:
+                return False
+        except (OSError, ValueError):
+            pass
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return True
@@ -1,22 +1,129 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
-import json
+import math
+import queue
+import threading
 import time
 import hashlib
 
 import numpy as np
 
+from .cache import DiskCache, cache_key, fingerprint
+from .checkpoint import DedupLog, load_checkpoint, save_checkpoint
+from .store import open_store
+from .sinks import FrameSink, load_frame, open_sink
+from .embed import BatchStats, EmbedPipeline, get_embedder, load_vectors, save_vectors
+from .vectors import open_backend
+from . import instrument
+from .instrument import IngestHooks, IngestReport, Recorder
+from .concurrency import ordered_map
 from .config import FramekoConfig
-from .video.ffmpeg import ensure_ffmpeg, ensure_ffprobe, probe_video
+from .errors import ConfigError, FramekoError
+from .video.ffmpeg import (
+    container_times,
+    decode_fps,
+    display_size,
+    ensure_ffmpeg,
+    ensure_ffprobe,
+    get_process_limit,
+    probe_keyframes,
+    probe_video,
+    set_process_limit,
+)
 from .scenes.scenedetect_adapter import detect_scenes
-from .pipelines.sampling import sample_timestamps, sample_every_seconds
-from .video.extract import extract_frame
-from .pipelines.dedup import dhash_uint64, hamming_distance
-from .pipelines.quality import variance_of_laplacian
+from .scenes.ffmpeg_scenes import detect_scenes_ffmpeg
+from .pipelines.sampling import (
+    sample_adaptive,
+    sample_every_seconds,
+    sample_timestamps,
+    snap_to_keyframes,
+)
+from .video.extract import choose_strategy, extract_frame, extract_frames, plan_batches
+from .video.pipe import iter_frames_at_rate, iter_raw_frames
+from .pipelines.motion import SIGNALS, change_signal
+from .pipelines.dedup import HammingIndex, greedy_dedup, ints_to_hashes
+from .pipelines.encode import EncoderPool
+from .pipelines.quality import FrameMetrics, frame_metrics, variance_of_laplacian
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+# The low-resolution tier only rejects frames scoring below this fraction of its
+# calibrated blur threshold; borderline frames are left to the full-resolution check.
+_PREFILTER_BLUR_MARGIN = 0.8
+
+
+# Default noise floor of each adaptive-sampling change signal: compression noise
+# and small motion below it never attract samples.
+_ADAPTIVE_THRESHOLD = {"diff": 0.01, "dhash": 0.05}
+
+
+_QUALITY_FIELDS = ("mean_luma", "contrast", "uniform_frac")
+
+
+def _quality_values(m: Any) -> Dict[str, float]:
+    """The extra quality signals that were computed for `m` (a FrameMetrics,
+    ExtractedFrame or record dict)."""
+    get = m.get if isinstance(m, dict) else (lambda k: getattr(m, k, None))
+    return {k: float(get(k)) for k in _QUALITY_FIELDS if get(k) is not None}
+
+
+def _quality_reason(cfg: FramekoConfig, values: Dict[str, float]) -> Optional[str]:
+    """Rejection status for the enabled luma/contrast/uniformity rules, if any.
+
+    A signal that was not measured never rejects.
+    """
+    luma = values.get("mean_luma")
+    if getattr(cfg, "enable_luma_filter", False) and luma is not None:
+        if not cfg.min_mean_luma <= luma <= cfg.max_mean_luma:
+            return "blank"
+    contrast = values.get("contrast")
+    if getattr(cfg, "enable_contrast_filter", False) and contrast is not None:
+        if contrast < cfg.min_contrast:
+            return "low_contrast"
+    uniform = values.get("uniform_frac")
+    if getattr(cfg, "enable_uniform_filter", False) and uniform is not None:
+        if uniform > cfg.max_uniform_frac:
+            return "uniform"
+    return None
+
+
+def _dedup_hash(rec: Any) -> int:
+    """The hash a recorded frame or candidate was deduplicated on: the
+    low-resolution one when the prefilter decided it."""
+    get = rec.get if isinstance(rec, dict) else (lambda k: getattr(rec, k, None))
+    low = get("prefilter_dhash")
+    return int(low if low is not None else get("dhash"))
+
+
+def _scaled_size(size: Tuple[int, int], width: int) -> Tuple[int, int]:
+    """(width, height) at most `width` wide, keeping aspect ratio with even sides."""
+    w, h = size
+    if width >= w:
+        return w, h
+    new_h = max(2, int(round(h * width / w / 2.0)) * 2)
+    return max(2, width - width % 2), new_h
 
 
 @dataclass(frozen=True)
@@ -27,6 +134,37 @@ class ExtractedFrame:
     frame_path: str
     dhash: int
     blur_var: Optional[float]
+    frame_idx: int = 0  # position in the video's sampled timestamp list
+    # Low-resolution tier scores (only with `prefilter`)
+    prefilter_dhash: Optional[int] = None
+    prefilter_blur_var: Optional[float] = None
+    # Extra quality signals (only when their filter is enabled)
+    mean_luma: Optional[float] = None
+    contrast: Optional[float] = None
+    uniform_frac: Optional[float] = None
+    # Position inside `frame_path` for tar/npy output (byte offset / row)
+    shard_offset: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class IngestResult:
+    video_path: str
+    video_id: Optional[str]
+    ok: bool
+    n_frames: int
+    error: Optional[str]
+    elapsed_sec: float
+    report: Optional[IngestReport] = None  # when instrumentation is on
+
+
+@dataclass
+class _IngestPlan:
+    video_path: Path
+    video_id: str
+    info: Dict[str, Any]
+    ts: List[Tuple[float, int]]
+    keyframes: Optional[List[float]] = None
+    recorder: Optional[Recorder] = None
 
 
 class Frameko:
@@ -37,6 +175,8 @@ class Frameko:
         preset: str = "default",
         config: Optional[FramekoConfig] = None,
         backend_kwargs: Optional[Dict[str, Any]] = None,
+        embedder: Any = None,
+        hooks: Optional[Sequence[IngestHooks]] = None,
     ) -> None:
         self.index_dir = Path(index_dir)
         self.index_dir.mkdir(parents=True, exist_ok=True)
@@ -51,30 +191,282 @@ class Frameko:
         # Metadata output
         self.videos_jsonl = self.index_dir / "videos.jsonl"
         self.frames_jsonl = self.index_dir / "frames.jsonl"
+        self.store = open_store(
+            self.index_dir,
+            backend=getattr(self.cfg, "metadata_backend", "jsonl"),
+            batch_size=int(getattr(self.cfg, "metadata_batch_size", 256)),
+        )
 
         # External tools for ingest
         ensure_ffmpeg()
         ensure_ffprobe()
 
-        self._embedder = None
-        # NOTE: assuming elsewhere in your code you set:
-        #   self.backend = ...
-        # If you don't use backend anymore, you can set self.backend = None.
+        # Probe/scene cache keyed by content fingerprint
+        self._cache: Optional[DiskCache] = None
+        if getattr(self.cfg, "enable_cache", True):
+            self._cache = DiskCache(
+                self.index_dir / "cache",
+                max_bytes=int(float(getattr(self.cfg, "cache_max_mb", 256)) * (1 << 20)),
+            )
+
+        # Dedup indexes shared across videos ("run"/"global" scope), keyed by (scope, nbits)
+        self._dedup_indexes: Dict[Tuple[str, int], HammingIndex] = {}
+        self._dedup_lock = threading.Lock()
+
+        # Embedding stage: an `Embedder`, a callable or a registered name; falls back
+        # to `cfg.embedder` (off by default)
+        self._embedder = get_embedder(
+            embedder if embedder is not None else getattr(self.cfg, "embedder", None)
+        )
+        self.last_embed_stats: List[BatchStats] = []
+
+        # Instrumentation: on with `cfg.ingest_report`, any hooks, or per call with
+        # `ingest(return_report=True)`
+        self.hooks: List[IngestHooks] = list(hooks or [])
+        self.last_report: Optional[IngestReport] = None
+
+        # Vector index, one per embedder so vector spaces never mix; "none" keeps
+        # per-video .npz files instead
+        self.backend: Any = None
+        if self._embedder is not None:
+            kwargs = {"dtype": getattr(self.cfg, "vector_dtype", "float32")}
+            kwargs.update(backend_kwargs or {})
+            self.backend = open_backend(
+                backend, self.index_dir / "vectors" / self._embedder.name, **kwargs
+            )
 
     # helpers
-    def _make_video_id(self, video_path: Path) -> str:
-        h = hashlib.blake2b(str(video_path.resolve()).encode("utf-8"), digest_size=6).hexdigest()
-        return f"v_{int(time.time())}_{h}"
+    def _make_video_id(self, content_fp: str, ts: List[Tuple[float, int]]) -> str:
+        """Deterministic id: the video's content plus everything that decides its frames.
+
+        The same file ingested with the same sampled timestamps and output settings
+        always maps to the same id, which is what makes re-runs resumable. Changing a
+        filter or output setting therefore ingests the video again under a new id
+        next to the earlier one, which is kept; the settings are stored on each
+        video record. `refilter` re-decides an ingested video in place instead.
+        """
+        h = cache_key(content_fp, ts, self._output_signature())[:16]
+        return f"v_{h}"
+
+    def _output_signature(self) -> Dict[str, Any]:
+        keys = [
+            "enable_dedup",
+            "dhash_size",
+            "max_hamming",
+            "dedup_scope",
+            "enable_blur_filter",
+            "blur_var_threshold",
+            "image_format",
+            "jpeg_quality",
+            "ingest_mode",
+            "output_format",
+            "frames_fanout",
+            "shard_size",
+            "shard_width",
+            "shard_height",
+            "prefilter",
+            "prefilter_width",
+            "prefilter_blur_var_threshold",
+            "enable_luma_filter",
+            "min_mean_luma",
+            "max_mean_luma",
+            "enable_contrast_filter",
+            "min_contrast",
+            "enable_uniform_filter",
+            "max_uniform_frac",
+            "uniform_tol",
+        ]
+        return {k: getattr(self.cfg, k, None) for k in keys}
 
     def _frame_uid64(self, video_id: str, frame_idx: int) -> int:
         b = f"{video_id}:{frame_idx}".encode("utf-8")
         digest = hashlib.blake2b(b, digest_size=8).digest()
         return int.from_bytes(digest, byteorder="big", signed=False)
 
-    def _append_jsonl(self, path: Path, obj: Dict[str, Any]) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    def _record_frame(self, video_id: str, rec: ExtractedFrame) -> None:
+        self.store.add_frame(self._frame_record(video_id, rec))
+
+    def _frame_record(self, video_id: str, rec: ExtractedFrame) -> Dict[str, Any]:
+        return {
+            "video_id": video_id,
+            "frame_uid": rec.frame_uid,
+            "frame_idx": rec.frame_idx,
+            "t_sec": rec.t_sec,
+            "scene_idx": rec.scene_idx,
+            "frame_path": rec.frame_path,
+            **({"shard_offset": rec.shard_offset} if rec.shard_offset is not None else {}),
+            "dhash": rec.dhash,
+            "blur_var": rec.blur_var,
+            **(
+                {
+                    "prefilter_dhash": rec.prefilter_dhash,
+                    "prefilter_blur_var": rec.prefilter_blur_var,
+                }
+                if rec.prefilter_dhash is not None
+                else {}
+            ),
+            **_quality_values(rec),
+            "created_at": time.time(),
+        }
+
+    def _record_candidate(
+        self,
+        video_id: str,
+        frame_idx: int,
+        sample: Tuple[float, int],
+        dhash: int,
+        blur_var: Optional[float],
+        status: str,
+        prefilter: Optional[Tuple[int, Optional[float]]] = None,
+        quality: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """Store a sampled frame's scores and filter outcome (for `refilter`)."""
+        rec: Dict[str, Any] = {
+            "video_id": video_id,
+            "frame_idx": int(frame_idx),
+            "t_sec": float(sample[0]),
+            "scene_idx": int(sample[1]),
+            "dhash": int(dhash),
+            "blur_var": blur_var,
+            "status": status,
+        }
+        if prefilter is not None:
+            rec["prefilter_dhash"], rec["prefilter_blur_var"] = prefilter
+        rec.update(quality or {})
+        self.store.add_candidate(rec)
+
+    def _load_frames(self, video_id: str) -> List[ExtractedFrame]:
+        """Frames already recorded for `video_id`."""
+        return [
+            ExtractedFrame(
+                frame_uid=int(d["frame_uid"]),
+                t_sec=float(d["t_sec"]),
+                scene_idx=int(d["scene_idx"]),
+                frame_path=str(d["frame_path"]),
+                dhash=int(d["dhash"]),
+                blur_var=d.get("blur_var"),
+                frame_idx=int(d["frame_idx"]),
+                prefilter_dhash=d.get("prefilter_dhash"),
+                prefilter_blur_var=d.get("prefilter_blur_var"),
+                **_quality_values(d),
+                shard_offset=d.get("shard_offset"),
+            )
+            for d in self.store.frames(video_id=video_id)
+            if "frame_idx" in d
+        ]
+
+    def frames(
+        self,
+        video_id: Optional[str] = None,
+        start_sec: Optional[float] = None,
+        end_sec: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Frame records, optionally of one video and within [start_sec, end_sec].
+
+        With `metadata_backend="sqlite"` this is an index lookup rather than a scan.
+        """
+        return self.store.frames(video_id=video_id, start_sec=start_sec, end_sec=end_sec)
+
+    def _repair_frames(self, video_path: Path, frames: List[ExtractedFrame]) -> None:
+        """Re-extract recorded frames whose image file is missing or empty.
+
+        Frames stored in shards are checked by the sink when it resumes instead.
+        """
+        for r in frames:
+            if r.shard_offset is not None:
+                continue
+            p = Path(r.frame_path)
+            if not p.exists() or p.stat().st_size == 0:
+                extract_frame(video_path, r.t_sec, p, jpeg_quality=self.cfg.jpeg_quality)
+
+    def _open_sink(
+        self, video_id: str, info: Dict[str, Any], frames: Iterable[ExtractedFrame] = ()
+    ) -> FrameSink:
+        """Output sink for a video's accepted frames, continuing after `frames`."""
+        return open_sink(
+            getattr(self.cfg, "output_format", "files"),
+            index_dir=self.index_dir,
+            frames_dir=self.frames_dir,
+            video_id=video_id,
+            image_format=self.cfg.image_format,
+            fanout=int(getattr(self.cfg, "frames_fanout", 0)),
+            shard_size=int(getattr(self.cfg, "shard_size", 1000)),
+            size=self._shard_frame_size(info),
+            records=[(r.frame_path, r.shard_offset) for r in frames if r.shard_offset is not None],
+        )
+
+    def _shard_frame_size(self, info: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        """(width, height) of npy shard frames. A missing `shard_width` or
+        `shard_height` follows the video's aspect ratio; neither = decoded size."""
+        w, h = getattr(self.cfg, "shard_width", None), getattr(self.cfg, "shard_height", None)
+        if w and h:
+            return int(w), int(h)
+        size = display_size(info)
+        if size is None:
+            return None
+        if w:
+            return int(w), max(1, round(int(w) * size[1] / size[0]))
+        if h:
+            return max(1, round(int(h) * size[0] / size[1])), int(h)
+        return size
+
+    def _store_frame(
+        self, video_id: str, sink: FrameSink, rec: ExtractedFrame, rgb: Optional[np.ndarray]
+    ) -> ExtractedFrame:
+        """Hand an accepted frame to `sink`; returns its record pointing at the result."""
+        source = rgb if rgb is not None and sink.accepts_arrays else Path(rec.frame_path)
+        meta = self._frame_record(video_id, rec)
+        del meta["frame_path"], meta["created_at"]
+        path, offset = sink.put(rec.frame_idx, source, meta)
+        return replace(rec, frame_path=path, shard_offset=offset)
+
+    def _cached(self, namespace: str, key: str, compute: Callable[[], Any], refresh: bool) -> Any:
+        """Return a cached JSON value, computing and storing it on a miss."""
+        if self._cache is None:
+            return compute()
+        if not refresh:
+            hit = self._cache.get(namespace, key)
+            if hit is not None:
+                return hit
+        value = compute()
+        self._cache.put(namespace, key, value)
+        return value
+
+    def clear_cache(self, namespace: Optional[str] = None) -> None:
+        """Drop cached probe/scene results ("probe", "scenes", or everything)."""
+        if self._cache is not None:
+            self._cache.invalidate(namespace)
+
+    def _dedup_path(self, nbits: int) -> Path:
+        return self.index_dir / "dedup" / f"dhash{nbits}.u64"
+
+    def _dedup_index(self, scope: str) -> HammingIndex:
+        """Near-duplicate index for the given scope ("video", "run" or "global")."""
+        nbits = int(self.cfg.dhash_size) ** 2
+        radius = int(self.cfg.max_hamming)
+        if scope == "video":
+            return HammingIndex(nbits=nbits, radius=radius)
+        if scope not in {"run", "global"}:
+            raise ConfigError(f"Unknown dedup_scope: {scope}")
+
+        with self._dedup_lock:
+            index = self._dedup_indexes.get((scope, nbits))
+            if index is None:
+                if scope == "global":
+                    index = HammingIndex.load(self._dedup_path(nbits), nbits=nbits, radius=radius)
+                else:
+                    index = HammingIndex(nbits=nbits, radius=radius)
+            elif index.radius != radius:
+                index = index.with_radius(radius)
+            self._dedup_indexes[(scope, nbits)] = index
+            return index
+
+    @staticmethod
+    def _discard(path: Path) -> None:
+        try:
+            path.unlink(missing_ok=True)
+        except Exception:
+            pass
 
     # main
     def ingest(
@@ -90,43 +482,348 @@ class Frameko:
         every_sec: Optional[float] = None,
         start_sec: Optional[float] = None,
         end_sec: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        refresh_cache: bool = False,
+        return_report: bool = False,
+    ) -> Union[str, IngestReport]:
+        """Ingest one video and return its id, or its `IngestReport` with
+        `return_report=True` (which turns instrumentation on for this call)."""
+        plan = self._prepare(
+            video_path,
+            frames_per_scene=frames_per_scene,
+            detector=detector,
+            threshold=threshold,
+            min_scene_len_frames=min_scene_len_frames,
+            limit_scenes=limit_scenes,
+            sampling_mode=sampling_mode,
+            every_sec=every_sec,
+            start_sec=start_sec,
+            end_sec=end_sec,
+            refresh_cache=refresh_cache,
+            recorder=self._recorder(video_path, force=return_report),
+        )
+        self._run_plan(plan, max_workers=max_workers)
+        if return_report:
+            assert plan.recorder is not None
+            return plan.recorder.report
+        return plan.video_id
+
+    def iter_ingest(
+        self,
+        video_path: Union[str, Path],
+        *,
+        with_arrays: bool = False,
+        queue_size: int = 8,
+        max_workers: Optional[int] = None,
+        **ingest_kwargs: Any,
+    ) -> Iterator[Any]:
+        """Ingest a video, yielding each `ExtractedFrame` as soon as it passes the filters.
+
+        Frames come out in timestamp order and are the same ones `ingest` records.
+        With `with_arrays=True` each item is `(frame, rgb)` with the decoded uint8
+        image. Extraction runs in a background thread at most `queue_size` frames
+        ahead of the consumer, so memory stays bounded however long the video is.
+        Stopping iteration early stops the extraction; the next ingest of the same
+        video resumes from its checkpoint. `ingest_kwargs` are those of `ingest`.
+        """
+        plan = self._prepare(video_path, recorder=self._recorder(video_path), **ingest_kwargs)
+        items: queue.Queue[Tuple[str, Any]] = queue.Queue(maxsize=max(1, int(queue_size)))
+        stop = threading.Event()
+
+        def put(item: Tuple[str, Any]) -> bool:
+            while not stop.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce() -> None:
+            frames = self._iter_plan(plan, max_workers=max_workers, with_arrays=with_arrays)
+            try:
+                with instrument.activate(plan.recorder):
+                    for item in frames:
+                        if not put(("frame", item)):
+                            return
+                put(("done", None))
+            except BaseException as e:
+                put(("error", e))
+            finally:
+                frames.close()
+
+        producer = threading.Thread(target=produce, name="frameko-ingest", daemon=True)
+        producer.start()
+        try:
+            while True:
+                kind, payload = items.get()
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise payload
+                yield payload if with_arrays else payload[0]
+        finally:
+            stop.set()
+            producer.join()
+
+    async def aingest(
+        self,
+        video_path: Union[str, Path],
+        *,
+        max_concurrency: int = 8,
+        timeout: Optional[float] = None,
+        limit: Optional[asyncio.Semaphore] = None,
+        **ingest_kwargs: Any,
     ) -> str:
+        """asyncio version of `ingest`; returns the video id.
+
+        ffprobe and, in files mode, frame extraction run as asyncio subprocesses,
+        at most `max_concurrency` at once for this video. Extraction uses the same
+        single-pass/GOP/keyframes batches as `ingest`, one subprocess per batch.
+        Pass a shared `limit` semaphore instead to cap processes across many
+        concurrent `aingest` calls.
+
+        `timeout` and cancellation only cover those asyncio subprocesses: a call
+        that times out or is cancelled kills them, then stops the video at a
+        checkpoint so a later ingest resumes it. Every other ffmpeg run (keyframe
+        probing, scene detection, the prefilter, pipe-mode decoding, repairs on
+        resume) is a blocking subprocess in a worker thread. Those keep the event
+        loop free but are neither timed out nor killed; cancelling waits for the
+        one in progress to finish.
+        """
+        import asyncio
+
+        from .video.aio import extract_frames_async, probe_video_async
+
         video_path = Path(video_path)
-        info = probe_video(video_path)
-        duration = float(info.get("duration", 0.0))
-        video_id = self._make_video_id(video_path)
-
-        self._append_jsonl(
-            self.videos_jsonl,
-            {
-                "video_id": video_id,
-                "video_path": str(video_path),
-                "info": info,
-                "created_at": time.time(),
-            },
+        if not video_path.exists():
+            raise FileNotFoundError(str(video_path))
+        sem = limit or asyncio.Semaphore(max(1, int(max_concurrency)))
+        max_workers = ingest_kwargs.pop("max_workers", None)
+        refresh = bool(ingest_kwargs.get("refresh_cache", False))
+        rec = self._recorder(video_path)
+
+        with instrument.activate(rec):
+            key = cache_key(await asyncio.to_thread(fingerprint, video_path)) if self._cache else ""
+            info = None if refresh or not key else self._cache.get("probe", key)
+            if info is None:
+                with instrument.timed("probe"):
+                    info = await probe_video_async(video_path, timeout=timeout, limit=sem)
+                if key:
+                    self._cache.put("probe", key, info)
+        plan = await asyncio.to_thread(
+            self._prepare, video_path, info=info, recorder=rec, **ingest_kwargs
         )
 
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        running: Set[Any] = set()
+
+        def extract(times: List[float], paths: List[Path], strategy: str) -> None:
+            # Called from the worker thread: run the extraction on the event loop
+            coro = extract_frames_async(
+                video_path,
+                times,
+                paths,
+                jpeg_quality=self.cfg.jpeg_quality,
+                fps=decode_fps(plan.info),
+                video_start=plan.info.get("video_start", 0.0),
+                strategy=strategy,
+                keyframes=plan.keyframes,
+                timeout=timeout,
+                limit=sem,
+            )
+            fut = asyncio.run_coroutine_threadsafe(coro, loop)
+            running.add(fut)
+            try:
+                fut.result()
+            finally:
+                running.discard(fut)
+
+        def work() -> None:
+            frames = self._iter_plan(plan, max_workers=max_workers, extract=extract)
+            try:
+                with instrument.activate(plan.recorder):
+                    for _ in frames:
+                        if stop.is_set():
+                            return
+            finally:
+                frames.close()
+
+        task = asyncio.ensure_future(asyncio.to_thread(work))
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            stop.set()
+            for fut in list(running):
+                fut.cancel()
+            # Let the worker reach its checkpoint before reporting the cancellation
+            await asyncio.gather(task, return_exceptions=True)
+            raise
+        return plan.video_id
+
+    def ingest_many(
+        self,
+        video_paths: Iterable[Union[str, Path]],
+        *,
+        max_videos_in_flight: int = 2,
+        prefetch: int = 2,
+        max_processes: Optional[int] = None,
+        **ingest_kwargs: Any,
+    ) -> List[IngestResult]:
+        """Ingest several videos with probing/scene detection pipelined ahead of extraction.
+
+        Up to `prefetch` videos are probed and scene-detected while up to
+        `max_videos_in_flight` videos are being extracted. `max_processes` caps the
+        number of ffmpeg/ffprobe processes running at once across all of them.
+        `ingest_kwargs` are the keyword arguments of `ingest`. A failing video is
+        reported in its result and does not stop the batch.
+        """
+        paths = [Path(p) for p in video_paths]
+        max_workers = ingest_kwargs.pop("max_workers", None)
+        results: List[Optional[IngestResult]] = [None] * len(paths)
+
+        def failed(idx: int, t0: float, exc: BaseException) -> IngestResult:
+            return IngestResult(
+                video_path=str(paths[idx]),
+                video_id=None,
+                ok=False,
+                n_frames=0,
+                error=f"{type(exc).__name__}: {exc}",
+                elapsed_sec=time.perf_counter() - t0,
+            )
+
+        def prepare(idx: int) -> Tuple[int, float, Optional[_IngestPlan]]:
+            t0 = time.perf_counter()
+            try:
+                plan = self._prepare(
+                    paths[idx], recorder=self._recorder(paths[idx]), **ingest_kwargs
+                )
+                return idx, t0, plan
+            except Exception as e:
+                results[idx] = failed(idx, t0, e)
+                return idx, t0, None
+
+        def execute(idx: int, t0: float, plan: _IngestPlan) -> None:
+            try:
+                frames = self._run_plan(plan, max_workers=max_workers)
+            except Exception as e:
+                results[idx] = failed(idx, t0, e)
+                return
+            results[idx] = IngestResult(
+                video_path=str(paths[idx]),
+                video_id=plan.video_id,
+                ok=True,
+                n_frames=len(frames),
+                error=None,
+                elapsed_sec=time.perf_counter() - t0,
+                report=plan.recorder.report if plan.recorder is not None else None,
+            )
+
+        prev_limit = get_process_limit()
+        if max_processes is not None:
+            set_process_limit(max_processes)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_videos_in_flight)) as pool:
+                running: Set[Future] = set()
+                prepared = ordered_map(prepare, range(len(paths)), max_workers=max(1, prefetch))
+                for idx, t0, plan in prepared:
+                    if plan is None:
+                        continue
+                    # Backpressure: don't prepare further ahead than extraction can absorb
+                    while len(running) >= max(1, max_videos_in_flight):
+                        _, running = wait(running, return_when=FIRST_COMPLETED)
+                    running.add(pool.submit(execute, idx, t0, plan))
+                wait(running)
+        finally:
+            set_process_limit(prev_limit)
+
+        return [r for r in results if r is not None]
+
+    def _prepare(
+        self,
+        video_path: Union[str, Path],
+        *,
+        recorder: Optional[Recorder] = None,
+        **kwargs: Any,
+    ) -> _IngestPlan:
+        """`_plan` with `recorder` timing its stages; the recorder travels with the
+        plan to its run."""
+        with instrument.activate(recorder):
+            plan = self._plan(video_path, **kwargs)
+        plan.recorder = recorder
+        return plan
+
+    def _plan(
+        self,
+        video_path: Union[str, Path],
+        *,
+        frames_per_scene: Optional[int] = None,
+        detector: Optional[str] = None,
+        threshold: Optional[float] = None,
+        min_scene_len_frames: Optional[int] = None,
+        limit_scenes: Optional[int] = None,
+        sampling_mode: Optional[str] = None,
+        every_sec: Optional[float] = None,
+        start_sec: Optional[float] = None,
+        end_sec: Optional[float] = None,
+        refresh_cache: bool = False,
+        info: Optional[Dict[str, Any]] = None,
+    ) -> _IngestPlan:
+        """Probe, detect scenes and sample timestamps (no frames are written yet).
+
+        `info` skips probing when the caller already has the probe result.
+        """
+        video_path = Path(video_path)
+        if not video_path.exists():
+            raise FileNotFoundError(str(video_path))
+        fp = fingerprint(video_path) if self._cache is not None else ""
+        if info is None:
+            with instrument.timed("probe"):
+                info = self._cached(
+                    "probe", cache_key(fp), lambda: probe_video(video_path), refresh=refresh_cache
+                )
+        duration = float(info.get("duration", 0.0))
+
         # Detect scenes
         det = detector or self.cfg.scene_detector
         if det == "none":
             scenes = [(0.0, float(info.get("duration", 0.0)))]
         else:
-            scenes = detect_scenes(
-                video_path,
-                detector=det,
-                threshold=threshold if threshold is not None else self.cfg.scene_threshold,
-                min_scene_len_frames=min_scene_len_frames
+            thr = float(threshold if threshold is not None else self.cfg.scene_threshold)
+            min_len = int(
+                min_scene_len_frames
                 if min_scene_len_frames is not None
-                else self.cfg.min_scene_len_frames,
-                limit_scenes=limit_scenes,
+                else self.cfg.min_scene_len_frames
             )
+            # The full scene list is cached; limit_scenes is applied afterwards
+            key = cache_key(fp, det, thr, min_len)
+            if det == "ffmpeg":
+                key = cache_key(key, int(getattr(self.cfg, "ffmpeg_scene_width", 320)))
+            with instrument.timed("scenes"):
+                cached = self._cached(
+                    "scenes",
+                    key,
+                    lambda: self._detect_scenes(
+                        video_path,
+                        info,
+                        detector=det,
+                        threshold=thr,
+                        min_scene_len_frames=min_len,
+                        limit_scenes=None,
+                    ),
+                    refresh=refresh_cache,
+                )
+            scenes = [(float(a), float(b)) for a, b in cached]
+            if limit_scenes is not None:
+                scenes = scenes[:limit_scenes]
             if not scenes:
                 scenes = [(0.0, float(info.get("duration", 0.0)))]
 
         fpp = frames_per_scene if frames_per_scene is not None else self.cfg.frames_per_scene
         mode = sampling_mode or getattr(self.cfg, "sampling_mode", "scene")
 
-        if mode in {"seconds", "interval"}:
+        if mode in {"seconds", "interval", "adaptive"}:
             pad = float(getattr(self.cfg, "end_padding_sec", 0.25))
             effective_end = max(0.0, duration - pad)
 
@@ -135,14 +832,20 @@ class Frameko:
             cfg_end = getattr(self.cfg, "end_sec", None)
             desired_end = float(end_sec) if end_sec is not None else (float(cfg_end) if cfg_end is not None else None)
             _end = effective_end if desired_end is None else min(desired_end, effective_end)
+            step = float(every_sec) if every_sec is not None else float(getattr(self.cfg, "every_sec", 1.0))
 
-            ts = sample_every_seconds(
-                duration=duration,
-                every_sec=float(every_sec) if every_sec is not None else float(getattr(self.cfg, "every_sec", 1.0)),
-                scenes=scenes,
-                start_sec=_start,
-                end_sec=_end,
-            )
+            if mode == "adaptive":
+                ts = self._sample_adaptive(
+                    video_path, info, fp, scenes, _start, _end, step, refresh_cache
+                )
+            else:
+                ts = sample_every_seconds(
+                    duration=duration,
+                    every_sec=step,
+                    scenes=scenes,
+                    start_sec=_start,
+                    end_sec=_end,
+                )
         else:
             ts = sample_timestamps(
                 scenes,
@@ -150,98 +853,874 @@ class Frameko:
                 edge_eps=self.cfg.scene_edge_epsilon_sec,
             )
 
-        extracted: List[ExtractedFrame] = []
-        seen_hashes: List[int] = []
+        # Keyframe-aware sampling: move timestamps onto keyframes so each seek
+        # decodes one frame instead of a whole GOP
+        snap = getattr(self.cfg, "keyframe_snap", "off")
+        if snap not in {"off", "snap", "only"}:
+            raise ConfigError(f"Unknown keyframe_snap: {snap}")
+        keyframes: Optional[List[float]] = None
+        # The packet scan reads the whole file, so it only runs when asked for
+        if snap != "off" or getattr(self.cfg, "extract_strategy", "auto") in {"gop", "keyframes"}:
+            with instrument.timed("keyframes"):
+                keyframes = self._cached(
+                    "keyframes",
+                    cache_key(fp),
+                    lambda: probe_keyframes(video_path),
+                    refresh=refresh_cache,
+                )
+            # Packet times are raw; sample timestamps count from the container start
+            keyframes = container_times(keyframes, info)
+        if snap != "off" and keyframes:
+            tol = float(getattr(self.cfg, "keyframe_tolerance_sec", 0.5))
+            ts = snap_to_keyframes(
+                ts, keyframes, tolerance_sec=tol if snap == "snap" else None, scenes=scenes
+            )
 
-        for i, (t_sec, scene_idx) in enumerate(ts):
-            out_path = self.frames_dir / f"{video_id}_{i:06d}.{self.cfg.image_format}"
+        # Unlike the cache key, the id ignores mtime: a copied or touched file is
+        # still the same video.
+        video_id = self._make_video_id(fingerprint(video_path, include_mtime=False), ts)
+        return _IngestPlan(
+            video_path=video_path, video_id=video_id, info=info, ts=ts, keyframes=keyframes
+        )
 
-            extract_frame(
-                video_path=video_path,
-                t_sec=float(t_sec),
-                out_path=out_path,
-                jpeg_quality=self.cfg.jpeg_quality,
+    def _sample_adaptive(
+        self,
+        video_path: Path,
+        info: Dict[str, Any],
+        fp: str,
+        scenes: Sequence[Tuple[float, float]],
+        start_sec: float,
+        end_sec: float,
+        every_sec: float,
+        refresh_cache: bool,
+    ) -> List[Tuple[float, int]]:
+        """Timestamps for `sampling_mode="adaptive"`: one low-res decode pass scores
+        how much each frame changes and the frame budget goes where it changes."""
+        method = getattr(self.cfg, "adaptive_signal", "diff")
+        if method not in SIGNALS:
+            raise ConfigError(f"Unknown adaptive_signal: {method}")
+        rate = float(getattr(self.cfg, "adaptive_signal_fps", 4.0))
+        if rate <= 0 or every_sec <= 0:
+            raise ConfigError("adaptive_signal_fps and every_sec must be > 0")
+        size = display_size(info)
+        if size is None or end_sec <= start_sec:
+            return sample_every_seconds(
+                duration=float(info.get("duration", 0.0)),
+                every_sec=every_sec,
+                scenes=scenes,
+                start_sec=start_sec,
+                end_sec=end_sec,
             )
+        small = _scaled_size(size, int(getattr(self.cfg, "adaptive_signal_width", 64)))
 
-            # Compute dhash + dedup
-            dh = int(dhash_uint64(out_path, hash_size=self.cfg.dhash_size))
-            if self.cfg.enable_dedup:
-                is_dup = False
-                for prev in seen_hashes[-500:]:
-                    if hamming_distance(dh, prev) <= self.cfg.max_hamming:
-                        is_dup = True
-                        break
-                if is_dup:
-                    try:
-                        out_path.unlink(missing_ok=True)
-                    except Exception:
-                        pass
-                    continue
-                seen_hashes.append(dh)
-
-            # Blur filter
-            blur_v: Optional[float]
-            if self.cfg.enable_blur_filter:
-                v = float(variance_of_laplacian(out_path))
-                if v < self.cfg.blur_var_threshold:
-                    try:
-                        out_path.unlink(missing_ok=True)
-                    except Exception:
-                        pass
-                    continue
-                blur_v = v
-            else:
-                blur_v = None
+        def compute() -> Dict[str, List[float]]:
+            times: List[float] = []
+
+            def frames() -> Iterator[np.ndarray]:
+                for t, gray in iter_frames_at_rate(
+                    video_path, rate=rate, size=small, start_sec=start_sec, end_sec=end_sec
+                ):
+                    times.append(round(t, 6))
+                    yield gray
+
+            signal = change_signal(frames(), method, hash_size=self.cfg.dhash_size)
+            return {"times": times, "signal": [round(float(x), 6) for x in signal]}
+
+        key = cache_key(fp, method, rate, list(small), round(start_sec, 6), round(end_sec, 6))
+        with instrument.timed("signal"):
+            sig = self._cached("signal", key, compute, refresh=refresh_cache)
+
+        budget = getattr(self.cfg, "adaptive_budget", None)
+        if budget is None:
+            budget = max(1, math.ceil((end_sec - start_sec) / every_sec))
+        threshold = getattr(self.cfg, "adaptive_threshold", None)
+        if threshold is None:
+            threshold = _ADAPTIVE_THRESHOLD[method]
+        return sample_adaptive(
+            sig["times"],
+            sig["signal"],
+            budget=int(budget),
+            min_gap_sec=float(getattr(self.cfg, "adaptive_min_gap_sec", 0.5)),
+            max_gap_sec=getattr(self.cfg, "adaptive_max_gap_sec", 30.0),
+            threshold=float(threshold),
+            scenes=scenes,
+            end_sec=end_sec,
+        )
+
+    def _detect_scenes(
+        self,
+        video_path: Path,
+        info: Dict[str, Any],
+        *,
+        detector: str,
+        threshold: float,
+        min_scene_len_frames: int,
+        limit_scenes: Optional[int],
+    ) -> List[Tuple[float, float]]:
+        duration = float(info.get("duration", 0.0))
+        chunk_sec = getattr(self.cfg, "scene_chunk_sec", None)
+        if chunk_sec and duration > 2 * float(chunk_sec):
+            from .scenes.chunked import detect_scenes_chunked  # process pool, loaded on demand
 
-            frame_uid = self._frame_uid64(video_id, i)
-            rec = ExtractedFrame(
-                frame_uid=frame_uid,
-                t_sec=float(t_sec),
-                scene_idx=int(scene_idx),
-                frame_path=str(out_path),
-                dhash=dh,
-                blur_var=blur_v,
+            return detect_scenes_chunked(
+                video_path,
+                detector=detector,
+                threshold=threshold,
+                min_scene_len_frames=min_scene_len_frames,
+                limit_scenes=limit_scenes,
+                duration=duration,
+                fps=info.get("fps"),
+                chunk_sec=float(chunk_sec),
+                overlap_sec=float(getattr(self.cfg, "scene_chunk_overlap_sec", 5.0)),
+                max_workers=getattr(self.cfg, "scene_workers", None),
+                scale_width=int(getattr(self.cfg, "ffmpeg_scene_width", 320)),
             )
-            extracted.append(rec)
+        if detector == "ffmpeg":
+            return detect_scenes_ffmpeg(
+                video_path,
+                threshold=threshold,
+                min_scene_len_frames=min_scene_len_frames,
+                limit_scenes=limit_scenes,
+                duration=duration,
+                fps=info.get("fps"),
+                scale_width=int(getattr(self.cfg, "ffmpeg_scene_width", 320)),
+            )
+        return detect_scenes(
+            video_path,
+            detector=detector,
+            threshold=threshold,
+            min_scene_len_frames=min_scene_len_frames,
+            limit_scenes=limit_scenes,
+        )
+
+    def _run_plan(
+        self, plan: _IngestPlan, *, max_workers: Optional[int] = None
+    ) -> List[ExtractedFrame]:
+        """Run a prepared video to completion and return its frames in order."""
+        with instrument.activate(plan.recorder):
+            return [rec for rec, _ in self._iter_plan(plan, max_workers=max_workers)]
+
+    def _is_done(self, video_id: str) -> bool:
+        ckpt = load_checkpoint(self.index_dir, video_id)
+        return bool(ckpt and ckpt.get("done"))
+
+    def _iter_plan(
+        self,
+        plan: _IngestPlan,
+        *,
+        max_workers: Optional[int] = None,
+        with_arrays: bool = False,
+        extract: Optional[Callable[[List[float], List[Path], str], None]] = None,
+    ) -> Iterator[Tuple[ExtractedFrame, Optional[np.ndarray]]]:
+        """Extract, filter and record the frames of a prepared video.
+
+        Yields `(frame, rgb)` in timestamp order as soon as each frame is recorded;
+        `rgb` is the decoded image when `with_arrays` is set, else None. Files mode
+        extracts `extract_batch` frames at a time; `extract(times, paths, strategy)`
+        replaces the default `extract_frames` call for each batch.
+
+        Progress is checkpointed under `index_dir/checkpoints` every
+        `checkpoint_every` candidates and at the start of each extraction batch.
+        Re-running the same plan resumes after the last checkpoint (reusing frames
+        already recorded) or, when the video was completed, yields its recorded
+        frames untouched.
+        Closing the generator early leaves a checkpoint to resume from.
+
+        Callers activate `plan.recorder` around the iteration; a completed run
+        finishes its report.
+        """
+        video_path, video_id, info, ts = plan.video_path, plan.video_id, plan.info, plan.ts
 
-            self._append_jsonl(
-                self.frames_jsonl,
+        # Every frame handed out is also queued for embedding (when enabled)
+        stage: Optional[EmbedPipeline] = None
+
+        def with_array(rec: ExtractedFrame, rgb: Optional[np.ndarray] = None):
+            if stage is not None:
+                stage.add(rec, rgb)
+            if not with_arrays:
+                return rec, None
+            return rec, (rgb if rgb is not None else load_frame(rec))
+
+        ckpt = load_checkpoint(self.index_dir, video_id)
+        if ckpt is None:
+            self.store.add_video(
                 {
                     "video_id": video_id,
-                    "frame_uid": frame_uid,
-                    "t_sec": rec.t_sec,
-                    "scene_idx": rec.scene_idx,
-                    "frame_path": rec.frame_path,
-                    "dhash": rec.dhash,
-                    "blur_var": rec.blur_var,
+                    "video_path": str(video_path),
+                    "info": info,
+                    "settings": self._output_signature(),
                     "created_at": time.time(),
-                },
+                }
             )
+            save_checkpoint(self.index_dir, video_id, next_index=0, total=len(ts))
+            existing: Dict[int, ExtractedFrame] = {}
+            start = 0
+        else:
+            existing = {r.frame_idx: r for r in self._load_frames(video_id)}
+            self._repair_frames(video_path, list(existing.values()))
+            instrument.count("frames_reused", len(existing))
+            if ckpt.get("done"):
+                # Finished earlier; only embed it if that was skipped back then
+                stage = None if self._has_vectors(video_id) else self._embed_stage()
+                try:
+                    for k in sorted(existing):
+                        yield with_array(existing[k])
+                    self._finish_embedding(video_id, stage)
+                finally:
+                    if stage is not None:
+                        stage.close()
+                self._finish_report(plan, ran=False)
+                return
+            start = int(ckpt.get("next_index", 0))
 
-        if not extracted:
-            return video_id
+        stage = self._embed_stage()
+        for k in sorted(existing):
+            if k < start:
+                yield with_array(existing[k])
+        scope = getattr(self.cfg, "dedup_scope", "video")
+        dedup_index = self._dedup_index(scope) if self.cfg.enable_dedup else None
+        dedup_log: Optional[DedupLog] = None
+        if dedup_index is not None:
+            # Every frame that passed dedup before the interruption still counts as
+            # "seen", including ones a later check rejected
+            dedup_log = DedupLog(self.index_dir, video_id)
+            if ckpt is not None and dedup_log.exists():
+                seen = [h for _, h in dedup_log.replay(start)]
+            else:
+                # Fresh run, or a checkpoint written before the log existed
+                early = [(k, _dedup_hash(existing[k])) for k in sorted(existing) if k < start]
+                dedup_log.reset(early)
+                seen = [h for _, h in early]
+            seen += [_dedup_hash(existing[k]) for k in sorted(existing) if k >= start]
+            with self._dedup_lock:
+                for h in seen:
+                    if dedup_index.find(h, radius=0) is None:
+                        dedup_index.add(h)
 
-        if getattr(self, "backend", None) is not None:
-            embedder = self._get_embedder()
-            paths = [r.frame_path for r in extracted]
-            vectors = embedder.encode_images(paths)
+        # Positions still to decode; recorded frames past the checkpoint are reused
+        todo = [i for i in range(start, len(ts)) if i not in existing]
+        # Recorded frames past the checkpoint, merged back into the output in order
+        reused: Deque[ExtractedFrame] = deque(existing[k] for k in sorted(existing) if k >= start)
 
-            ids = np.array([r.frame_uid for r in extracted], dtype=np.int64)
-            payloads = [
-                {
-                    "video_id": video_id,
-                    "t_sec": r.t_sec,
-                    "frame_path": r.frame_path,
-                    "scene_idx": r.scene_idx,
-                }
-                for r in extracted
-            ]
+        # Low-resolution tier: dedup and blur-gate every candidate on a small decode,
+        # so only survivors are extracted at full resolution
+        prefiltered: Dict[int, Tuple[int, Optional[float]]] = {}
+        instrument.count("frames_sampled", len(todo))
+        if getattr(self.cfg, "prefilter", False) and todo:
+            with instrument.timed("prefilter"):
+                todo, prefiltered = self._prefilter(plan, todo, dedup_index, dedup_log)
+
+        # Candidates are staged as files (or arrays); the sink takes the accepted ones
+        sink = self._open_sink(video_id, info, existing.values())
+        times = [float(ts[i][0]) for i in todo]
+        out_paths = {i: sink.staging_path(i, self._frame_uid64(video_id, i)) for i in todo}
+        strategy = getattr(self.cfg, "extract_strategy", "auto")
+        if strategy == "auto" and getattr(self.cfg, "keyframe_snap", "off") == "only":
+            strategy = "keyframes"
+        ingest_mode = getattr(self.cfg, "ingest_mode", "files")
+        if max_workers is None:
+            max_workers = int(getattr(self.cfg, "max_workers", 1))
+        workers = max(1, int(max_workers))
+        checkpoint_every = max(1, int(getattr(self.cfg, "checkpoint_every", 25)))
+
+        # Candidate frames as (position, decoded array or None when already on disk)
+        frames: Iterable[Tuple[int, Optional[np.ndarray]]]
+        # Positions opening an extraction batch; each gets a checkpoint
+        batch_starts: Set[int] = set()
+        encoder: Optional[EncoderPool] = None
+        if ingest_mode == "pipe":
+            # npy shards take arrays, so ffmpeg decodes straight at the shard size
+            size = self._shard_frame_size(info) if sink.accepts_arrays else display_size(info)
+            if size is None:
+                raise RuntimeError(f"ffprobe reported no frame size for {video_path}")
+            raw = iter_raw_frames(
+                video_path,
+                times,
+                size=size,
+                fps=decode_fps(info),
+                video_start=info.get("video_start", 0.0),
+                strategy=strategy,
+                keyframes=plan.keyframes,
+            )
+            # Decoding happens as the frames are pulled, so that is what gets timed
+            frames = ((todo[j], arr) for j, arr in instrument.timed_iter(raw, "extract"))
+            if not sink.accepts_arrays:
+                encoder = EncoderPool(
+                    max_workers=int(getattr(self.cfg, "encoder_workers", 4)),
+                    jpeg_quality=self.cfg.jpeg_quality,
+                )
+        elif ingest_mode == "files":
+            # Extract a batch at a time, so scoring, the first yield and checkpoints
+            # follow the first batch instead of waiting for the whole video. The
+            # strategy is picked once for all of `todo`, as a single call would.
+            picked = choose_strategy(
+                times, decode_fps(info), strategy=strategy, keyframes=plan.keyframes
+            )
+            batches = plan_batches(
+                times, int(getattr(self.cfg, "extract_batch", 200)), plan.keyframes
+            )
+            batch_starts = {todo[b[0]] for b in batches[1:]}
+
+            def extract_batches() -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+                for batch in batches:
+                    batch_times = [times[j] for j in batch]
+                    batch_paths = [out_paths[todo[j]] for j in batch]
+                    with instrument.timed("extract"):
+                        if extract is not None:
+                            extract(batch_times, batch_paths, picked)
+                        else:
+                            extract_frames(
+                                video_path,
+                                batch_times,
+                                batch_paths,
+                                jpeg_quality=self.cfg.jpeg_quality,
+                                fps=decode_fps(info),
+                                video_start=info.get("video_start", 0.0),
+                                strategy=picked,
+                                max_workers=workers,
+                                keyframes=plan.keyframes,
+                            )
+                    for j in batch:
+                        yield todo[j], None
+
+            frames = extract_batches()
+        else:
+            raise ConfigError(f"Unknown ingest_mode: {ingest_mode}")
+
+        # Hash, blur and the enabled quality signals come from one grayscale load.
+        # Recording candidates needs every frame's blur score.
+        record = bool(getattr(self.cfg, "record_candidates", False))
+        want_blur = self.cfg.enable_blur_filter or record
+        signals = self._quality_signals()
+
+        def score(
+            item: Tuple[int, Optional[np.ndarray]]
+        ) -> Tuple[int, Optional[np.ndarray], FrameMetrics]:
+            i, rgb = item
+            source = out_paths[i] if rgb is None else rgb
+            with instrument.timed("score"):
+                m = frame_metrics(source, hash_size=self.cfg.dhash_size, blur=want_blur, **signals)
+            return i, rgb, m
+
+        # Frames waiting on the encoder; records are written in order once encoded
+        pending: Deque[Tuple[Future, ExtractedFrame, Optional[np.ndarray]]] = deque()
+
+        def emit(rec: ExtractedFrame, rgb: Optional[np.ndarray]):
+            while reused and reused[0].frame_idx < rec.frame_idx:
+                yield with_array(reused.popleft())
+            with instrument.timed("write"):
+                rec = self._store_frame(video_id, sink, rec, rgb)
+                self._record_frame(video_id, rec)
+            instrument.count("frames_accepted")
+            yield with_array(rec, rgb)
+
+        def flush_one():
+            fut, done, rgb = pending.popleft()
+            with instrument.timed("encode_wait"):
+                fut.result()
+            yield from emit(done, rgb)
+
+        # Scores may be computed concurrently, but decisions below are made in
+        # timestamp order so the output matches the serial path.
+        scored = ordered_map(score, frames, max_workers=workers)
+        try:
+            for n, (i, rgb, metrics) in enumerate(scored, start=1):
+                if n % checkpoint_every == 0 or i in batch_starts:
+                    # Everything before the oldest frame still being encoded is final
+                    next_index = pending[0][1].frame_idx if pending else i
+                    with instrument.timed("write"):
+                        self.store.flush()
+                        if dedup_log is not None:
+                            dedup_log.flush()
+                        save_checkpoint(
+                            self.index_dir, video_id, next_index=next_index, total=len(ts)
+                        )
+
+                t_sec, scene_idx = ts[i]
+                out_path = out_paths[i]
+                dh, scored_blur = metrics.dhash, metrics.blur_var
+                quality = _quality_values(metrics)
+
+                def reject(status: str) -> None:
+                    instrument.reject(status)
+                    if record:
+                        self._record_candidate(
+                            video_id, i, ts[i], dh, scored_blur, status, prefiltered.get(i), quality
+                        )
+                    if rgb is None:
+                        self._discard(out_path)
 
-            self.backend.upsert(ids=ids, vectors=vectors, payloads=payloads)
+                # Dedup (already decided by the prefilter tier when it ran)
+                if dedup_index is not None and not prefiltered:
+                    with self._dedup_lock:
+                        is_dup = dedup_index.find(dh) is not None
+                        if not is_dup:
+                            dedup_index.add(dh)
+                    if is_dup:
+                        reject("duplicate")
+                        continue
+                    assert dedup_log is not None
+                    dedup_log.add(i, dh)
+
+                # Blur filter
+                blur_v: Optional[float] = None
+                if self.cfg.enable_blur_filter:
+                    assert scored_blur is not None
+                    if scored_blur < self.cfg.blur_var_threshold:
+                        reject("blurry")
+                        continue
+                    blur_v = scored_blur
+
+                # Luma / contrast / uniformity rules
+                reason = _quality_reason(self.cfg, quality)
+                if reason is not None:
+                    reject(reason)
+                    continue
+
+                if record:
+                    self._record_candidate(
+                        video_id, i, ts[i], dh, scored_blur, "accepted", prefiltered.get(i), quality
+                    )
+
+                rec = ExtractedFrame(
+                    frame_uid=self._frame_uid64(video_id, i),
+                    t_sec=float(t_sec),
+                    scene_idx=int(scene_idx),
+                    frame_path=str(out_path),
+                    dhash=dh,
+                    blur_var=blur_v,
+                    frame_idx=i,
+                    prefilter_dhash=prefiltered[i][0] if prefiltered else None,
+                    prefilter_blur_var=prefiltered[i][1] if prefiltered else None,
+                    **quality,
+                )
+
+                if encoder is None:
+                    yield from emit(rec, rgb)
+                    continue
+
+                # Only surviving frames are encoded
+                pending.append((encoder.submit(rgb, out_path), rec, rgb))
+                while len(pending) > 2 * encoder.max_workers:
+                    yield from flush_one()
+
+            while pending:
+                yield from flush_one()
+            while reused:
+                yield with_array(reused.popleft())
+            # Vectors cover every frame of the video, including reused ones
+            self._finish_embedding(video_id, stage)
+        finally:
+            if stage is not None:
+                stage.close()
+            scored.close()
+            if encoder is not None:
+                encoder.close()
+            with instrument.timed("write"):
+                sink.close()
+                self.store.flush()
+            instrument.count("bytes_written", sink.bytes_written)
+            if dedup_log is not None:
+                dedup_log.close()
+            if dedup_index is not None and scope == "global":
+                with self._dedup_lock:
+                    dedup_index.save(self._dedup_path(dedup_index.nbits))
+
+        save_checkpoint(self.index_dir, video_id, next_index=len(ts), total=len(ts), done=True)
+        if dedup_log is not None:
+            dedup_log.remove()
+        self._finish_report(plan, ran=True)
+
+    def refilter(
+        self, video_id: str, config: Optional[FramekoConfig] = None
+    ) -> List[ExtractedFrame]:
+        """Recompute a video's accepted frames from its recorded candidate scores.
+
+        Needs an earlier ingest with `record_candidates=True`. The dedup
+        (`enable_dedup`, `max_hamming`) and blur (`enable_blur_filter`,
+        `blur_var_threshold`) settings come from `config` (default: this instance's
+        config); dedup runs within the video, on the same hash tier ingest used.
+        Frames no longer accepted are removed from the metadata and the disk, and
+        only newly accepted frames are extracted and, if only the prefilter scored
+        them, rescored at full resolution; nothing else is decoded. Shard output
+        (tar/npy) is append-only: dropped frames lose their records but stay in the
+        shards, and new ones are appended. Returns the accepted frames in order.
+        """
+        cfg = config or self.cfg
+        cands = self.store.candidates(video_id)
+        if not cands:
+            raise FramekoError(
+                f"No candidate scores recorded for {video_id}; "
+                "ingest it with record_candidates=True first"
+            )
+        video = self._video_record(video_id)
+        if video is None:
+            raise FramekoError(f"Unknown video_id: {video_id}")
+        video_path = Path(video["video_path"])
+        info = video.get("info") or {}
+
+        # Same rule as ingest: a frame is a duplicate if it is near any earlier frame
+        # that passed dedup, whether or not that one later failed the blur check.
+        # Low-resolution (prefilter) and full-resolution hashes are never compared.
+        keep = np.ones(len(cands), dtype=bool)
+        if cfg.enable_dedup:
+            tiers: Dict[bool, List[int]] = {}
+            for k, c in enumerate(cands):
+                tiers.setdefault(c.get("prefilter_dhash") is not None, []).append(k)
+            for rows in tiers.values():
+                values = [_dedup_hash(cands[k]) for k in rows]
+                nbits = max(64, max(v.bit_length() for v in values))
+                hashes = ints_to_hashes(values, nbits=nbits)
+                keep[rows] = greedy_dedup(hashes, int(cfg.max_hamming))
+        thr = float(cfg.blur_var_threshold) if cfg.enable_blur_filter else None
+
+        status: Dict[int, str] = {}
+        for c, kept in zip(cands, keep):
+            bv = c.get("blur_var")
+            if not kept:
+                status[c["frame_idx"]] = "duplicate"
+            elif thr is not None and bv is not None and bv < thr:
+                status[c["frame_idx"]] = "blurry"
+            else:
+                status[c["frame_idx"]] = _quality_reason(cfg, _quality_values(c)) or "accepted"
+
+        current = {r.frame_idx: r for r in self._load_frames(video_id)}
+        dropped = [r for k, r in current.items() if status.get(k) != "accepted"]
+        added = [
+            c
+            for c in cands
+            if status[c["frame_idx"]] == "accepted" and c["frame_idx"] not in current
+        ]
+
+        kept_frames = [r for k, r in current.items() if status.get(k) == "accepted"]
+        sink = self._open_sink(video_id, info, kept_frames)
+        new_frames: List[ExtractedFrame] = []
+        rescored: Dict[int, Dict[str, Any]] = {}
+        try:
+            idx = [int(c["frame_idx"]) for c in added]
+            out_paths = [sink.staging_path(i, self._frame_uid64(video_id, i)) for i in idx]
+            extract_frames(
+                video_path,
+                [float(c["t_sec"]) for c in added],
+                out_paths,
+                jpeg_quality=cfg.jpeg_quality,
+                fps=decode_fps(info),
+                video_start=info.get("video_start", 0.0),
+                strategy=getattr(cfg, "extract_strategy", "auto"),
+                max_workers=int(getattr(cfg, "max_workers", 1)),
+            )
+
+            signals = self._quality_signals(cfg)
+            for c, out_path in zip(added, out_paths):
+                i = int(c["frame_idx"])
+                if c.get("blur_var") is None:
+                    # Rejected by the prefilter tier, so only low-resolution scores
+                    # exist: score it at full resolution like ingest would have
+                    m = frame_metrics(out_path, hash_size=cfg.dhash_size, blur=True, **signals)
+                    rescored[i] = {"dhash": m.dhash, "blur_var": m.blur_var, **_quality_values(m)}
+                    c = {**c, **rescored[i]}
+                    reason = _quality_reason(cfg, _quality_values(m))
+                    if thr is not None and m.blur_var is not None and m.blur_var < thr:
+                        reason = "blurry"
+                    if reason is not None:
+                        status[i] = reason
+                        self._discard(out_path)
+                        continue
+                bv = c.get("blur_var")
+                rec = ExtractedFrame(
+                    frame_uid=self._frame_uid64(video_id, i),
+                    t_sec=float(c["t_sec"]),
+                    scene_idx=int(c["scene_idx"]),
+                    frame_path=str(out_path),
+                    dhash=int(c["dhash"]),
+                    blur_var=bv if thr is not None else None,
+                    frame_idx=i,
+                    prefilter_dhash=c.get("prefilter_dhash"),
+                    prefilter_blur_var=c.get("prefilter_blur_var"),
+                    **_quality_values(c),
+                )
+                rec = self._store_frame(video_id, sink, rec, None)
+                self._record_frame(video_id, rec)
+                new_frames.append(rec)
+        finally:
+            sink.close()
+
+        self.store.delete_frames(video_id, [r.frame_uid for r in dropped])
+        for r in dropped:
+            # Frames inside shards stay there; only their records go
+            if r.shard_offset is None:
+                self._discard(Path(r.frame_path))
+        for c in cands:
+            k = c["frame_idx"]
+            if c.get("status") != status[k] or k in rescored:
+                self.store.add_candidate({**c, **rescored.get(k, {}), "status": status[k]})
+        self.store.flush()
+        self._reindex_frames(video_id, new_frames, [r.frame_uid for r in dropped])
+
+        return sorted(kept_frames + new_frames, key=lambda r: r.frame_idx)
+
+    def _quality_signals(self, config: Optional[FramekoConfig] = None) -> Dict[str, Any]:
+        """`frame_metrics` switches for the enabled quality rules."""
+        cfg = config or self.cfg
+        return {
+            "luma": bool(getattr(cfg, "enable_luma_filter", False)),
+            "contrast": bool(getattr(cfg, "enable_contrast_filter", False)),
+            "uniform": bool(getattr(cfg, "enable_uniform_filter", False)),
+            "uniform_tol": float(getattr(cfg, "uniform_tol", 2.0)),
+        }
+
+    def _prefilter(
+        self,
+        plan: _IngestPlan,
+        todo: List[int],
+        dedup_index: Optional[HammingIndex],
+        dedup_log: Optional[DedupLog] = None,
+    ) -> Tuple[List[int], Dict[int, Tuple[int, Optional[float]]]]:
+        """Score `todo` on a small grayscale decode and drop duplicates and clearly
+        blurry frames.
+
+        Returns the surviving positions and the low-resolution `(dhash, blur_var)`
+        of each of them. Survivors still go through the full-resolution blur check.
+        """
+        size = display_size(plan.info)
+        if size is None:
+            return todo, {}
+        small = _scaled_size(size, int(getattr(self.cfg, "prefilter_width", 160)))
+        record = bool(getattr(self.cfg, "record_candidates", False))
+        thr = self._prefilter_blur_threshold(plan, small) if self.cfg.enable_blur_filter else None
+
+        scores: Dict[int, Tuple[int, Optional[float]]] = {}
+        for j, gray in iter_raw_frames(
+            plan.video_path,
+            [float(plan.ts[i][0]) for i in todo],
+            size=small,
+            fps=decode_fps(plan.info),
+            video_start=plan.info.get("video_start", 0.0),
+            pix_fmt="gray",
+            strategy=getattr(self.cfg, "extract_strategy", "auto"),
+            keyframes=plan.keyframes,
+        ):
+            m = frame_metrics(
+                gray, hash_size=self.cfg.dhash_size, blur=thr is not None or record
+            )
+            scores[todo[j]] = (m.dhash, m.blur_var)
+
+        def reject(i: int, status: str) -> None:
+            instrument.reject(status)
+            # Only low-resolution scores exist for frames this tier rejects
+            if record:
+                dh, bv = scores[i]
+                self._record_candidate(
+                    plan.video_id, i, plan.ts[i], dh, None, status, prefilter=(dh, bv)
+                )
+
+        # Decisions in timestamp order, exactly like the full-resolution path
+        keep: List[int] = []
+        for i in todo:
+            dh, bv = scores[i]
+            if dedup_index is not None:
+                with self._dedup_lock:
+                    is_dup = dedup_index.find(dh) is not None
+                    if not is_dup:
+                        dedup_index.add(dh)
+                if is_dup:
+                    reject(i, "duplicate")
+                    continue
+                if dedup_log is not None:
+                    dedup_log.add(i, dh)
+            if thr is not None and bv is not None and bv < thr:
+                reject(i, "blurry")
+                continue
+            keep.append(i)
+        return keep, {i: scores[i] for i in keep}
+
+    def _prefilter_blur_threshold(self, plan: _IngestPlan, small: Tuple[int, int]) -> float:
+        """Blur threshold for the low-resolution tier.
+
+        Laplacian variance depends on resolution, so unless
+        `prefilter_blur_var_threshold` is set, a few frames are decoded at both
+        sizes and the full-resolution threshold is scaled by the median ratio of
+        their scores (cached per video). The result is lowered by a safety margin
+        since the tier should only drop frames the full check would also drop.
+        """
+        fixed = getattr(self.cfg, "prefilter_blur_var_threshold", None)
+        if fixed is not None:
+            return float(fixed)
+
+        n = max(1, int(getattr(self.cfg, "prefilter_calibration_frames", 12)))
+        ts = plan.ts
+        picks = sorted({int(k * (len(ts) - 1) / max(1, n - 1)) for k in range(n)}) if ts else []
+        times = [float(ts[k][0]) for k in picks]
+
+        def measure() -> float:
+            full_size = display_size(plan.info)
+            assert full_size is not None
+            scores = []
+            for size in (full_size, small):
+                frames = dict(
+                    iter_raw_frames(
+                        plan.video_path,
+                        times,
+                        size=size,
+                        fps=decode_fps(plan.info),
+                        video_start=plan.info.get("video_start", 0.0),
+                        pix_fmt="gray",
+                        keyframes=plan.keyframes,
+                    )
+                )
+                scores.append([float(variance_of_laplacian(frames[j])) for j in range(len(times))])
+            ratios = [lo / hi for hi, lo in zip(*scores) if hi > 1e-6]
+            return float(np.median(ratios)) if ratios else 1.0
+
+        ratio = self._cached(
+            "prefilter", cache_key(plan.video_id, list(small), times), measure, refresh=False
+        )
+        return float(self.cfg.blur_var_threshold) * float(ratio) * _PREFILTER_BLUR_MARGIN
+
+    # instrumentation
+    def _recorder(self, video_path: Union[str, Path], force: bool = False) -> Optional[Recorder]:
+        """A new recorder when instrumentation is on (`force`, hooks or
+        `cfg.ingest_report`), else None so the hot path skips all bookkeeping."""
+        if force or self.hooks or getattr(self.cfg, "ingest_report", False):
+            return Recorder(video_path, self.hooks)
+        return None
+
+    def _video_record(self, video_id: str) -> Optional[Dict[str, Any]]:
+        return next((v for v in self.store.videos() if v.get("video_id") == video_id), None)
+
+    def _finish_report(self, plan: _IngestPlan, *, ran: bool) -> None:
+        """Close the plan's report. A run that processed the video attaches it to
+        the video's record (`report` in `videos.jsonl`); re-opening a finished
+        video only updates `last_report`."""
+        if plan.recorder is None:
+            return
+        report = plan.recorder.finish(plan.video_id)
+        self.last_report = report
+        if not ran:
+            return
+        video = self._video_record(plan.video_id)
+        if video is not None:
+            self.store.add_video({**video, "report": report.to_dict()})
+            self.store.flush()
+
+    # embeddings
+    def _embed_stage(self) -> Optional[EmbedPipeline]:
+        if self._embedder is None:
+            return None
+        return EmbedPipeline(
+            self._embedder,
+            load=load_frame,
+            batch_size=int(getattr(self.cfg, "embed_batch_size", 64)),
+            workers=int(getattr(self.cfg, "embed_workers", 4)),
+        )
+
+    def _vectors_path(self, video_id: str) -> Path:
+        return self.index_dir / "embeddings" / f"{video_id}.npz"
+
+    def _has_vectors(self, video_id: str) -> bool:
+        if self._embedder is None:
+            return True
+        if self.backend is not None:
+            uids = [r.frame_uid for r in self._load_frames(video_id)]
+            return bool(self.backend.contains(np.asarray(uids, dtype=np.uint64)).all())
+        saved = load_vectors(self._vectors_path(video_id))
+        return saved is not None and saved[2] == self._embedder.name
+
+    def _finish_embedding(self, video_id: str, stage: Optional[EmbedPipeline]) -> None:
+        """Store the vectors of every frame `stage` saw, replacing the video's old ones."""
+        if stage is None:
+            return
+        with instrument.timed("embed_wait"):
+            vectors = stage.finish()
+        self.last_embed_stats = list(stage.stats)
+        uids = [r.frame_uid for r in stage.keys]
+        if self.backend is not None:
+            self.backend.upsert(ids=np.asarray(uids, dtype=np.uint64), vectors=vectors)
             self.backend.save()
+        else:
+            save_vectors(self._vectors_path(video_id), uids, vectors, self._embedder.name)
+
+    def _reindex_frames(
+        self, video_id: str, added: List[ExtractedFrame], removed: List[int]
+    ) -> None:
+        """Embed `added` frames and forget the vectors of `removed` frame uids."""
+        if self._embedder is None:
+            return
+        stage = self._embed_stage()
+        assert stage is not None
+        try:
+            for rec in added:
+                stage.add(rec)
+            vectors = stage.finish()
+            self.last_embed_stats = list(stage.stats)
+        finally:
+            stage.close()
+        uids = np.asarray([r.frame_uid for r in added], dtype=np.uint64)
+        if self.backend is not None:
+            if removed:
+                self.backend.remove(np.asarray(removed, dtype=np.uint64))
+            self.backend.upsert(ids=uids, vectors=vectors)
+            self.backend.save()
+            return
+
+        saved = load_vectors(self._vectors_path(video_id))
+        old_uids = saved[0] if saved is not None else np.zeros(0, dtype=np.uint64)
+        old_vecs = saved[1] if saved is not None else np.zeros((0, vectors.shape[1]), np.float32)
+        keep = ~np.isin(old_uids, np.concatenate([uids, np.asarray(removed, dtype=np.uint64)]))
+        save_vectors(
+            self._vectors_path(video_id),
+            np.concatenate([old_uids[keep], uids]),
+            np.concatenate([old_vecs[keep], vectors]),
+            self._embedder.name,
+        )
+
+    def embeddings(self, video_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """`(frame_uids, vectors)` stored for a video (empty if it was not embedded)."""
+        if self.backend is not None:
+            uids = [r.frame_uid for r in self._load_frames(video_id)]
+            return self.backend.get(np.asarray(uids, dtype=np.uint64))
+        saved = load_vectors(self._vectors_path(video_id))
+        if saved is None:
+            return np.zeros(0, dtype=np.uint64), np.zeros((0, 0), dtype=np.float32)
+        return saved[0], saved[1]
+
+    def search(
+        self,
+        query: Any,
+        k: int = 10,
+        *,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Frames most similar to `query`, best first.
+
+        `query` is an embedding vector (1-D array), an image path or RGB array, or a
+        frame record from `frames()`. Each hit is the frame's metadata record plus
+        a `score` (inner product with the query). After `build_ivf` the search is
+        approximate unless `exact=True`.
+        """
+        if self._embedder is None or self.backend is None:
+            raise FramekoError("search needs an embedder and a vector backend")
+        if isinstance(query, np.ndarray) and query.ndim == 1:
+            vec = query.astype(np.float32, copy=False)
+        else:
+            image = load_frame(query) if isinstance(query, (dict, ExtractedFrame)) else query
+            vec = self._embedder.encode_images([image])[0]
+        ids, scores = self.backend.search(vec[None, :], int(k), nprobe=nprobe, exact=exact)
+        hits = [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if np.isfinite(s)]
+        records = self.store.get_frames([uid for uid, _ in hits])
+        return [
+            {**records[uid], "score": score} for uid, score in hits if uid in records
+        ]
 
-        return video_id
+    def build_ivf(self, nlist: Optional[int] = None, **kwargs: Any) -> None:
+        """Train the vector index's coarse clusters so `search` probes only a
+        fraction of the vectors (see `LocalVectorIndex.build_ivf`)."""
+        if self.backend is None:
+            raise FramekoError("build_ivf needs an embedder and a vector backend")
+        self.backend.build_ivf(nlist, **kwargs)
 
     def close(self) -> None:
+        self.store.close()
         if getattr(self, "backend", None) is not None:
             self.backend.close()
@@ -0,0 +1,472 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from .checkpoint import load_checkpoint, save_checkpoint
+from .config import FramekoConfig
+from .core import Frameko, IngestResult
+from .errors import ConfigError
+from .pipelines.dedup import HammingIndex
+from .store import MetadataStore, open_store
+from .vectors import LocalVectorIndex
+
+# Layout of a sharded ingest root:
+#   leases/<key>.lease    claim on a manifest entry (held while a worker ingests it)
+#   leases/<key>.done     the entry is finished (JSON: video_id, worker, frames)
+#   leases/<key>.failed   the entry failed (JSON: error); skipped unless retried
+#   workers/<worker_id>/  a regular index directory owned by one worker
+LEASES = "leases"
+WORKERS = "workers"
+
+_CANDIDATE_FIELDS = ("video_id", "frame_idx", "t_sec", "scene_idx", "dhash", "blur_var")
+
+
+def read_manifest(path: Union[str, Path]) -> List[str]:
+    """Video paths listed in `path`, one per line.
+
+    Blank lines and lines starting with `#` are skipped; relative paths are taken
+    relative to the manifest's directory.
+    """
+    path = Path(path)
+    out: List[str] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        p = Path(line)
+        out.append(str(p if p.is_absolute() else path.parent / p))
+    return out
+
+
+def entry_key(entry: str) -> str:
+    """Lease name of a manifest entry."""
+    return hashlib.sha1(entry.encode("utf-8")).hexdigest()[:20]
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _write_atomic(path: Path, data: Dict[str, Any]) -> None:
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class Lease:
+    """Exclusive claim on one manifest entry, shared through the filesystem.
+
+    The lease file is created with `O_CREAT | O_EXCL`, which is atomic on local
+    filesystems and NFSv3+. Its holder touches it every `ttl_sec / 4` seconds;
+    a lease untouched for `ttl_sec` belongs to a dead worker and may be taken
+    over. Clocks of the machines involved must roughly agree, and a worker id
+    must be used by one process at a time: a live lease of the same owner is
+    taken as left behind by a crash.
+    """
+
+    def __init__(self, leases_dir: Path, key: str, owner: str, ttl_sec: float) -> None:
+        self.path = Path(leases_dir) / f"{key}.lease"
+        self.owner = owner
+        self.ttl_sec = float(ttl_sec)
+        self.token = uuid.uuid4().hex
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def acquire(self) -> bool:
+        if self._create():
+            return True
+        if not self._stale():
+            # Left behind by an earlier process of this worker: resume right away
+            data = _read_json(self.path)
+            if data is None or data.get("owner") != self.owner:
+                return False
+            _write_atomic(self.path, {**data, "token": self.token, "pid": os.getpid()})
+            self._start_heartbeat()
+            return True
+        # Take over a dead worker's lease: only one of the racing workers can
+        # rename it away; a fresh lease moved by mistake is put back.
+        moved = self.path.with_name(f"{self.path.name}.stale-{self.token}")
+        try:
+            os.rename(self.path, moved)
+        except FileNotFoundError:
+            return self._create()
+        if time.time() - moved.stat().st_mtime <= self.ttl_sec:
+            try:
+                os.link(moved, self.path)
+            except FileExistsError:
+                pass
+            moved.unlink(missing_ok=True)
+            return False
+        moved.unlink(missing_ok=True)
+        return self._create()
+
+    def _create(self) -> bool:
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "owner": self.owner,
+                    "token": self.token,
+                    "host": socket.gethostname(),
+                    "pid": os.getpid(),
+                    "acquired_at": time.time(),
+                },
+                f,
+            )
+        self._start_heartbeat()
+        return True
+
+    def _start_heartbeat(self) -> None:
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
+
+    def _stale(self) -> bool:
+        try:
+            return time.time() - self.path.stat().st_mtime > self.ttl_sec
+        except FileNotFoundError:
+            return True
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(max(0.05, self.ttl_sec / 4)):
+            # Once another worker has taken the lease over, touching the file would
+            # keep the new owner's lease alive on our behalf
+            if not self.held():
+                return
+            try:
+                os.utime(self.path)
+            except OSError:
+                return
+
+    def held(self) -> bool:
+        """Whether the lease file still carries this lease's token."""
+        data = _read_json(self.path)
+        return data is not None and data.get("token") == self.token
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.held():
+            self.path.unlink(missing_ok=True)
+
+
+def run_worker(
+    root: Union[str, Path],
+    entries: Sequence[str],
+    *,
+    worker_id: Optional[str] = None,
+    config: Optional[FramekoConfig] = None,
+    preset: str = "default",
+    lease_ttl_sec: float = 600.0,
+    max_videos: Optional[int] = None,
+    retry_failed: bool = False,
+    progress: Optional[Callable[[IngestResult], None]] = None,
+    **ingest_kwargs: Any,
+) -> List[IngestResult]:
+    """Ingest manifest `entries` under `root` next to any number of other workers.
+
+    Each worker claims videos one at a time through lease files under
+    `root/leases` and writes only to its own index, `root/workers/<worker_id>`,
+    so workers on different machines sharing `root` never touch the same file.
+    Finished entries are marked `.done` and failed ones `.failed` (retried with
+    `retry_failed`). A worker that dies mid-video leaves its lease to expire
+    after `lease_ttl_sec`; the video is then redone by another worker, and a
+    restarted worker with the same `worker_id` resumes its own partial runs. A
+    worker whose lease was taken over while it stalled drops its result instead
+    of marking the entry; `merge_indexes` takes a video from one source only.
+    Combine the worker indexes with `merge_indexes`.
+
+    Workers start at different offsets of the manifest to avoid contending for
+    the same leases. `ingest_kwargs` are the keyword arguments of `ingest`.
+    """
+    root = Path(root)
+    worker_id = worker_id or default_worker_id()
+    if "/" in worker_id or worker_id in {"", ".", ".."}:
+        raise ConfigError(f"Invalid worker id: {worker_id!r}")
+    leases_dir = root / LEASES
+    leases_dir.mkdir(parents=True, exist_ok=True)
+
+    n = len(entries)
+    offset = int(hashlib.sha1(worker_id.encode("utf-8")).hexdigest(), 16) % n if n else 0
+    order = [entries[(offset + i) % n] for i in range(n)]
+
+    results: List[IngestResult] = []
+    fk = Frameko(root / WORKERS / worker_id, preset=preset, config=config)
+    try:
+        for entry in order:
+            if max_videos is not None and len(results) >= max_videos:
+                break
+            key = entry_key(entry)
+            done = leases_dir / f"{key}.done"
+            failed = leases_dir / f"{key}.failed"
+            if done.exists() or (failed.exists() and not retry_failed):
+                continue
+            lease = Lease(leases_dir, key, worker_id, lease_ttl_sec)
+            if not lease.acquire():
+                continue
+            try:
+                # Another worker may have finished it between the check and the claim
+                if done.exists():
+                    continue
+                res = fk.ingest_many([entry], max_videos_in_flight=1, prefetch=1, **ingest_kwargs)
+                res = res[0]
+                if not lease.held():
+                    # Taken over while we stalled: the new holder owns the outcome
+                    continue
+                marker = {"entry": entry, "worker": worker_id, "finished_at": time.time()}
+                if res.ok:
+                    marker.update(video_id=res.video_id, frames=res.n_frames)
+                    _write_atomic(done, marker)
+                    failed.unlink(missing_ok=True)
+                else:
+                    _write_atomic(failed, {**marker, "error": res.error})
+                results.append(res)
+                if progress is not None:
+                    progress(res)
+            finally:
+                lease.release()
+    finally:
+        fk.close()
+    return results
+
+
+@dataclass
+class MergeResult:
+    videos: int = 0  # videos added to the destination
+    frames: int = 0  # frame records written
+    duplicates: int = 0  # frames dropped by global dedup
+    skipped: int = 0  # videos already merged or finished by another source
+
+
+def _source_config(src: Path) -> FramekoConfig:
+    data = _read_json(src / "config.json")
+    return FramekoConfig.from_dict(data) if data is not None else FramekoConfig()
+
+
+def _open_source_store(src: Path) -> MetadataStore:
+    backend = getattr(_source_config(src), "metadata_backend", "jsonl")
+    return open_store(src, backend=backend)
+
+
+def _relocate(path: str, src: Path, dest: Path) -> Optional[Path]:
+    """Where a file of index `src` goes in `dest` (None: outside the index)."""
+    p = Path(path)
+    for base in (src, src.resolve()):
+        try:
+            return dest / p.relative_to(base)
+        except ValueError:
+            pass
+    try:
+        return dest / p.resolve().relative_to(src.resolve())
+    except (OSError, ValueError):
+        return None
+
+
+def _transfer(src: Path, dst: Path, link: bool) -> None:
+    if dst.exists():
+        return
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    tmp = dst.with_name(f".tmp-{dst.name}")
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def worker_dirs(root: Union[str, Path]) -> List[Path]:
+    """The worker index directories under a sharded ingest root, sorted by name."""
+    base = Path(root) / WORKERS
+    return sorted(p for p in base.iterdir() if p.is_dir()) if base.exists() else []
+
+
+def merge_indexes(
+    sources: Iterable[Union[str, Path]],
+    dest: Union[str, Path],
+    *,
+    dedup: bool = False,
+    config: Optional[FramekoConfig] = None,
+    link: bool = False,
+) -> MergeResult:
+    """Merge finished videos of several index directories into `dest`.
+
+    Videos are added in `video_id` order and their frames in time order, so the
+    result does not depend on which worker ingested what. Only videos whose
+    checkpoint is done are taken; a video finished by several sources is taken
+    from the first. Frame files and shards are copied (hard-linked with `link`)
+    to the same relative place, and records, candidates, checkpoints and
+    vectors follow. Merging again later only adds what is new.
+
+    With `dedup`, a frame within `max_hamming` of any frame merged before it, in
+    this run or an earlier one, is dropped across videos (its candidate record
+    becomes `duplicate`), and the hashes are kept in `dest`'s global dedup index.
+    Frames inside tar/npy shards stay in the shard file; only their records go.
+
+    `config` is written to `dest` and defaults to the first source's.
+    """
+    srcs = [Path(s) for s in sources]
+    dest = Path(dest)
+    cfg = config or (_source_config(srcs[0]) if srcs else FramekoConfig())
+    dest.mkdir(parents=True, exist_ok=True)
+    cfg.save_json(dest / "config.json")
+    store = open_store(
+        dest,
+        backend=getattr(cfg, "metadata_backend", "jsonl"),
+        batch_size=int(getattr(cfg, "metadata_batch_size", 256)),
+    )
+    result = MergeResult()
+
+    nbits = int(cfg.dhash_size) ** 2
+    dedup_path = dest / "dedup" / f"dhash{nbits}.u64"
+    index: Optional[HammingIndex] = None
+    if dedup:
+        index = HammingIndex.load(dedup_path, nbits=nbits, radius=int(cfg.max_hamming))
+        if not len(index):
+            for rec in store.frames():
+                index.add(int(rec["dhash"]))
+
+    src_stores = [_open_source_store(s) for s in srcs]
+    vectors: Dict[str, LocalVectorIndex] = {}
+    try:
+        # video_id -> (source number, video record), first finished source wins
+        picked: Dict[str, Any] = {}
+        for n, (src, src_store) in enumerate(zip(srcs, src_stores)):
+            for rec in src_store.videos():
+                vid = rec["video_id"]
+                ckpt = load_checkpoint(src, vid)
+                if not (ckpt and ckpt.get("done")):
+                    continue
+                if vid in picked or _done(dest, vid):
+                    result.skipped += 1
+                    continue
+                picked[vid] = (n, rec, ckpt)
+
+        for vid in sorted(picked):
+            n, video, ckpt = picked[vid]
+            src, src_store = srcs[n], src_stores[n]
+            kept, dropped = _merge_frames(src, src_store, dest, store, vid, index, link)
+            for cand in src_store.candidates(vid):
+                store.add_candidate(cand)
+            for rec in dropped:
+                cand = {k: rec.get(k) for k in _CANDIDATE_FIELDS}
+                store.add_candidate({**cand, "status": "duplicate"})
+            _merge_vectors(src, dest, [int(r["frame_uid"]) for r in kept], vectors, cfg)
+            store.add_video({**video, "merged_from": src.name})
+            store.flush()
+            if index is not None:
+                index.save(dedup_path)
+            for vi in vectors.values():
+                vi.save()
+            save_checkpoint(
+                dest,
+                vid,
+                next_index=int(ckpt.get("next_index", 0)),
+                total=int(ckpt.get("total", 0)),
+                done=True,
+            )
+            result.videos += 1
+            result.frames += len(kept)
+            result.duplicates += len(dropped)
+    finally:
+        for s in src_stores:
+            s.close()
+        for vi in vectors.values():
+            vi.close()
+        store.close()
+    return result
+
+
+def _done(index_dir: Path, video_id: str) -> bool:
+    ckpt = load_checkpoint(index_dir, video_id)
+    return bool(ckpt and ckpt.get("done"))
+
+
+def _merge_frames(
+    src: Path,
+    src_store: MetadataStore,
+    dest: Path,
+    store: MetadataStore,
+    video_id: str,
+    index: Optional[HammingIndex],
+    link: bool,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Copy the frames of one video, dropping global duplicates when `index` is set.
+    Returns `(kept, dropped)` records."""
+    kept: List[Dict[str, Any]] = []
+    dropped: List[Dict[str, Any]] = []
+    copied: Set[str] = set()
+    for rec in src_store.frames(video_id=video_id):
+        if index is not None:
+            h = int(rec["dhash"])
+            if index.find(h) is not None:
+                dropped.append(rec)
+                continue
+            index.add(h)
+        rec = dict(rec)
+        path = str(rec.get("frame_path", ""))
+        target = _relocate(path, src, dest) if path else None
+        if target is not None:
+            if path not in copied:
+                _transfer(Path(path), target, link)
+                copied.add(path)
+            rec["frame_path"] = str(target)
+        store.add_frame(rec)
+        kept.append(rec)
+    return kept, dropped
+
+
+def _merge_vectors(
+    src: Path,
+    dest: Path,
+    uids: List[int],
+    opened: Dict[str, LocalVectorIndex],
+    cfg: FramekoConfig,
+) -> None:
+    base = src / "vectors"
+    if not uids or not base.exists():
+        return
+    for sub in sorted(p for p in base.iterdir() if (p / "meta.json").exists()):
+        src_index = LocalVectorIndex(sub)
+        try:
+            ids, vecs = src_index.get(uids)
+        finally:
+            src_index.close()
+        if not len(ids):
+            continue
+        dst = opened.get(sub.name)
+        if dst is None:
+            dst = LocalVectorIndex(
+                dest / "vectors" / sub.name, dtype=getattr(cfg, "vector_dtype", "float32")
+            )
+            opened[sub.name] = dst
+        dst.upsert(ids, vecs)
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from .errors import ConfigError
+from .pipelines.image import ImageSource, load_rgb
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder(ABC):
+    """Maps decoded RGB frames to fixed-length float32 vectors.
+
+    Subclasses set `name` and `dim` and implement `encode`, which receives a batch
+    of uint8 (h, w, 3) arrays (sizes may differ) and returns an (n, dim) array.
+    """
+
+    name = "embedder"
+    dim = 0
+
+    @abstractmethod
+    def encode(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        """(n, dim) float32 vectors of a batch of RGB frames."""
+
+    def encode_images(self, paths: Sequence[ImageSource]) -> np.ndarray:
+        return self.encode([load_rgb(p) for p in paths])
+
+
+class ColorGradientEmbedder(Embedder):
+    """Deterministic CPU descriptor that needs no model download.
+
+    A joint RGB color histogram (`color_bins`^3 bins) concatenated with
+    magnitude-weighted gradient orientation histograms (`orient_bins` bins) over a
+    `grid` x `grid` layout, computed on a `size` x `size` thumbnail. Both halves are
+    L2-normalized, so dot products are cosine similarities in [0, 1]. Good enough
+    to find visually similar frames; swap in a learned model for semantics.
+    """
+
+    name = "color_gradient"
+
+    def __init__(self, color_bins: int = 4, orient_bins: int = 8, grid: int = 4, size: int = 64):
+        if size % grid:
+            raise ValueError("size must be a multiple of grid")
+        self.color_bins = int(color_bins)
+        self.orient_bins = int(orient_bins)
+        self.grid = int(grid)
+        self.size = int(size)
+        self.dim = self.color_bins**3 + self.grid * self.grid * self.orient_bins
+
+    def encode(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        n = len(images)
+        if n == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        from PIL import Image
+
+        s, b, ob, g = self.size, self.color_bins, self.orient_bins, self.grid
+        thumbs = np.stack(
+            [
+                np.asarray(Image.fromarray(load_rgb(im)).resize((s, s), Image.BILINEAR))
+                for im in images
+            ]
+        )  # (n, s, s, 3) uint8
+
+        # Joint color histogram, all frames in one bincount
+        q = thumbs.astype(np.int64) * b // 256
+        cidx = (q[..., 0] * b + q[..., 1]) * b + q[..., 2]
+        cidx += np.arange(n)[:, None, None] * b**3
+        color = np.bincount(cidx.ravel(), minlength=n * b**3).reshape(n, b**3)
+        color = color.astype(np.float32)
+
+        # Unsigned gradient orientations, weighted by magnitude, per grid cell
+        gray = thumbs.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        gx = np.zeros_like(gray)
+        gy = np.zeros_like(gray)
+        gx[:, :, 1:-1] = gray[:, :, 2:] - gray[:, :, :-2]
+        gy[:, 1:-1, :] = gray[:, 2:, :] - gray[:, :-2, :]
+        mag = np.hypot(gx, gy)
+        ang = np.mod(np.arctan2(gy, gx), np.pi)
+        obin = np.minimum((ang * (ob / np.pi)).astype(np.int64), ob - 1)
+        cell = (np.arange(s) // (s // g))
+        cell_idx = cell[:, None] * g + cell[None, :]
+        gidx = (cell_idx[None] * ob + obin) + np.arange(n)[:, None, None] * (g * g * ob)
+        grad = np.bincount(gidx.ravel(), weights=mag.ravel(), minlength=n * g * g * ob)
+        grad = grad.reshape(n, g * g * ob).astype(np.float32)
+
+        out = np.concatenate([_l2(color), _l2(grad)], axis=1) / np.sqrt(2.0)
+        return out.astype(np.float32, copy=False)
+
+
+class CallableEmbedder(Embedder):
+    """Wraps `fn(images) -> (n, d) array` (e.g. a model's forward pass)."""
+
+    def __init__(self, fn: Callable[[List[np.ndarray]], Any], name: Optional[str] = None):
+        self.fn = fn
+        self.name = name or getattr(fn, "__name__", "callable")
+        self.dim = 0  # known after the first batch
+
+    def encode(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        out = np.asarray(self.fn(list(images)), dtype=np.float32)
+        if out.ndim != 2 or out.shape[0] != len(images):
+            raise ValueError(
+                f"embedder {self.name} returned shape {out.shape} for {len(images)} images"
+            )
+        self.dim = int(out.shape[1])
+        return out
+
+
+def _l2(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+EMBEDDERS: Dict[str, Type[Embedder]] = {"color_gradient": ColorGradientEmbedder}
+
+
+def get_embedder(spec: Any) -> Optional[Embedder]:
+    """Resolve an embedder spec: None/"none", a name from `EMBEDDERS`, an
+    `Embedder` instance or a plain callable."""
+    if spec is None or spec == "none":
+        return None
+    if isinstance(spec, Embedder):
+        return spec
+    if isinstance(spec, str):
+        if spec not in EMBEDDERS:
+            raise ConfigError(f"Unknown embedder: {spec} (known: {sorted(EMBEDDERS)})")
+        return EMBEDDERS[spec]()
+    if callable(spec):
+        return CallableEmbedder(spec)
+    raise ConfigError(f"Unsupported embedder: {spec!r}")
+
+
+@dataclass(frozen=True)
+class BatchStats:
+    batch: int
+    size: int
+    decode_wait_sec: float  # waiting on prefetched decodes once the batch was due
+    encode_sec: float
+    frames_per_sec: float  # size / encode_sec
+
+
+class EmbedPipeline:
+    """Embeds frames while they are still being produced.
+
+    `add` queues a frame; frames without a decoded array are loaded with
+    `load(key)` on `workers` prefetch threads. Every `batch_size` frames form a
+    batch that one background thread encodes, so decoding, encoding and the
+    caller's own work (extraction) overlap. At most `max_batches` batches wait for
+    the encoder before `add` blocks. `finish` returns the vectors in `add` order.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        *,
+        load: Callable[[Any], np.ndarray],
+        batch_size: int = 64,
+        workers: int = 4,
+        max_batches: int = 2,
+        on_batch: Optional[Callable[[BatchStats], None]] = None,
+    ) -> None:
+        self.embedder = embedder
+        self.load = load
+        self.batch_size = max(1, int(batch_size))
+        self.max_batches = max(1, int(max_batches))
+        self.on_batch = on_batch
+        self.keys: List[Any] = []
+        self.stats: List[BatchStats] = []
+        self._decode = ThreadPoolExecutor(
+            max_workers=max(1, int(workers)), thread_name_prefix="frameko-decode"
+        )
+        self._encode = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frameko-embed")
+        self._images: List[Future] = []  # decodes of the batch being filled
+        self._batches: List[Future] = []
+
+    def add(self, key: Any, image: Optional[np.ndarray] = None) -> None:
+        self.keys.append(key)
+        if image is not None:
+            fut: Future = Future()
+            fut.set_result(image)
+        else:
+            fut = self._decode.submit(self.load, key)
+        self._images.append(fut)
+        if len(self._images) >= self.batch_size:
+            self._submit()
+
+    def _submit(self) -> None:
+        # Backpressure: bound the decoded frames held in memory
+        while True:
+            busy = [f for f in self._batches if not f.done()]
+            if len(busy) < self.max_batches:
+                break
+            wait(busy[:1])
+        images, self._images = self._images, []
+        self._batches.append(self._encode.submit(self._run, len(self._batches), images))
+
+    def _run(self, n: int, images: List[Future]) -> np.ndarray:
+        t0 = time.perf_counter()
+        arrays = [f.result() for f in images]
+        t1 = time.perf_counter()
+        vectors = np.asarray(self.embedder.encode(arrays), dtype=np.float32)
+        t2 = time.perf_counter()
+        stats = BatchStats(
+            batch=n,
+            size=len(arrays),
+            decode_wait_sec=t1 - t0,
+            encode_sec=t2 - t1,
+            frames_per_sec=len(arrays) / max(t2 - t1, 1e-9),
+        )
+        self.stats.append(stats)
+        logger.info(
+            "embed batch %d: %d frames, %.1f frames/s (decode wait %.3fs)",
+            n,
+            stats.size,
+            stats.frames_per_sec,
+            stats.decode_wait_sec,
+        )
+        if self.on_batch is not None:
+            self.on_batch(stats)
+        return vectors
+
+    def finish(self) -> np.ndarray:
+        """Encode what is left and return all vectors, one row per `add`."""
+        if self._images:
+            self._submit()
+        parts = [f.result() for f in self._batches]
+        if not parts:
+            return np.zeros((0, int(self.embedder.dim)), dtype=np.float32)
+        return np.concatenate(parts, axis=0)
+
+    def close(self) -> None:
+        for f in self._images + self._batches:
+            f.cancel()
+        self._encode.shutdown(wait=True)
+        self._decode.shutdown(wait=True)
+
+
+def save_vectors(path: Path, uids: Sequence[int], vectors: np.ndarray, embedder: str) -> None:
+    """Atomically write `frame_uid` -> vector rows to an `.npz` file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".npz", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                frame_uid=np.asarray(uids, dtype=np.uint64),
+                vectors=np.asarray(vectors, dtype=np.float32),
+                embedder=np.array(embedder),
+            )
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def load_vectors(path: Path) -> Optional[Tuple[np.ndarray, np.ndarray, str]]:
+    """`(frame_uids, vectors, embedder name)` from `save_vectors`, or None."""
+    try:
+        with np.load(Path(path)) as z:
+            return z["frame_uid"], z["vectors"], str(z["embedder"])
+    except (OSError, KeyError, ValueError):
+        return None
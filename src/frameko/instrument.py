@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class IngestReport:
+    """Where the time of one ingest went and what it produced.
+
+    `stages` are seconds per stage. Stages that run on worker threads (`score`,
+    `extract` with `max_workers > 1`) add up the time of every thread, so their
+    sum can exceed `wall_sec`. `subprocesses` counts ffmpeg/ffprobe runs per tool
+    and `subprocess_sec` the time spent waiting on them. `rejected` counts frames
+    per rejection status (`duplicate`, `blurry`, `blank`, ...).
+    """
+
+    video_path: str
+    video_id: Optional[str] = None
+    wall_sec: float = 0.0
+    stages: Dict[str, float] = field(default_factory=dict)
+    subprocesses: Dict[str, int] = field(default_factory=dict)
+    subprocess_sec: Dict[str, float] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    rejected: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def bytes_written(self) -> int:
+        return int(self.counters.get("bytes_written", 0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["wall_sec"] = round(self.wall_sec, 6)
+        d["stages"] = {k: round(v, 6) for k, v in self.stages.items()}
+        d["subprocess_sec"] = {k: round(v, 6) for k, v in self.subprocess_sec.items()}
+        return d
+
+
+class IngestHooks:
+    """Callbacks for metrics adapters (Prometheus, OpenTelemetry, ...).
+
+    Every method is a no-op; override the ones you need. They are called
+    synchronously, possibly from worker threads, so keep them cheap and
+    thread-safe.
+    """
+
+    def on_stage(self, report: IngestReport, stage: str, seconds: float) -> None:
+        pass
+
+    def on_count(self, report: IngestReport, name: str, n: int) -> None:
+        pass
+
+    def on_subprocess(self, report: IngestReport, tool: str, seconds: float) -> None:
+        pass
+
+    def on_report(self, report: IngestReport) -> None:
+        pass
+
+
+class Recorder:
+    """Collects the `IngestReport` of one video.
+
+    Code on the ingest path reports through the module functions (`timed`,
+    `count`, `reject`, `subprocess_done`), which find the recorder activated for
+    the current context and do nothing when there is none.
+    """
+
+    def __init__(self, video_path: Any, hooks: Sequence[IngestHooks] = ()) -> None:
+        self.report = IngestReport(video_path=str(video_path))
+        self.hooks = list(hooks)
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.report.stages[stage] = self.report.stages.get(stage, 0.0) + seconds
+        for h in self.hooks:
+            h.on_stage(self.report, stage, seconds)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.report.counters[name] = self.report.counters.get(name, 0) + int(n)
+        for h in self.hooks:
+            h.on_count(self.report, name, int(n))
+
+    def reject(self, status: str, n: int = 1) -> None:
+        with self._lock:
+            self.report.rejected[status] = self.report.rejected.get(status, 0) + int(n)
+        for h in self.hooks:
+            h.on_count(self.report, f"rejected.{status}", int(n))
+
+    def subprocess(self, tool: str, seconds: float) -> None:
+        with self._lock:
+            r = self.report
+            r.subprocesses[tool] = r.subprocesses.get(tool, 0) + 1
+            r.subprocess_sec[tool] = r.subprocess_sec.get(tool, 0.0) + seconds
+        for h in self.hooks:
+            h.on_subprocess(self.report, tool, seconds)
+
+    @contextmanager
+    def active(self) -> Iterator["Recorder"]:
+        """Make this the recorder of the current context (and of the threads
+        `concurrency.ordered_map` starts from it)."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def finish(self, video_id: str) -> IngestReport:
+        self.report.video_id = video_id
+        self.report.wall_sec = time.perf_counter() - self._t0
+        for h in self.hooks:
+            h.on_report(self.report)
+        return self.report
+
+
+_current: ContextVar[Optional[Recorder]] = ContextVar("frameko_recorder", default=None)
+
+
+def current() -> Optional[Recorder]:
+    return _current.get()
+
+
+class _Timer:
+    __slots__ = ("rec", "stage", "t0")
+
+    def __init__(self, rec: Recorder, stage: str) -> None:
+        self.rec = rec
+        self.stage = stage
+
+    def __enter__(self) -> None:
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.rec.add_time(self.stage, time.perf_counter() - self.t0)
+
+
+class _Null:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+_NULL = _Null()
+
+
+def activate(rec: Optional[Recorder]) -> ContextManager[Any]:
+    """`rec.active()`, or a no-op when `rec` is None."""
+    return _NULL if rec is None else rec.active()
+
+
+def timed(stage: str) -> ContextManager[None]:
+    """Context manager adding the block's wall time to `stage`."""
+    rec = _current.get()
+    return _NULL if rec is None else _Timer(rec, stage)
+
+
+def count(name: str, n: int = 1) -> None:
+    rec = _current.get()
+    if rec is not None:
+        rec.count(name, n)
+
+
+def reject(status: str, n: int = 1) -> None:
+    rec = _current.get()
+    if rec is not None:
+        rec.reject(status, n)
+
+
+def subprocess_done(cmd: List[str], seconds: float) -> None:
+    """Record one finished ffmpeg/ffprobe run of `seconds`."""
+    rec = _current.get()
+    if rec is not None:
+        rec.subprocess(Path(cmd[0]).name if cmd else "?", seconds)
+
+
+def timed_iter(items: Iterator[T], stage: str) -> Iterator[T]:
+    """`items`, with the time spent producing each one added to `stage` (e.g. a
+    lazy decoder). Returns `items` itself when nothing is recording."""
+    rec = _current.get()
+    if rec is None:
+        return items
+    return _timed_iter(rec, items, stage)
+
+
+def _timed_iter(rec: Recorder, items: Iterator[T], stage: str) -> Iterator[T]:
+    it = iter(items)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                rec.add_time(stage, time.perf_counter() - t0)
+            yield item
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
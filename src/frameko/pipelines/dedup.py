@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Union
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
 import numpy as np
-from PIL import Image
 
+from .image import ImageSource, load_gray
 
-def dhash_uint64(image_path: Union[str, Path], hash_size: int = 8) -> int:
+
+def dhash_uint64(image: ImageSource, hash_size: int = 8) -> int:
     """Compute difference-hash (dHash) as uint64 integer
 
     Steps:
@@ -15,22 +16,221 @@ def dhash_uint64(image_path: Union[str, Path], hash_size: int = 8) -> int:
       2) Resize to (hash_size+1, hash_size)
       3) Compare adjacent pixels
 
-    Returns an integer bitset
+    `image` is an image path or a decoded RGB/grayscale uint8 array.
+    Returns an integer bitset (bit i is the i-th comparison, row-major); for
+    `hash_size > 8` the integer is wider than 64 bits.
+    """
+    return hashes_to_ints(dhash_batch([image], hash_size=hash_size))[0]
+
+
+def dhash_batch(
+    images: Union[Sequence[ImageSource], np.ndarray], hash_size: int = 8
+) -> np.ndarray:
+    """dHash a batch of images into packed words.
+
+    `images` is a sequence of paths/arrays or an (N, H, W) grayscale stack.
+    Returns an (N, k) uint64 array with k = ceil(hash_size**2 / 64); word j holds
+    bits 64*j .. 64*j+63 of the hash, matching `dhash_uint64` bit for bit.
     """
-    image_path = Path(image_path)
-    with Image.open(image_path) as im:
-        im = im.convert("L").resize((hash_size + 1, hash_size))
-        arr = np.asarray(im, dtype=np.int16)
+    n = len(images)
+    nbits = hash_size * hash_size
+    k = (nbits + 63) // 64
+    if n == 0:
+        return np.zeros((0, k), dtype=np.uint64)
+
+    from PIL import Image
+
+    small = np.empty((n, hash_size, hash_size + 1), dtype=np.int16)
+    for i in range(n):
+        im = Image.fromarray(load_gray(images[i])).resize((hash_size + 1, hash_size))
+        small[i] = np.asarray(im, dtype=np.int16)
+
+    bits = np.zeros((n, k * 64), dtype=bool)
+    bits[:, :nbits] = (small[:, :, 1:] > small[:, :, :-1]).reshape(n, nbits)
+    packed = np.packbits(bits, axis=1, bitorder="little")
+    return packed.view("<u8").astype(np.uint64, copy=False).reshape(n, k)
+
+
+def hashes_to_ints(words: np.ndarray) -> List[int]:
+    """Convert packed (N, k) hash words back to Python ints."""
+    if len(words) == 0:
+        return []
+    words = np.asarray(words, dtype=np.uint64).reshape(len(words), -1)
+    return [sum(int(w) << (64 * j) for j, w in enumerate(row)) for row in words.tolist()]
 
-    diff = arr[:, 1:] > arr[:, :-1]
-    bits = diff.flatten()
 
-    h = 0
-    for i, b in enumerate(bits.tolist()):
-        if b:
-            h |= 1 << i
-    return int(h)
+def ints_to_hashes(values: Sequence[int], nbits: int = 64) -> np.ndarray:
+    """Pack Python int hashes into an (N, k) uint64 array."""
+    k = (int(nbits) + 63) // 64
+    mask = (1 << 64) - 1
+    out = np.zeros((len(values), k), dtype=np.uint64)
+    for i, h in enumerate(values):
+        h = int(h)
+        for j in range(k):
+            out[i, j] = (h >> (64 * j)) & mask
+    return out
 
 
 def hamming_distance(a: int, b: int) -> int:
     return int((a ^ b).bit_count())
+
+
+# popcount of every byte value, for NumPy versions without np.bitwise_count
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount_words(x: np.ndarray) -> np.ndarray:
+    """Bit count of each (..., k) row of uint64 words."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x).sum(axis=-1, dtype=np.int64)
+    as_bytes = x.view(np.uint8).reshape(x.shape[:-1] + (x.shape[-1] * 8,))
+    return _POPCOUNT8[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+def hamming_distances(a: np.ndarray, b: np.ndarray, block: int = 1024) -> np.ndarray:
+    """Hamming distances between packed hashes.
+
+    `a` is (k,) or (M, k), `b` is (N, k). Returns (N,) or (M, N) int64 distances.
+    Rows of `a` are processed `block` at a time to bound the temporary XOR array.
+    """
+    b = np.ascontiguousarray(b, dtype=np.uint64)
+    a = np.asarray(a, dtype=np.uint64)
+    if a.ndim == 1:
+        return _popcount_words(np.bitwise_xor(b, a[None, :]))
+
+    out = np.empty((a.shape[0], b.shape[0]), dtype=np.int64)
+    for s in range(0, a.shape[0], block):
+        x = np.bitwise_xor(a[s : s + block, None, :], b[None, :, :])
+        out[s : s + block] = _popcount_words(x)
+    return out
+
+
+def greedy_dedup(hashes: np.ndarray, max_hamming: int, block: int = 1024) -> np.ndarray:
+    """Keep-mask for packed hashes, dropping any hash within `max_hamming` of an
+    earlier kept one (the same rule `ingest` applies frame by frame)."""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    n = hashes.shape[0]
+    keep = np.zeros(n, dtype=bool)
+    kept = np.zeros((0, hashes.shape[1] if hashes.ndim == 2 else 1), dtype=np.uint64)
+    for s in range(0, n, block):
+        chunk = hashes[s : s + block]
+        # Against frames kept in earlier blocks: one matrix op per block
+        if len(kept):
+            near_prev = (hamming_distances(chunk, kept) <= max_hamming).any(axis=1)
+        else:
+            near_prev = np.zeros(len(chunk), dtype=bool)
+        # Within the block the decision is sequential, but only over a small matrix
+        within = hamming_distances(chunk, chunk) <= max_hamming
+        chunk_keep = np.zeros(len(chunk), dtype=bool)
+        for i in range(len(chunk)):
+            if not near_prev[i] and not within[i, :i][chunk_keep[:i]].any():
+                chunk_keep[i] = True
+        keep[s : s + block] = chunk_keep
+        kept = np.concatenate([kept, chunk[chunk_keep]])
+    return keep
+
+
+class HammingIndex:
+    """Near-duplicate index over integer hashes (multi-index hashing).
+
+    Hashes are split into `radius + 1` disjoint bit chunks, each with its own
+    exact-match table. Any hash within `radius` bits of a query agrees with it on
+    at least one chunk (pigeonhole), so a radius query only verifies the hashes
+    that share a chunk value with the query instead of scanning everything.
+    """
+
+    def __init__(self, nbits: int = 64, radius: int = 6) -> None:
+        if nbits <= 0:
+            raise ValueError("nbits must be > 0")
+        self.nbits = int(nbits)
+        self.radius = max(0, int(radius))
+
+        m = min(self.radius + 1, self.nbits)
+        base, rem = divmod(self.nbits, m)
+        self._chunks: List[Tuple[int, int]] = []  # (shift, mask)
+        shift = 0
+        for j in range(m):
+            width = base + (1 if j < rem else 0)
+            self._chunks.append((shift, (1 << width) - 1))
+            shift += width
+
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._chunks]
+        self._hashes: List[int] = []
+        self._saved = 0
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, h: int) -> int:
+        """Insert a hash and return its position in the index."""
+        h = int(h)
+        idx = len(self._hashes)
+        self._hashes.append(h)
+        for (shift, mask), table in zip(self._chunks, self._tables):
+            table.setdefault((h >> shift) & mask, []).append(idx)
+        return idx
+
+    def _candidates(self, h: int) -> Iterator[int]:
+        seen: Set[int] = set()
+        for (shift, mask), table in zip(self._chunks, self._tables):
+            for idx in table.get((h >> shift) & mask, ()):
+                if idx not in seen:
+                    seen.add(idx)
+                    yield idx
+
+    def query(self, h: int, radius: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Return `(position, distance)` of every stored hash within `radius` bits."""
+        r = self.radius if radius is None else min(int(radius), self.radius)
+        h = int(h)
+        out = []
+        for idx in self._candidates(h):
+            d = hamming_distance(h, self._hashes[idx])
+            if d <= r:
+                out.append((idx, d))
+        return sorted(out)
+
+    def find(self, h: int, radius: Optional[int] = None) -> Optional[int]:
+        """Position of the first stored hash found within `radius` bits, if any."""
+        r = self.radius if radius is None else min(int(radius), self.radius)
+        h = int(h)
+        for idx in self._candidates(h):
+            if hamming_distance(h, self._hashes[idx]) <= r:
+                return idx
+        return None
+
+    def with_radius(self, radius: int) -> "HammingIndex":
+        """Copy of this index re-chunked for a different query radius."""
+        other = HammingIndex(nbits=self.nbits, radius=radius)
+        for h in self._hashes:
+            other.add(h)
+        other._saved = self._saved
+        return other
+
+    # persistence: an append-only file of little-endian uint64 words per hash
+    @property
+    def _words(self) -> int:
+        return (self.nbits + 63) // 64
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Append hashes added since the last load/save to `path`."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        new = self._hashes[self._saved:]
+        if not new:
+            return
+        with path.open("ab") as f:
+            f.write(ints_to_hashes(new, self.nbits).astype("<u8").tobytes())
+        self._saved = len(self._hashes)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], nbits: int = 64, radius: int = 6) -> "HammingIndex":
+        """Load an index saved with `save` (missing file -> empty index)."""
+        index = cls(nbits=nbits, radius=radius)
+        path = Path(path)
+        if path.exists():
+            k = index._words
+            arr = np.fromfile(path, dtype="<u8")
+            for h in hashes_to_ints(arr[: len(arr) - len(arr) % k].reshape(-1, k)):
+                index.add(h)
+        index._saved = len(index)
+        return index
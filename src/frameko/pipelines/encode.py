@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+
+def qscale_to_quality(q: int) -> int:
+    """Map ffmpeg's mjpeg `-q:v` (2 best .. 31 worst) onto Pillow quality (95 .. 10)."""
+    q = min(max(int(q), 2), 31)
+    return int(round(95 - (q - 2) * 85 / 29))
+
+
+def encode_image(arr: np.ndarray, out_path: Path, jpeg_quality: int = 2) -> None:
+    from PIL import Image
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    im = Image.fromarray(arr)
+    if out_path.suffix.lower() in {".jpg", ".jpeg"}:
+        im.save(out_path, format="JPEG", quality=qscale_to_quality(jpeg_quality))
+    else:
+        im.save(out_path)
+
+
+class EncoderPool:
+    """Small thread pool that writes decoded frames to image files.
+
+    Pillow releases the GIL while encoding, so threads scale across cores.
+    """
+
+    def __init__(self, max_workers: int = 4, jpeg_quality: int = 2) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.jpeg_quality = int(jpeg_quality)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="frameko-enc"
+        )
+
+    def submit(self, arr: np.ndarray, out_path: Path) -> Future:
+        return self._pool.submit(encode_image, arr, out_path, self.jpeg_quality)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+
+# Anything the scoring functions accept: an image file or a decoded uint8 array
+ImageSource = Union[str, Path, np.ndarray]
+
+
+def load_gray(image: ImageSource) -> np.ndarray:
+    """Return an 8-bit grayscale (h, w) array for a path or an RGB/gray array."""
+    from PIL import Image
+
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image.astype(np.uint8, copy=False)
+        # Same luma weights as reading the file through PIL's convert("L")
+        return np.asarray(Image.fromarray(image.astype(np.uint8, copy=False)).convert("L"))
+
+    with Image.open(Path(image)) as im:
+        return np.asarray(im.convert("L"))
+
+
+def load_rgb(image: ImageSource) -> np.ndarray:
+    """Return an 8-bit RGB (h, w, 3) array for a path or an RGB/gray array."""
+    from PIL import Image
+
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3 and image.shape[2] == 3:
+            return image.astype(np.uint8, copy=False)
+        return np.asarray(Image.fromarray(image.astype(np.uint8, copy=False)).convert("RGB"))
+
+    with Image.open(Path(image)) as im:
+        return np.asarray(im.convert("RGB"))
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .dedup import dhash_batch
+
+SIGNALS = ("diff", "dhash")
+
+
+def change_signal(
+    frames: Iterable[np.ndarray], method: str = "diff", hash_size: int = 8
+) -> np.ndarray:
+    """How much each frame differs from the one before it, in [0, 1].
+
+    `frames` are equally sized grayscale uint8 arrays, consumed one at a time.
+      - "diff": mean absolute luma difference / 255 (sensitive to any motion)
+      - "dhash": Hamming distance between dHashes / bits (ignores small motion and
+        noise, reacts to layout changes such as a new slide)
+    The first frame scores 0.
+    """
+    if method not in SIGNALS:
+        raise ValueError(f"Unknown change signal: {method} (use one of {SIGNALS})")
+    out = []
+    prev: Optional[np.ndarray] = None
+    nbits = hash_size * hash_size
+    for frame in frames:
+        if method == "diff":
+            cur = np.asarray(frame, dtype=np.int16)
+            score = 0.0 if prev is None else float(np.abs(cur - prev).mean()) / 255.0
+        else:
+            cur = dhash_batch([frame], hash_size=hash_size)[0]
+            if prev is None:
+                score = 0.0
+            else:
+                bits = np.unpackbits(np.bitwise_xor(cur, prev).view(np.uint8)).sum()
+                score = float(bits) / nbits
+        out.append(score)
+        prev = cur
+    return np.asarray(out, dtype=np.float64)
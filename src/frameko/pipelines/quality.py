@@ -1,37 +1,117 @@
 from __future__ import annotations
 
-from pathlib import Path
-from typing import Union
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
 
 import numpy as np
-from PIL import Image
 
+from .dedup import dhash_batch, hashes_to_ints
+from .image import ImageSource, load_gray
 
-def variance_of_laplacian(image_path: Union[str, Path]) -> float:
+
+def variance_of_laplacian(image: ImageSource) -> float:
     """Simple blur detector: variance of Laplacian (no OpenCV required).
 
+    `image` is an image path or a decoded RGB/grayscale uint8 array.
     Higher variance => sharper.
     """
-    image_path = Path(image_path)
-    with Image.open(image_path) as im:
-        gray = im.convert("L")
-        arr = np.asarray(gray, dtype=np.float32)
-
-    # Laplacian kernel
-    k = np.array([[0, 1, 0], [1, -4, 1], [0, 1, 0]], dtype=np.float32)
-
-    # Convolution
-    padded = np.pad(arr, ((1, 1), (1, 1)), mode="edge")
-    out = (
-        k[0, 0] * padded[:-2, :-2]
-        + k[0, 1] * padded[:-2, 1:-1]
-        + k[0, 2] * padded[:-2, 2:]
-        + k[1, 0] * padded[1:-1, :-2]
-        + k[1, 1] * padded[1:-1, 1:-1]
-        + k[1, 2] * padded[1:-1, 2:]
-        + k[2, 0] * padded[2:, :-2]
-        + k[2, 1] * padded[2:, 1:-1]
-        + k[2, 2] * padded[2:, 2:]
-    )
-
-    return float(out.var())
+    return float(_laplacian(load_gray(image)).var())
+
+
+def _laplacian(gray: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """4-neighbour Laplacian of a uint8 image with edge-replicated borders.
+
+    Accumulates into a single float32 buffer (`out` is reused when it has the right
+    shape) instead of materialising a padded copy and shifted operands.
+    """
+    if out is None or out.shape != gray.shape:
+        out = np.empty(gray.shape, dtype=np.float32)
+    np.multiply(gray, np.float32(-4.0), out=out, dtype=np.float32)
+    # Each neighbour direction; at the border the replicated neighbour is the pixel itself
+    out[1:, :] += gray[:-1, :]
+    out[0, :] += gray[0, :]
+    out[:-1, :] += gray[1:, :]
+    out[-1, :] += gray[-1, :]
+    out[:, 1:] += gray[:, :-1]
+    out[:, 0] += gray[:, 0]
+    out[:, :-1] += gray[:, 1:]
+    out[:, -1] += gray[:, -1]
+    return out
+
+
+@dataclass(frozen=True)
+class FrameMetrics:
+    dhash: int
+    blur_var: Optional[float] = None  # variance of Laplacian, higher = sharper
+    mean_luma: Optional[float] = None  # 0..255, for black/white frame rejection
+    contrast: Optional[float] = None  # RMS contrast (std of luma)
+    uniform_frac: Optional[float] = None  # share of pixels with |Laplacian| <= uniform_tol
+
+
+def frame_metrics(
+    image: ImageSource,
+    *,
+    hash_size: int = 8,
+    blur: bool = True,
+    luma: bool = False,
+    contrast: bool = False,
+    uniform: bool = False,
+    uniform_tol: float = 2.0,
+) -> FrameMetrics:
+    """dHash plus the requested quality signals from one grayscale load."""
+    return frame_metrics_batch(
+        [image],
+        hash_size=hash_size,
+        blur=blur,
+        luma=luma,
+        contrast=contrast,
+        uniform=uniform,
+        uniform_tol=uniform_tol,
+    )[0]
+
+
+def frame_metrics_batch(
+    images: Sequence[ImageSource],
+    *,
+    hash_size: int = 8,
+    blur: bool = True,
+    luma: bool = False,
+    contrast: bool = False,
+    uniform: bool = False,
+    uniform_tol: float = 2.0,
+) -> List[FrameMetrics]:
+    """`frame_metrics` for several frames.
+
+    Every frame is converted to grayscale once; the hashes are computed in one
+    `dhash_batch` call and frames of equal size share a single Laplacian buffer.
+    `blur_var` matches `variance_of_laplacian` exactly.
+    """
+    grays = [load_gray(im) for im in images]
+    hashes = hashes_to_ints(dhash_batch(grays, hash_size=hash_size))
+
+    out: List[FrameMetrics] = []
+    lap: Optional[np.ndarray] = None
+    for gray, dh in zip(grays, hashes):
+        blur_var = uniform_frac = mean_luma = rms = None
+        if blur or uniform:
+            lap = _laplacian(gray, out=lap)
+            if blur:
+                blur_var = float(lap.var())
+            if uniform:
+                np.abs(lap, out=lap)
+                uniform_frac = float(np.count_nonzero(lap <= uniform_tol)) / lap.size
+        if luma or contrast:
+            mean = float(gray.mean(dtype=np.float64))
+            mean_luma = mean if luma else None
+            if contrast:
+                rms = float(gray.std(dtype=np.float64))
+        out.append(
+            FrameMetrics(
+                dhash=dh,
+                blur_var=blur_var,
+                mean_luma=mean_luma,
+                contrast=rms,
+                uniform_frac=uniform_frac,
+            )
+        )
+    return out
@@ -1,6 +1,12 @@
 from __future__ import annotations
+
+import bisect
+import math
 from typing import List, Sequence, Tuple, Optional
 
+import numpy as np
+
+
 def sample_every_seconds(
     *,
     duration: float,
@@ -25,6 +31,13 @@ def sample_every_seconds(
         ts.append(t)
         t += float(every_sec)
 
+    return _in_scenes(ts, scenes)
+
+
+def _in_scenes(
+    ts: Sequence[float], scenes: Optional[Sequence[Tuple[float, float]]]
+) -> List[Tuple[float, int]]:
+    """Pair sorted timestamps with their scene index, dropping those outside every scene."""
     if not scenes:
         return [(x, 0) for x in ts]
 
@@ -42,6 +55,69 @@ def sample_every_seconds(
     return out
 
 
+def sample_adaptive(
+    times: Sequence[float],
+    signal: Sequence[float],
+    *,
+    budget: int,
+    min_gap_sec: float = 0.5,
+    max_gap_sec: Optional[float] = 30.0,
+    threshold: float = 0.0,
+    scenes: Optional[Sequence[Tuple[float, float]]] = None,
+    end_sec: Optional[float] = None,
+) -> List[Tuple[float, int]]:
+    """Spend about `budget` timestamps where the content changes.
+
+    `signal[k]` is how much the frame at `times[k]` differs from the previous one
+    (see `motion.change_signal`); change up to `threshold` is noise. Samples sit at
+    equal steps of the cumulative change, so a stretch gets frames in proportion
+    to how much it changes; no single frame may hold more than one step, so a hard
+    cut takes one sample instead of the whole budget. The first frame is always
+    kept. Then:
+      - samples closer than `min_gap_sec` to the previous one are dropped
+      - gaps longer than `max_gap_sec` (up to `end_sec`, default the last time)
+        are filled evenly, even beyond the budget
+    Returns (t_sec, scene_idx) like `sample_every_seconds`.
+    """
+    t = np.asarray(times, dtype=np.float64)
+    if t.size == 0 or budget <= 0:
+        return []
+    s = np.maximum(np.asarray(signal, dtype=np.float64) - float(threshold), 0.0)
+    s[0] = 0.0
+
+    picks = [float(t[0])]
+    steps = int(budget) - 1
+    for _ in range(16):
+        total = float(s.sum())
+        if total <= 0 or steps <= 0:
+            break
+        cap = total / steps
+        if float(s.max()) <= cap * (1 + 1e-9):
+            break
+        s = np.minimum(s, cap)
+    total = float(s.sum())
+    if total > 0 and steps > 0:
+        targets = (np.arange(steps) + 0.5) * (total / steps)
+        idx = np.searchsorted(np.cumsum(s), targets, side="left")
+        picks += t[np.minimum(idx, t.size - 1)].tolist()
+
+    kept: List[float] = []
+    for x in sorted(set(picks)):
+        if not kept or x - kept[-1] >= float(min_gap_sec):
+            kept.append(x)
+
+    if max_gap_sec is not None and max_gap_sec > 0:
+        end = float(t[-1]) if end_sec is None else float(end_sec)
+        filled: List[float] = []
+        for a, b in zip(kept, kept[1:] + [end]):
+            filled.append(a)
+            n = math.ceil((b - a) / float(max_gap_sec)) - 1
+            filled += [a + (b - a) * (i + 1) / (n + 1) for i in range(max(0, n))]
+        kept = [x for x in filled if x < end] if end > kept[0] else kept[:1]
+
+    return _in_scenes(kept, scenes)
+
+
 def sample_timestamps(
     scenes: Sequence[Tuple[float, float]],
     frames_per_scene: int = 1,
@@ -66,4 +142,45 @@ def sample_timestamps(
             out.append((max(s, e - edge_eps), idx))
         else:
             out.append((s + dur / 2.0, idx))
-    return out
\ No newline at end of file
+    return out
+
+
+def snap_to_keyframes(
+    ts: Sequence[Tuple[float, int]],
+    keyframes: Sequence[float],
+    *,
+    tolerance_sec: Optional[float] = 0.5,
+    scenes: Optional[Sequence[Tuple[float, float]]] = None,
+) -> List[Tuple[float, int]]:
+    """Move each (t_sec, scene_idx) to the nearest keyframe.
+
+    Seeking to a keyframe decodes a single frame instead of the whole GOP before it.
+      - tolerance_sec: only snap when a keyframe is this close, otherwise keep t_sec.
+        None snaps every timestamp and drops the ones without a usable keyframe
+        (keyframe-only sampling).
+      - scenes: when given, only keyframes inside the timestamp's own scene count.
+
+    Timestamps that land on the same keyframe are merged.
+    """
+    kf = sorted(float(k) for k in keyframes)
+    out: List[Tuple[float, int]] = []
+    seen = set()
+    for t, idx in ts:
+        lo, hi = (scenes[idx] if scenes is not None and idx < len(scenes) else (None, None))
+        i = bisect.bisect_left(kf, t)
+        best: Optional[float] = None
+        for k in kf[max(0, i - 1) : i + 1]:
+            if lo is not None and not (lo <= k < hi):
+                continue
+            if best is None or abs(k - t) < abs(best - t):
+                best = k
+        if best is None or (tolerance_sec is not None and abs(best - t) > tolerance_sec):
+            if tolerance_sec is None:
+                continue
+            best = t
+        if (best, idx) in seen:
+            continue
+        seen.add((best, idx))
+        out.append((best, idx))
+    out.sort(key=lambda x: x[0])
+    return out
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .cuts import cuts_to_scenes
+from .ffmpeg_scenes import check_ffmpeg_scenes, detect_cuts_ffmpeg
+from .scenedetect_adapter import Scene, detect_cuts
+
+
+@dataclass(frozen=True)
+class Window:
+    """A detection chunk: cuts are read from [read_start, read_end] but only the
+    ones in [own_start, own_end) are kept, so every cut has exactly one owner."""
+
+    own_start: float
+    own_end: float
+    read_start: float
+    read_end: float
+
+
+def plan_windows(duration: float, chunk_sec: float, overlap_sec: float) -> List[Window]:
+    if chunk_sec <= 0:
+        raise ValueError("chunk_sec must be > 0")
+    duration = float(duration)
+    n = max(1, int(round(duration / float(chunk_sec))))
+    step = duration / n
+    windows = []
+    for i in range(n):
+        s = i * step
+        e = duration if i == n - 1 else (i + 1) * step
+        windows.append(
+            Window(
+                own_start=s,
+                own_end=e,
+                read_start=max(0.0, s - overlap_sec),
+                read_end=min(duration, e + overlap_sec),
+            )
+        )
+    return windows
+
+
+def stitch_cuts(
+    windows: Sequence[Window], cut_lists: Sequence[Sequence[float]], tolerance_sec: float
+) -> List[float]:
+    """Merge per-window cuts: keep each window's own cuts (with `tolerance_sec`
+    slack at the edges) and collapse cuts closer than `tolerance_sec` into one."""
+    cuts: List[float] = []
+    for w, lst in zip(windows, cut_lists):
+        cuts.extend(c for c in lst if w.own_start - tolerance_sec <= c < w.own_end + tolerance_sec)
+
+    merged: List[float] = []
+    for c in sorted(cuts):
+        if merged and c - merged[-1] <= tolerance_sec:
+            continue
+        merged.append(c)
+    return merged
+
+
+def _window_cuts(job: Tuple[str, str, Window, float, int, int]) -> List[float]:
+    detector, video_path, w, threshold, min_scene_len_frames, scale_width = job
+    if detector == "ffmpeg":
+        return detect_cuts_ffmpeg(
+            Path(video_path),
+            threshold,
+            scale_width=scale_width,
+            start_sec=w.read_start,
+            end_sec=w.read_end,
+        )
+    return detect_cuts(
+        Path(video_path),
+        detector=detector,
+        threshold=threshold,
+        min_scene_len_frames=min_scene_len_frames,
+        start_sec=w.read_start,
+        end_sec=w.read_end,
+    )
+
+
+def detect_scenes_chunked(
+    video_path: Path,
+    detector: str = "adaptive",
+    threshold: float = 27.0,
+    min_scene_len_frames: int = 15,
+    limit_scenes: Optional[int] = None,
+    *,
+    duration: float,
+    fps: Optional[float] = None,
+    chunk_sec: float = 600.0,
+    overlap_sec: float = 5.0,
+    max_workers: Optional[int] = None,
+    scale_width: int = 320,
+) -> List[Scene]:
+    """Scene detection over overlapping time windows run in a process pool.
+
+    Each window re-reads `overlap_sec` on both sides so the detector state has
+    settled before the part it owns; the overlap is widened to at least three
+    minimum scene lengths. Cuts from neighbouring windows that land within a
+    frame of each other are merged, then `min_scene_len_frames` is enforced over
+    the stitched list so it also holds across chunk boundaries. Pool workers
+    are spawned, not forked, so this is safe to call from threads.
+    """
+    if detector == "ffmpeg":
+        check_ffmpeg_scenes()  # once here rather than in every worker
+    frame_sec = 1.0 / float(fps) if fps else 0.04
+    overlap = max(float(overlap_sec), 3.0 * min_scene_len_frames * frame_sec)
+    windows = plan_windows(duration, chunk_sec, overlap)
+
+    jobs = [
+        (detector, str(video_path), w, float(threshold), int(min_scene_len_frames), scale_width)
+        for w in windows
+    ]
+    if len(jobs) == 1:
+        cut_lists = [_window_cuts(jobs[0])]
+    else:
+        workers = min(len(jobs), max_workers or multiprocessing.cpu_count())
+        # Callers run this from thread pools (ingest_many's prepare threads); forking a
+        # multi-threaded process can copy a held lock into the child, so spawn instead
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            cut_lists = list(pool.map(_window_cuts, jobs))
+
+    cuts = stitch_cuts(windows, cut_lists, tolerance_sec=1.5 * frame_sec)
+    return cuts_to_scenes(
+        cuts,
+        duration=float(duration),
+        min_scene_len_frames=min_scene_len_frames,
+        fps=fps,
+        limit_scenes=limit_scenes,
+    )
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from .scenedetect_adapter import Scene
+
+
+def cuts_to_scenes(
+    cuts: List[float],
+    duration: float,
+    min_scene_len_frames: int = 15,
+    fps: Optional[float] = None,
+    limit_scenes: Optional[int] = None,
+) -> List[Scene]:
+    """Turn sorted cut times into contiguous (start, end) scenes covering [0, duration].
+
+    Cuts closer than `min_scene_len_frames` to the previous kept cut (or to the
+    start of the video) are dropped. Returns [] when no cut survives.
+    """
+    min_len = float(min_scene_len_frames) / float(fps) if fps else 0.0
+    kept: List[float] = []
+    prev = 0.0
+    for c in sorted(cuts):
+        if c <= 0.0 or c >= duration:
+            continue
+        if c - prev < min_len:
+            continue
+        kept.append(c)
+        prev = c
+    if not kept:
+        return []
+
+    bounds = [0.0] + kept + [float(duration)]
+    scenes: List[Scene] = []
+    for s, e in zip(bounds[:-1], bounds[1:]):
+        scenes.append((s, e))
+        if limit_scenes is not None and len(scenes) >= limit_scenes:
+            break
+    return scenes
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import List, Optional
+
+from ..video.ffmpeg import require_ffmpeg_features, run
+from .cuts import cuts_to_scenes
+from .scenedetect_adapter import Scene
+
+
+_PTS_TIME = re.compile(r"pts_time:\s*([0-9.+\-eE]+)")
+
+# Filters of the scene-scoring graph in `detect_cuts_ffmpeg`
+_SCENE_FILTERS = ("scale", "select", "metadata")
+
+
+def check_ffmpeg_scenes() -> None:
+    """Fail fast when the ffmpeg build cannot run `detect_cuts_ffmpeg`."""
+    require_ffmpeg_features('scene_detector="ffmpeg"', filters=_SCENE_FILTERS)
+
+
+def scenedetect_to_ffmpeg_threshold(threshold: float) -> float:
+    """Map a `scene_threshold` onto ffmpeg's 0..1 `scene` score.
+
+    PySceneDetect's content/adaptive thresholds live on a 0..255 frame-delta scale
+    with useful values around 20-35; ffmpeg's score is a normalized 0..1 frame
+    difference where ~0.2-0.4 marks a hard cut. The threshold is divided by 100,
+    so the default 27 becomes 0.27. Values <= 1 are taken as native ffmpeg scores.
+    """
+    t = float(threshold)
+    if t > 1.0:
+        t = t / 100.0
+    return min(max(t, 0.01), 0.99)
+
+
+def detect_cuts_ffmpeg(
+    video_path: Path,
+    threshold: float = 27.0,
+    *,
+    scale_width: int = 320,
+    threads: int = 0,
+    start_sec: Optional[float] = None,
+    end_sec: Optional[float] = None,
+) -> List[float]:
+    """Cut timestamps (seconds) found by ffmpeg's `select='gt(scene,T)'` scoring.
+
+    Frames are downscaled to `scale_width` before scoring; `threads=0` lets the
+    decoder pick its own thread count. `start_sec`/`end_sec` restrict the decode
+    to a window; returned times are always relative to the start of the video.
+    """
+    t = scenedetect_to_ffmpeg_threshold(threshold)
+    graph = (
+        f"scale=w='min({int(scale_width)},iw)':h=-2,"
+        f"select='gt(scene,{t:.4f})',"
+        "metadata=mode=print:file=-"
+    )
+    offset = float(start_sec or 0.0)
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error"]
+    cmd += ["-threads", str(int(threads))]
+    if offset > 0:
+        cmd += ["-ss", f"{offset:.6f}"]
+    cmd += ["-i", str(video_path), "-map", "0:v:0", "-an", "-sn", "-dn", "-vf", graph]
+    if end_sec is not None:
+        cmd += ["-t", f"{max(0.0, float(end_sec) - offset):.6f}"]
+    cmd += ["-f", "null", "-"]
+    p = run(cmd)
+    if p.returncode != 0:
+        raise RuntimeError(f"ffmpeg scene detection failed: {p.stderr[:500]}")
+
+    cuts: List[float] = []
+    for line in p.stdout.splitlines():
+        m = _PTS_TIME.search(line)
+        if m:
+            try:
+                # With an input seek, output timestamps restart at zero
+                cuts.append(offset + float(m.group(1)))
+            except ValueError:
+                continue
+    return sorted(cuts)
+
+
+def detect_scenes_ffmpeg(
+    video_path: Path,
+    threshold: float = 27.0,
+    min_scene_len_frames: int = 15,
+    limit_scenes: Optional[int] = None,
+    *,
+    duration: float,
+    fps: Optional[float] = None,
+    scale_width: int = 320,
+    threads: int = 0,
+) -> List[Scene]:
+    """Scene list from ffmpeg's scene scores, same shape as `detect_scenes`."""
+    check_ffmpeg_scenes()
+    cuts = detect_cuts_ffmpeg(
+        Path(video_path), threshold, scale_width=scale_width, threads=threads
+    )
+    return cuts_to_scenes(
+        cuts,
+        duration=float(duration),
+        min_scene_len_frames=min_scene_len_frames,
+        fps=fps,
+        limit_scenes=limit_scenes,
+    )
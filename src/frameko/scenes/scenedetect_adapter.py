@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, List, Optional, Tuple
 
 from ..errors import DependencyMissingError
 
@@ -9,6 +9,17 @@ from ..errors import DependencyMissingError
 Scene = Tuple[float, float]
 
 
+def _make_detector(detector: str, threshold: float, min_scene_len_frames: int) -> Any:
+    from scenedetect.detectors import ContentDetector, AdaptiveDetector
+
+    det = detector.lower().strip()
+    if det == "content":
+        return ContentDetector(threshold=threshold, min_scene_len=min_scene_len_frames)
+    # AdaptiveDetector has no `threshold`; its content-score floor is on the same
+    # 0..255 scale as ContentDetector's threshold.
+    return AdaptiveDetector(min_content_val=threshold, min_scene_len=min_scene_len_frames)
+
+
 def detect_scenes(
     video_path: Path,
     detector: str = "adaptive",
@@ -19,7 +30,6 @@ def detect_scenes(
     try:
         from scenedetect import open_video
         from scenedetect.scene_manager import SceneManager
-        from scenedetect.detectors import ContentDetector, AdaptiveDetector
     except Exception:
         return []
 
@@ -27,12 +37,7 @@ def detect_scenes(
 
     video = open_video(str(video_path))
     sm = SceneManager()
-
-    det = detector.lower().strip()
-    if det == "content":
-        sm.add_detector(ContentDetector(threshold=threshold, min_scene_len=min_scene_len_frames))
-    else:
-        sm.add_detector(AdaptiveDetector(threshold=threshold, min_scene_len=min_scene_len_frames))
+    sm.add_detector(_make_detector(detector, threshold, min_scene_len_frames))
 
     sm.detect_scenes(video)
     scene_list = sm.get_scene_list()
@@ -44,3 +49,29 @@ def detect_scenes(
             break
 
     return scenes
+
+
+def detect_cuts(
+    video_path: Path,
+    detector: str = "adaptive",
+    threshold: float = 27.0,
+    min_scene_len_frames: int = 15,
+    start_sec: Optional[float] = None,
+    end_sec: Optional[float] = None,
+) -> List[float]:
+    """Cut times (seconds from the start of the video) within [start_sec, end_sec]."""
+    try:
+        from scenedetect import open_video
+        from scenedetect.scene_manager import SceneManager
+    except Exception:
+        return []
+
+    video = open_video(str(Path(video_path)))
+    if start_sec:
+        video.seek(float(start_sec))
+    sm = SceneManager()
+    sm.add_detector(_make_detector(detector, threshold, min_scene_len_frames))
+    sm.detect_scenes(video, end_time=float(end_sec) if end_sec is not None else None)
+
+    # Every scene after the first starts at a cut
+    return [start.get_seconds() for start, _ in sm.get_scene_list()[1:]]
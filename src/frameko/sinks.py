@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import ast
+import io
+import json
+import os
+import re
+import tarfile
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .errors import ConfigError, FramekoError
+from .pipelines.image import ImageSource, load_rgb
+
+# Output formats
+FILES = "files"
+TAR = "tar"
+NPY = "npy"
+
+_BLOCK = 512  # tar block size
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_NPY_HEADER_LEN = 128  # fixed, so the shape can be rewritten in place
+_PART = ".part"
+
+
+def fanout_path(root: Path, name: str, key: int, levels: int) -> Path:
+    """`root/ab/cd/.../name`, one directory level per byte of the 64-bit `key`.
+
+    With `levels=0` this is just `root/name`. Two levels spread files over 65536
+    directories, which keeps directory listings short at millions of frames.
+    """
+    digits = f"{int(key) & ((1 << 64) - 1):016x}"
+    parts = [digits[2 * k : 2 * k + 2] for k in range(max(0, min(int(levels), 8)))]
+    return Path(root).joinpath(*parts, name)
+
+
+class FrameSink(ABC):
+    """Where the accepted frames of one video end up.
+
+    Candidate frames are first written as image files at `staging_path` (or kept
+    as arrays in pipe mode when `accepts_arrays` is set). `put` moves an accepted
+    frame into its final place, in frame order, and returns
+    `(frame_path, shard_offset)` for its record. `bytes_written` counts the
+    bytes of every frame stored so far.
+    """
+
+    accepts_arrays = False
+    bytes_written = 0
+
+    @abstractmethod
+    def staging_path(self, frame_idx: int, frame_uid: int) -> Path:
+        """Where the candidate frame is written before it is accepted."""
+
+    @abstractmethod
+    def put(
+        self, frame_idx: int, source: ImageSource, meta: Dict[str, Any]
+    ) -> Tuple[str, Optional[int]]:
+        """Store an accepted frame; returns `(frame_path, shard_offset)`."""
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink(FrameSink):
+    """One image file per frame under `frames_dir`, optionally fanned out into
+    hashed subdirectories."""
+
+    def __init__(self, frames_dir: Path, video_id: str, image_format: str, fanout: int = 0):
+        self.frames_dir = Path(frames_dir)
+        self.video_id = video_id
+        self.image_format = image_format
+        self.fanout = int(fanout)
+
+    def staging_path(self, frame_idx: int, frame_uid: int) -> Path:
+        name = f"{self.video_id}_{frame_idx:06d}.{self.image_format}"
+        return fanout_path(self.frames_dir, name, frame_uid, self.fanout)
+
+    def put(
+        self, frame_idx: int, source: ImageSource, meta: Dict[str, Any]
+    ) -> Tuple[str, Optional[int]]:
+        if isinstance(source, np.ndarray):
+            raise TypeError("FileSink stores frames that are already encoded to a file")
+        self.bytes_written += os.path.getsize(source)
+        return str(source), None
+
+
+class _ShardSink(FrameSink):
+    """Shards of up to `shard_size` frames named `<video_id>-<n>.<ext>`.
+
+    The shard being written carries a `.part` suffix until it is full or the sink
+    is closed. A sink opened with the video's existing records resumes after the
+    last of them on first use: the shard holding it is cut back to that frame and
+    reopened, and later shards (written but never recorded) are removed.
+    """
+
+    ext = ""
+
+    def __init__(
+        self,
+        shards_dir: Path,
+        video_id: str,
+        *,
+        image_format: str,
+        shard_size: int,
+        records: Sequence[Tuple[str, int]] = (),
+    ) -> None:
+        self.shards_dir = Path(shards_dir)
+        self.staging_dir = self.shards_dir / "staging"
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self.video_id = video_id
+        self.image_format = image_format
+        self.shard_size = max(1, int(shard_size))
+        self._fh: Optional[Any] = None
+        self._n = 0  # current shard number
+        self._count = 0  # frames in the current shard
+        # (shard number, offset) of the last stored frame; resumed on first use
+        self._last: Optional[Tuple[int, int]] = max(
+            ((self._shard_no(p), int(off)) for p, off in records), default=None
+        )
+        self._resumed = False
+
+    def _resume(self) -> None:
+        if self._resumed:
+            return
+        self._resumed = True
+        last = self._last
+        self._remove_after(last[0] if last is not None else -1)
+        if last is not None:
+            self._n = last[0]
+            self._reopen(last[1])
+            if self._count >= self.shard_size:
+                self._finalize()
+                self._n += 1
+
+    # naming
+    def shard_path(self, n: int) -> Path:
+        return self.shards_dir / f"{self.video_id}-{n:06d}.{self.ext}"
+
+    def _shard_no(self, path: str) -> int:
+        m = re.search(r"-(\d+)\.\w+$", Path(path).name)
+        if m is None or not Path(path).name.startswith(self.video_id):
+            raise FramekoError(f"Not a shard of {self.video_id}: {path}")
+        return int(m.group(1))
+
+    def _remove_after(self, n: int) -> None:
+        for p in self.shards_dir.glob(f"{self.video_id}-*.{self.ext}*"):
+            if self._shard_no(p.name.removesuffix(_PART)) > n:
+                p.unlink(missing_ok=True)
+
+    def _reopen(self, last_offset: int) -> None:
+        final = self.shard_path(self._n)
+        part = Path(str(final) + _PART)
+        if final.exists():
+            os.replace(final, part)
+        if not part.exists():
+            raise FramekoError(
+                f"Shard {final} is missing; remove the video's checkpoint to redo it"
+            )
+        self._fh = open(part, "r+b")
+        self._truncate_after(last_offset)
+
+    def staging_path(self, frame_idx: int, frame_uid: int) -> Path:
+        return self.staging_dir / f"{self.video_id}_{frame_idx:06d}.{self.image_format}"
+
+    def put(
+        self, frame_idx: int, source: ImageSource, meta: Dict[str, Any]
+    ) -> Tuple[str, Optional[int]]:
+        self._resume()
+        if self._fh is not None and self._count >= self.shard_size:
+            self._finalize()
+            self._n += 1
+        if self._fh is None:
+            part = Path(str(self.shard_path(self._n)) + _PART)
+            self._fh = open(part, "w+b")
+            self._count = 0
+            self._start()
+        offset = self._append(f"{self.video_id}_{frame_idx:06d}", source, meta)
+        self._fh.flush()
+        self._count += 1
+        if not isinstance(source, np.ndarray):
+            Path(source).unlink(missing_ok=True)
+        return str(self.shard_path(self._n)), offset
+
+    def close(self) -> None:
+        self._resume()
+        if self._fh is not None:
+            self._finalize()
+
+    def _finalize(self) -> None:
+        assert self._fh is not None
+        self._finish()
+        self._fh.close()
+        self._fh = None
+        final = self.shard_path(self._n)
+        os.replace(str(final) + _PART, final)
+
+    # format hooks
+    def _start(self) -> None:
+        pass
+
+    @abstractmethod
+    def _append(self, key: str, source: ImageSource, meta: Dict[str, Any]) -> int:
+        """Write one frame to the open shard; returns its offset."""
+
+    def _finish(self) -> None:
+        pass
+
+    @abstractmethod
+    def _truncate_after(self, last_offset: int) -> None:
+        """Cut the reopened shard back to the frame at `last_offset` and set `_count`."""
+
+
+class TarShardSink(_ShardSink):
+    """WebDataset-style tar shards: `<key>.<image_format>` plus a `<key>.json`
+    metadata sidecar per frame. Offsets are byte offsets of the image member."""
+
+    ext = "tar"
+
+    def _member(self, name: str, data: bytes) -> None:
+        assert self._fh is not None
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        self._fh.write(info.tobuf(format=tarfile.USTAR_FORMAT))
+        self._fh.write(data)
+        self._fh.write(b"\0" * (-len(data) % _BLOCK))
+        self.bytes_written += _BLOCK + len(data) + (-len(data) % _BLOCK)
+
+    def _append(self, key: str, source: ImageSource, meta: Dict[str, Any]) -> int:
+        assert self._fh is not None
+        if isinstance(source, np.ndarray):
+            raise TypeError("TarShardSink stores frames that are already encoded to a file")
+        source = Path(source)
+        offset = self._fh.tell()
+        self._member(key + source.suffix, source.read_bytes())
+        self._member(key + ".json", json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        return offset
+
+    def _finish(self) -> None:
+        assert self._fh is not None
+        self._fh.write(b"\0" * (2 * _BLOCK))  # end-of-archive marker
+
+    def _truncate_after(self, last_offset: int) -> None:
+        assert self._fh is not None
+        # Walk the member headers up to the last recorded frame (image + sidecar)
+        pos, members = 0, 0
+        end = last_offset + 1
+        while pos < end or members % 2:
+            self._fh.seek(pos)
+            info = _read_tar_header(self._fh, pos)
+            pos += _BLOCK + info.size + (-info.size % _BLOCK)
+            members += 1
+        self._count = members // 2
+        self._fh.truncate(pos)
+        self._fh.seek(pos)
+
+
+class NpyShardSink(_ShardSink):
+    """Fixed-size uint8 `(n, height, width, 3)` `.npy` shards that `np.load(...,
+    mmap_mode="r")` maps without copying. Offsets are row indices.
+
+    Frames whose size differs from `size` are resized with Pillow; in pipe mode
+    ffmpeg already decodes at `size`.
+    """
+
+    ext = "npy"
+    accepts_arrays = True
+
+    def __init__(self, shards_dir: Path, video_id: str, *, size: Tuple[int, int], **kwargs: Any):
+        self.size = (int(size[0]), int(size[1]))
+        self.frame_bytes = self.size[0] * self.size[1] * 3
+        super().__init__(shards_dir, video_id, **kwargs)
+
+    def _shape(self, n: int) -> Tuple[int, int, int, int]:
+        return (n, self.size[1], self.size[0], 3)
+
+    def _start(self) -> None:
+        assert self._fh is not None
+        self._fh.write(_npy_header(self._shape(0)))
+
+    def _append(self, key: str, source: ImageSource, meta: Dict[str, Any]) -> int:
+        assert self._fh is not None
+        arr = load_rgb(source)
+        if arr.shape[:2] != (self.size[1], self.size[0]):
+            from PIL import Image
+
+            arr = np.asarray(Image.fromarray(arr).resize(self.size, Image.BICUBIC))
+        self._fh.seek(_NPY_HEADER_LEN + self._count * self.frame_bytes)
+        self._fh.write(np.ascontiguousarray(arr, dtype=np.uint8).tobytes())
+        self.bytes_written += self.frame_bytes
+        return self._count
+
+    def _finish(self) -> None:
+        assert self._fh is not None
+        self._fh.seek(0)
+        self._fh.write(_npy_header(self._shape(self._count)))
+        self._fh.truncate(_NPY_HEADER_LEN + self._count * self.frame_bytes)
+
+    def _truncate_after(self, last_offset: int) -> None:
+        assert self._fh is not None
+        shape, _ = _read_npy_header(self._fh)
+        if tuple(shape[1:]) != self._shape(0)[1:]:
+            raise FramekoError(f"Shard {self._fh.name} holds frames of shape {shape[1:]}")
+        self._count = last_offset + 1
+        self._fh.truncate(_NPY_HEADER_LEN + self._count * self.frame_bytes)
+
+
+def _npy_header(shape: Tuple[int, ...]) -> bytes:
+    """`.npy` v1.0 header for a C-ordered uint8 array, padded to a fixed length."""
+    d = f"{{'descr': '|u1', 'fortran_order': False, 'shape': {tuple(shape)!r}, }}"
+    pad = _NPY_HEADER_LEN - len(_NPY_MAGIC) - 2 - len(d) - 1
+    if pad < 0:
+        raise ValueError(f"shape too large for the shard header: {shape}")
+    body = (d + " " * pad + "\n").encode("latin1")
+    return _NPY_MAGIC + len(body).to_bytes(2, "little") + body
+
+
+def _read_npy_header(fh: Any) -> Tuple[Tuple[int, ...], int]:
+    """Shape and data offset of the `.npy` file open in `fh`."""
+    fh.seek(0)
+    head = fh.read(10)
+    if head[:6] != _NPY_MAGIC[:6]:
+        raise FramekoError(f"Not an .npy file: {getattr(fh, 'name', fh)}")
+    n = int.from_bytes(head[8:10], "little")
+    d = ast.literal_eval(fh.read(n).decode("latin1"))
+    return tuple(d["shape"]), 10 + n
+
+
+def _read_tar_header(fh: Any, pos: int) -> tarfile.TarInfo:
+    buf = fh.read(_BLOCK)
+    try:
+        return tarfile.TarInfo.frombuf(buf, tarfile.ENCODING, "surrogateescape")
+    except tarfile.TarError as e:
+        raise FramekoError(f"Corrupt tar shard {getattr(fh, 'name', fh)} at {pos}: {e}") from e
+
+
+def open_sink(
+    output_format: str,
+    *,
+    index_dir: Path,
+    frames_dir: Path,
+    video_id: str,
+    image_format: str,
+    fanout: int = 0,
+    shard_size: int = 1000,
+    size: Optional[Tuple[int, int]] = None,
+    records: Sequence[Tuple[str, int]] = (),
+) -> FrameSink:
+    """Sink for `output_format` ("files", "tar" or "npy"); `size` is required for
+    "npy", `records` are `(frame_path, shard_offset)` of frames already stored."""
+    if output_format == FILES:
+        return FileSink(frames_dir, video_id, image_format, fanout=fanout)
+    shards_dir = Path(index_dir) / "shards"
+    if output_format == TAR:
+        return TarShardSink(
+            shards_dir, video_id, image_format=image_format, shard_size=shard_size, records=records
+        )
+    if output_format == NPY:
+        if size is None:
+            raise ConfigError("npy output needs a frame size")
+        return NpyShardSink(
+            shards_dir,
+            video_id,
+            size=size,
+            image_format=image_format,
+            shard_size=shard_size,
+            records=records,
+        )
+    raise ConfigError(f"Unknown output_format: {output_format}")
+
+
+def load_frame(frame: Union[Dict[str, Any], Any]) -> np.ndarray:
+    """Decode a recorded frame (record dict or `ExtractedFrame`) to an RGB array,
+    wherever its output format put it."""
+    get = frame.get if isinstance(frame, dict) else (lambda k: getattr(frame, k, None))
+    path = Path(get("frame_path"))
+    offset = get("shard_offset")
+    if offset is None:
+        return load_rgb(path)
+    if not path.exists() and Path(str(path) + _PART).exists():
+        path = Path(str(path) + _PART)  # shard still being written
+
+    with open(path, "rb") as fh:
+        if path.name.removesuffix(_PART).endswith(".npy"):
+            shape, start = _read_npy_header(fh)
+            nbytes = int(np.prod(shape[1:]))
+            fh.seek(start + int(offset) * nbytes)
+            buf = fh.read(nbytes)
+            if len(buf) != nbytes:
+                raise FramekoError(f"Frame {offset} is past the end of {path}")
+            return np.frombuffer(buf, dtype=np.uint8).reshape(shape[1:])
+        fh.seek(int(offset))
+        info = _read_tar_header(fh, int(offset))
+        data = fh.read(info.size)
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as im:
+        return np.asarray(im.convert("RGB"))
@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .errors import ConfigError
+
+Record = Dict[str, Any]
+
+
+def _to_int64(u: int) -> int:
+    """Map an unsigned 64-bit id onto SQLite's signed INTEGER range."""
+    u = int(u)
+    return u - (1 << 64) if u >= (1 << 63) else u
+
+
+class MetadataStore(ABC):
+    """Video/frame metadata written by `ingest`.
+
+    Writes are buffered and committed `batch_size` records at a time; `flush`
+    forces them out (ingest flushes before every checkpoint). Reads always see
+    buffered records.
+
+    Besides accepted frames, the store can hold candidate records: the scores of
+    every sampled frame with its filter outcome (`record_candidates`), keyed by
+    `(video_id, frame_idx)` with the latest write winning.
+    """
+
+    def __init__(self, batch_size: int = 256) -> None:
+        self.batch_size = max(1, int(batch_size))
+        self._lock = threading.RLock()
+        self._frames: List[Record] = []
+        self._videos: List[Record] = []
+        self._candidates: List[Record] = []
+
+    def add_video(self, rec: Record) -> None:
+        with self._lock:
+            self._videos.append(rec)
+            self.flush()
+
+    def add_frame(self, rec: Record) -> None:
+        with self._lock:
+            self._frames.append(rec)
+            if len(self._frames) >= self.batch_size:
+                self.flush()
+
+    def add_frames(self, recs: Sequence[Record]) -> None:
+        with self._lock:
+            self._frames.extend(recs)
+            if len(self._frames) >= self.batch_size:
+                self.flush()
+
+    def add_candidate(self, rec: Record) -> None:
+        with self._lock:
+            self._candidates.append(rec)
+            if len(self._candidates) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._videos or self._frames or self._candidates:
+                self._write(self._videos, self._frames, self._candidates)
+            self._videos, self._frames, self._candidates = [], [], []
+
+    def close(self) -> None:
+        self.flush()
+
+    @abstractmethod
+    def _write(self, videos: List[Record], frames: List[Record], candidates: List[Record]) -> None:
+        """Persist one flushed batch of records."""
+
+    @abstractmethod
+    def delete_frames(self, video_id: str, frame_uids: Sequence[int]) -> None:
+        """Remove frame records of `video_id`."""
+
+    @abstractmethod
+    def candidates(self, video_id: str) -> List[Record]:
+        """Latest candidate record per frame of `video_id`, ordered by frame_idx."""
+
+    # queries
+    @abstractmethod
+    def frames(
+        self,
+        video_id: Optional[str] = None,
+        start_sec: Optional[float] = None,
+        end_sec: Optional[float] = None,
+    ) -> List[Record]:
+        """Frame records, optionally of one video and within [start_sec, end_sec],
+        ordered by (video, t_sec)."""
+
+    @abstractmethod
+    def get_frame(self, frame_uid: int) -> Optional[Record]:
+        """The record of `frame_uid`, if it exists."""
+
+    def get_frames(self, frame_uids: Sequence[int]) -> Dict[int, Record]:
+        """Records of the given frame uids that exist, keyed by uid."""
+        found = {int(u): self.get_frame(u) for u in frame_uids}
+        return {u: r for u, r in found.items() if r is not None}
+
+    @abstractmethod
+    def videos(self) -> List[Record]:
+        """Video records, the latest write per video_id."""
+
+
+def _in_range(rec: Record, start_sec: Optional[float], end_sec: Optional[float]) -> bool:
+    t = float(rec.get("t_sec", 0.0))
+    return (start_sec is None or t >= start_sec) and (end_sec is None or t <= end_sec)
+
+
+def _read_jsonl(path: Path) -> Iterator[Record]:
+    if not path.exists():
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn final line of an interrupted run
+            if isinstance(rec, dict):
+                yield rec
+
+
+class JsonlStore(MetadataStore):
+    """The original `videos.jsonl` / `frames.jsonl` layout. Queries scan the file."""
+
+    def __init__(
+        self,
+        videos_path: Path,
+        frames_path: Path,
+        batch_size: int = 256,
+        candidates_path: Optional[Path] = None,
+    ) -> None:
+        super().__init__(batch_size=batch_size)
+        self.videos_path = Path(videos_path)
+        self.frames_path = Path(frames_path)
+        self.candidates_path = Path(
+            candidates_path or self.frames_path.with_name("candidates.jsonl")
+        )
+        for p in (self.videos_path, self.frames_path, self.candidates_path):
+            self._terminate(p)
+
+    @staticmethod
+    def _terminate(path: Path) -> None:
+        """Newline-terminate a log whose last write was cut short, so appends start clean."""
+        if not path.exists() or path.stat().st_size == 0:
+            return
+        with path.open("rb+") as f:
+            f.seek(-1, 2)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def _write(self, videos: List[Record], frames: List[Record], candidates: List[Record]) -> None:
+        for path, recs in (
+            (self.videos_path, videos),
+            (self.frames_path, frames),
+            (self.candidates_path, candidates),
+        ):
+            if not recs:
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in recs)
+            with path.open("a", encoding="utf-8") as f:
+                f.write(data)
+
+    def frames(
+        self,
+        video_id: Optional[str] = None,
+        start_sec: Optional[float] = None,
+        end_sec: Optional[float] = None,
+    ) -> List[Record]:
+        self.flush()
+        out = [
+            r
+            for r in _read_jsonl(self.frames_path)
+            if (video_id is None or r.get("video_id") == video_id)
+            and _in_range(r, start_sec, end_sec)
+        ]
+        out.sort(key=lambda r: (str(r.get("video_id")), float(r.get("t_sec", 0.0))))
+        return out
+
+    def get_frame(self, frame_uid: int) -> Optional[Record]:
+        self.flush()
+        for r in _read_jsonl(self.frames_path):
+            if int(r.get("frame_uid", -1)) == int(frame_uid):
+                return r
+        return None
+
+    def get_frames(self, frame_uids: Sequence[int]) -> Dict[int, Record]:
+        self.flush()
+        wanted = {int(u) for u in frame_uids}
+        found: Dict[int, Record] = {}
+        for r in _read_jsonl(self.frames_path):
+            u = int(r.get("frame_uid", -1))
+            if u in wanted:
+                found[u] = r
+        return found
+
+    def videos(self) -> List[Record]:
+        self.flush()
+        # A rewritten video record (e.g. with its ingest report) replaces the earlier line
+        latest: Dict[str, Record] = {}
+        for r in _read_jsonl(self.videos_path):
+            latest[str(r.get("video_id"))] = r
+        return list(latest.values())
+
+    def delete_frames(self, video_id: str, frame_uids: Sequence[int]) -> None:
+        drop = {int(u) for u in frame_uids}
+        with self._lock:
+            self.flush()
+            if not drop or not self.frames_path.exists():
+                return
+            # Rewrite the log without the dropped records, then swap it in atomically
+            tmp = self.frames_path.with_name(self.frames_path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for r in _read_jsonl(self.frames_path):
+                    if r.get("video_id") == video_id and int(r.get("frame_uid", -1)) in drop:
+                        continue
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.frames_path)
+
+    def candidates(self, video_id: str) -> List[Record]:
+        self.flush()
+        latest: Dict[int, Record] = {}
+        for r in _read_jsonl(self.candidates_path):
+            if r.get("video_id") == video_id:
+                latest[int(r["frame_idx"])] = r
+        return [latest[k] for k in sorted(latest)]
+
+
+class SqliteStore(MetadataStore):
+    """SQLite file with indexed `video_id`, `frame_uid` and `t_sec` columns.
+
+    The full record is kept as JSON next to the indexed columns, so reads return
+    exactly what was written. Frames are keyed by `frame_uid`: writing the same
+    frame twice (e.g. re-importing a JSONL file) replaces it.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS videos (
+            video_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS frames (
+            frame_uid INTEGER PRIMARY KEY,
+            video_id TEXT NOT NULL,
+            frame_idx INTEGER,
+            t_sec REAL NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS frames_video_t ON frames (video_id, t_sec);
+        CREATE INDEX IF NOT EXISTS frames_t ON frames (t_sec);
+        CREATE TABLE IF NOT EXISTS candidates (
+            video_id TEXT NOT NULL,
+            frame_idx INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (video_id, frame_idx)
+        );
+    """
+
+    def __init__(self, path: Union[str, Path], batch_size: int = 256) -> None:
+        super().__init__(batch_size=batch_size)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by ingest threads; every use holds self._lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+
+    def _write(self, videos: List[Record], frames: List[Record], candidates: List[Record]) -> None:
+        video_rows = [(str(r["video_id"]), json.dumps(r, ensure_ascii=False)) for r in videos]
+        frame_rows = [
+            (
+                _to_int64(r["frame_uid"]),
+                str(r["video_id"]),
+                r.get("frame_idx"),
+                float(r["t_sec"]),
+                json.dumps(r, ensure_ascii=False),
+            )
+            for r in frames
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO videos (video_id, data) VALUES (?, ?)", video_rows
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO frames (frame_uid, video_id, frame_idx, t_sec, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                frame_rows,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candidates (video_id, frame_idx, data) VALUES (?, ?, ?)",
+                [
+                    (str(r["video_id"]), int(r["frame_idx"]), json.dumps(r, ensure_ascii=False))
+                    for r in candidates
+                ],
+            )
+
+    def _select(self, sql: str, params: Sequence[Any]) -> List[Record]:
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def frames(
+        self,
+        video_id: Optional[str] = None,
+        start_sec: Optional[float] = None,
+        end_sec: Optional[float] = None,
+    ) -> List[Record]:
+        where: List[str] = []
+        params: List[Any] = []
+        for cond, value in (
+            ("video_id = ?", video_id),
+            ("t_sec >= ?", start_sec),
+            ("t_sec <= ?", end_sec),
+        ):
+            if value is not None:
+                where.append(cond)
+                params.append(value)
+        sql = "SELECT data FROM frames"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._select(sql + " ORDER BY video_id, t_sec", params)
+
+    def get_frame(self, frame_uid: int) -> Optional[Record]:
+        rows = self._select("SELECT data FROM frames WHERE frame_uid = ?", [_to_int64(frame_uid)])
+        return rows[0] if rows else None
+
+    def get_frames(self, frame_uids: Sequence[int]) -> Dict[int, Record]:
+        uids = [_to_int64(u) for u in frame_uids]
+        found: Dict[int, Record] = {}
+        for i in range(0, len(uids), 500):  # stay under SQLite's bound-parameter limit
+            chunk = uids[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            for r in self._select(f"SELECT data FROM frames WHERE frame_uid IN ({marks})", chunk):
+                found[int(r["frame_uid"])] = r
+        return found
+
+    def videos(self) -> List[Record]:
+        return self._select("SELECT data FROM videos ORDER BY rowid", [])
+
+    def delete_frames(self, video_id: str, frame_uids: Sequence[int]) -> None:
+        with self._lock:
+            self.flush()
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM frames WHERE video_id = ? AND frame_uid = ?",
+                    [(video_id, _to_int64(u)) for u in frame_uids],
+                )
+
+    def candidates(self, video_id: str) -> List[Record]:
+        return self._select(
+            "SELECT data FROM candidates WHERE video_id = ? ORDER BY frame_idx", [video_id]
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+
+def open_store(
+    index_dir: Union[str, Path], backend: str = "jsonl", batch_size: int = 256
+) -> MetadataStore:
+    """Open the metadata store of an index directory.
+
+    - "jsonl": `videos.jsonl` + `frames.jsonl` (the original layout), plus
+      `candidates.jsonl` when candidates are recorded
+    - "sqlite": `metadata.sqlite`
+    """
+    index_dir = Path(index_dir)
+    if backend == "jsonl":
+        return JsonlStore(
+            index_dir / "videos.jsonl", index_dir / "frames.jsonl", batch_size=batch_size
+        )
+    if backend == "sqlite":
+        return SqliteStore(index_dir / "metadata.sqlite", batch_size=batch_size)
+    raise ConfigError(f"Unknown metadata_backend: {backend}")
+
+
+def import_jsonl(
+    store: MetadataStore,
+    videos_path: Optional[Union[str, Path]] = None,
+    frames_path: Optional[Union[str, Path]] = None,
+    candidates_path: Optional[Union[str, Path]] = None,
+) -> Tuple[int, int]:
+    """Copy existing JSONL metadata into `store` record for record.
+
+    Returns `(n_videos, n_frames)` imported. Unparseable (torn) lines are skipped.
+    """
+    n_videos = n_frames = 0
+    if videos_path is not None:
+        for rec in _read_jsonl(Path(videos_path)):
+            store.add_video(rec)
+            n_videos += 1
+    if frames_path is not None:
+        for rec in _read_jsonl(Path(frames_path)):
+            store.add_frame(rec)
+            n_frames += 1
+    if candidates_path is not None:
+        for rec in _read_jsonl(Path(candidates_path)):
+            store.add_candidate(rec)
+    store.flush()
+    return n_videos, n_frames
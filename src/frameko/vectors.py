@@ -0,0 +1,479 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .errors import ConfigError
+
+_DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+class _Segment:
+    """One append-only slice of the index: `seg-<n>.vec` (row-major vectors),
+    `seg-<n>.ids` (uint64 frame uids), `seg-<n>.live` (1 byte per row, cleared when
+    the row is replaced or removed) and, once an IVF is trained, `seg-<n>.lists`
+    (int32 coarse cluster per row)."""
+
+    def __init__(self, root: Path, n: int, dim: int, dtype: np.dtype) -> None:
+        stem = root / f"seg-{n:06d}"
+        self.vec_path = stem.with_suffix(".vec")
+        self.ids_path = stem.with_suffix(".ids")
+        self.live_path = stem.with_suffix(".live")
+        self.lists_path = stem.with_suffix(".lists")
+        self.dim = dim
+        self.dtype = dtype
+        self.rows = self._recover()
+        self._maps: Dict[str, np.ndarray] = {}
+        self._live: Optional[np.ndarray] = None
+        self._csr: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _recover(self) -> int:
+        """Row count; a torn append (files of unequal length) is cut back."""
+        row_bytes = self.dim * self.dtype.itemsize
+        sizes = [
+            _size(self.vec_path) // row_bytes,
+            _size(self.ids_path) // 8,
+            _size(self.live_path),
+        ]
+        if self.lists_path.exists():
+            sizes.append(_size(self.lists_path) // 4)
+        rows = min(sizes)
+        for path, width in (
+            (self.vec_path, row_bytes),
+            (self.ids_path, 8),
+            (self.live_path, 1),
+            (self.lists_path, 4),
+        ):
+            if path.exists() and _size(path) != rows * width:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * width)
+        return rows
+
+    def _map(self, name: str, path: Path, dtype: Any, shape: Tuple[int, ...]) -> np.ndarray:
+        m = self._maps.get(name)
+        if m is None or m.shape[0] != self.rows:
+            if self.rows:
+                m = np.memmap(path, dtype=dtype, mode="r", shape=shape)
+            else:
+                m = np.zeros(shape, dtype=dtype)  # mmap refuses empty files
+            self._maps[name] = m
+        return m
+
+    def vectors(self) -> np.ndarray:
+        return self._map("vec", self.vec_path, self.dtype, (self.rows, self.dim))
+
+    def ids(self) -> np.ndarray:
+        return self._map("ids", self.ids_path, np.uint64, (self.rows,))
+
+    def live(self) -> np.ndarray:
+        if self._live is None or len(self._live) != self.rows:
+            self._live = self._map("live", self.live_path, np.uint8, (self.rows,)).astype(bool)
+        return self._live
+
+    def lists(self) -> np.ndarray:
+        return self._map("lists", self.lists_path, np.int32, (self.rows,))
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray, lists: Optional[np.ndarray]) -> None:
+        with open(self.vec_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+        with open(self.ids_path, "ab") as f:
+            f.write(np.ascontiguousarray(ids, dtype=np.uint64).tobytes())
+        if lists is not None:
+            with open(self.lists_path, "ab") as f:
+                f.write(np.ascontiguousarray(lists, dtype=np.int32).tobytes())
+        # The live flags go last: a row only counts once all of its files have it
+        with open(self.live_path, "ab") as f:
+            f.write(b"\1" * len(ids))
+        self.rows += len(ids)
+        self._csr = None
+
+    def kill(self, rows: Sequence[int]) -> None:
+        if not len(rows):
+            return
+        flags = np.memmap(self.live_path, dtype=np.uint8, mode="r+", shape=(self.rows,))
+        flags[np.asarray(rows, dtype=np.int64)] = 0
+        flags.flush()
+        del flags
+        self._maps.pop("live", None)
+        self._live = None
+
+    def write_lists(self, lists: np.ndarray) -> None:
+        _atomic_write(self.lists_path, np.ascontiguousarray(lists, dtype=np.int32).tobytes())
+        self._maps.pop("lists", None)
+        self._csr = None
+
+    def inverted(self, nlist: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows grouped by coarse cluster: `order[bounds[c]:bounds[c + 1]]` are the
+        rows of cluster `c`."""
+        if self._csr is None:
+            lists = np.asarray(self.lists())
+            order = np.argsort(lists, kind="stable")
+            bounds = np.searchsorted(lists[order], np.arange(nlist + 1))
+            self._csr = (order, bounds)
+        return self._csr
+
+    def close(self) -> None:
+        self._maps.clear()
+        self._live = None
+        self._csr = None
+
+
+class LocalVectorIndex:
+    """File-backed vector index (inner-product search) under `root`.
+
+    Vectors are appended to memory-mapped segments of up to `segment_rows` rows
+    together with their uint64 ids; upserting an existing id appends a new row and
+    retires the old one. `search` is exact by default, scoring `block_rows` rows
+    at a time with one matrix product. After `build_ivf` it probes only the
+    `nprobe` nearest of `nlist` k-means clusters, which is sub-linear but
+    approximate; rows added later are assigned to the trained clusters.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        dtype: str = "float32",
+        segment_rows: int = 1 << 20,
+        block_rows: int = 1 << 16,
+    ) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.meta_path = self.root / "meta.json"
+        self.ivf_path = self.root / "ivf.npy"
+        meta: Dict[str, Any] = {}
+        if self.meta_path.exists():
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        dtype = meta.get("dtype", dtype)
+        if dtype not in _DTYPES:
+            raise ConfigError(f"Unsupported vector dtype: {dtype} (use float32 or float16)")
+        self.dtype = np.dtype(_DTYPES[dtype])
+        self.dim: Optional[int] = meta.get("dim")
+        self.segment_rows = int(meta.get("segment_rows", segment_rows))
+        self.block_rows = max(1, int(block_rows))
+        self.nprobe = int(meta.get("nprobe", 8))
+        self._lock = threading.RLock()
+        self._segments: List[_Segment] = []
+        self._where: Dict[int, Tuple[int, int]] = {}  # id -> (segment, row) of its live row
+        self._centroids: Optional[np.ndarray] = None
+        if self.dim is not None:
+            for n in range(int(meta.get("segments", 0))):
+                self._segments.append(_Segment(self.root, n, self.dim, self.dtype))
+            self._build_id_map()
+            if self.ivf_path.exists():
+                self._centroids = np.load(self.ivf_path)
+
+    def _build_id_map(self) -> None:
+        stale: Dict[int, List[int]] = {}
+        for s, seg in enumerate(self._segments):
+            ids, live = seg.ids(), seg.live()
+            for row in np.flatnonzero(live):
+                uid = int(ids[row])
+                prev = self._where.get(uid)
+                if prev is not None:
+                    # Crashed between appending a replacement and retiring the old row
+                    stale.setdefault(prev[0], []).append(prev[1])
+                self._where[uid] = (s, int(row))
+        for s, rows in stale.items():
+            self._segments[s].kill(rows)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    @property
+    def nlist(self) -> int:
+        return 0 if self._centroids is None else int(self._centroids.shape[0])
+
+    # writes
+    def upsert(self, ids: Sequence[int], vectors: np.ndarray, payloads: Any = None) -> None:
+        """Add or replace vectors by id. `payloads` is accepted for backend
+        compatibility and ignored: metadata lives in the frame store."""
+        ids = np.asarray(ids, dtype=np.uint64).reshape(-1)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(ids):
+            raise ValueError(f"expected ({len(ids)}, dim) vectors, got {vectors.shape}")
+        if not len(ids):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self.save()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"index holds {self.dim}-d vectors, got {vectors.shape[1]}-d")
+
+            # Within one batch the last vector of an id wins
+            _, last = np.unique(ids[::-1], return_index=True)
+            keep = np.sort(len(ids) - 1 - last)
+            ids, vectors = ids[keep], vectors[keep]
+            # Rows being replaced are retired only after the new ones are written
+            old: Dict[int, List[int]] = {}
+            for uid in ids.tolist():
+                where = self._where.get(int(uid))
+                if where is not None:
+                    old.setdefault(where[0], []).append(where[1])
+
+            lists = self._assign(vectors) if self._centroids is not None else None
+            start = 0
+            while start < len(ids):
+                if not self._segments or self._segments[-1].rows >= self.segment_rows:
+                    self._segments.append(
+                        _Segment(self.root, len(self._segments), self.dim, self.dtype)
+                    )
+                    self.save()
+                seg = self._segments[-1]
+                stop = min(len(ids), start + self.segment_rows - seg.rows)
+                first = seg.rows
+                part = None if lists is None else lists[start:stop]
+                seg.append(ids[start:stop], vectors[start:stop], part)
+                s = len(self._segments) - 1
+                for j, uid in enumerate(ids[start:stop].tolist()):
+                    self._where[int(uid)] = (s, first + j)
+                start = stop
+            for s, rows in old.items():
+                self._segments[s].kill(rows)
+
+    def remove(self, ids: Sequence[int]) -> None:
+        with self._lock:
+            self._retire(np.asarray(ids, dtype=np.uint64).reshape(-1))
+
+    def _retire(self, ids: np.ndarray) -> None:
+        by_segment: Dict[int, List[int]] = {}
+        for uid in ids.tolist():
+            where = self._where.pop(int(uid), None)
+            if where is not None:
+                by_segment.setdefault(where[0], []).append(where[1])
+        for s, rows in by_segment.items():
+            self._segments[s].kill(rows)
+
+    # reads
+    def contains(self, ids: Sequence[int]) -> np.ndarray:
+        return np.array([int(u) in self._where for u in ids], dtype=bool)
+
+    def get(self, ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """`(found_ids, vectors)` for the ids present in the index, in input order."""
+        with self._lock:
+            found = [int(u) for u in ids if int(u) in self._where]
+            out = np.zeros((len(found), self.dim or 0), dtype=np.float32)
+            for j, uid in enumerate(found):
+                s, row = self._where[uid]
+                out[j] = self._segments[s].vectors()[row]
+            return np.asarray(found, dtype=np.uint64), out
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        *,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-`k` ids and inner-product scores for each query row, best first.
+
+        Returns `(ids, scores)` of shape (n_queries, min(k, len(self))). Uses the
+        IVF (probing `nprobe` clusters) when one is trained, unless `exact`.
+        """
+        q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            k = min(int(k), len(self))
+            if self.dim is not None and q.shape[1] != self.dim:
+                raise ValueError(f"index holds {self.dim}-d vectors, got {q.shape[1]}-d queries")
+            if k <= 0:
+                return np.zeros((len(q), 0), dtype=np.uint64), np.zeros((len(q), 0), np.float32)
+            if self._centroids is not None and not exact:
+                rows = [self._search_ivf(qi, k, nprobe or self.nprobe) for qi in q]
+                return np.stack([r[0] for r in rows]), np.stack([r[1] for r in rows])
+            return self._search_exact(q, k)
+
+    def _search_exact(self, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        best_ids = np.zeros((len(q), 0), dtype=np.uint64)
+        best = np.zeros((len(q), 0), dtype=np.float32)
+        for seg in self._segments:
+            vecs, ids, live = seg.vectors(), seg.ids(), seg.live()
+            for a in range(0, seg.rows, self.block_rows):
+                b = min(seg.rows, a + self.block_rows)
+                scores = q @ np.asarray(vecs[a:b], dtype=np.float32).T
+                scores[:, ~live[a:b]] = -np.inf
+                best, best_ids = _merge_topk(best, best_ids, scores, ids[a:b], k)
+        best, best_ids = _sorted(best, best_ids)
+        return best_ids, best
+
+    def _search_ivf(self, q: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        assert self._centroids is not None
+        probes = np.argsort(_sq_dist(q[None], self._centroids)[0])[: max(1, nprobe)]
+        best_ids = np.zeros((1, 0), dtype=np.uint64)
+        best = np.zeros((1, 0), dtype=np.float32)
+        for seg in self._segments:
+            order, bounds = seg.inverted(self.nlist)
+            rows = np.concatenate([order[bounds[c] : bounds[c + 1]] for c in probes])
+            if not len(rows):
+                continue
+            rows.sort()  # sequential reads from the memory map
+            scores = np.asarray(seg.vectors()[rows], dtype=np.float32) @ q
+            scores[~seg.live()[rows]] = -np.inf
+            best, best_ids = _merge_topk(best, best_ids, scores[None], seg.ids()[rows], k)
+        best, best_ids = _sorted(best, best_ids)
+        # Fewer than k live rows in the probed clusters
+        ok = np.isfinite(best[0])
+        pad = k - int(ok.sum())
+        return (
+            np.concatenate([best_ids[0][ok], np.zeros(pad, dtype=np.uint64)]),
+            np.concatenate([best[0][ok], np.full(pad, -np.inf, dtype=np.float32)]),
+        )
+
+    # IVF
+    def build_ivf(
+        self,
+        nlist: Optional[int] = None,
+        *,
+        nprobe: Optional[int] = None,
+        iters: int = 20,
+        sample: int = 100_000,
+        seed: int = 0,
+    ) -> None:
+        """Train `nlist` k-means clusters (default ~4 * sqrt(n)) on up to `sample`
+        live vectors and assign every row to one."""
+        with self._lock:
+            n = len(self)
+            if n == 0:
+                raise ValueError("cannot train an IVF on an empty index")
+            nlist = int(nlist or max(1, round(4 * np.sqrt(n))))
+            nlist = max(1, min(nlist, n))
+            rng = np.random.default_rng(seed)
+            picks = list(self._where.values())
+            take = rng.choice(len(picks), size=min(int(sample), n), replace=False)
+            train = np.zeros((len(take), self.dim or 0), dtype=np.float32)
+            for j, t in enumerate(take):
+                s, row = picks[t]
+                train[j] = self._segments[s].vectors()[row]
+            self._centroids = _kmeans(train, nlist, iters=iters, rng=rng)
+            if nprobe is not None:
+                self.nprobe = max(1, int(nprobe))
+            for seg in self._segments:
+                lists = np.zeros(seg.rows, dtype=np.int32)
+                vecs = seg.vectors()
+                for a in range(0, seg.rows, self.block_rows):
+                    b = min(seg.rows, a + self.block_rows)
+                    lists[a:b] = self._assign(np.asarray(vecs[a:b], dtype=np.float32))
+                seg.write_lists(lists)
+            _atomic_write(self.ivf_path, _npy_bytes(self._centroids))
+            self.save()
+
+    def drop_ivf(self) -> None:
+        with self._lock:
+            self._centroids = None
+            self.ivf_path.unlink(missing_ok=True)
+            for seg in self._segments:
+                seg.lists_path.unlink(missing_ok=True)
+                seg.close()
+            self.save()
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        assert self._centroids is not None
+        return _nearest(vectors, self._centroids)
+
+    # lifecycle
+    def save(self) -> None:
+        """Persist the index layout (vector data is written on every upsert)."""
+        with self._lock:
+            meta = {
+                "dim": self.dim,
+                "dtype": self.dtype.name,
+                "segment_rows": self.segment_rows,
+                "segments": len(self._segments),
+                "nprobe": self.nprobe,
+            }
+            _atomic_write(self.meta_path, json.dumps(meta).encode("utf-8"))
+
+    def close(self) -> None:
+        with self._lock:
+            for seg in self._segments:
+                seg.close()
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _npy_bytes(arr: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, arr)
+    return buf.getvalue()
+
+
+def _sq_dist(x: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Squared L2 distances between rows of `x` and `c` (up to a per-row constant)."""
+    return (c * c).sum(axis=1)[None, :] - 2.0 * (x @ c.T)
+
+
+def _nearest(x: np.ndarray, c: np.ndarray, block: int = 8192) -> np.ndarray:
+    """Index of the nearest row of `c` for every row of `x`, in bounded-memory blocks."""
+    out = np.empty(len(x), dtype=np.int32)
+    for a in range(0, len(x), block):
+        out[a : a + block] = np.argmin(_sq_dist(x[a : a + block], c), axis=1)
+    return out
+
+
+def _kmeans(x: np.ndarray, k: int, *, iters: int, rng: np.random.Generator) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are re-seeded from random points."""
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(max(1, int(iters))):
+        assign = _nearest(x, centroids)
+        counts = np.bincount(assign, minlength=k)
+        # Per-cluster sums over the points sorted by cluster
+        order = np.argsort(assign, kind="stable")
+        starts = np.searchsorted(assign[order], np.arange(k))
+        filled = counts > 0
+        sums = np.add.reduceat(x[order], starts[filled], axis=0)
+        centroids[filled] = sums / counts[filled, None]
+        if not filled.all():
+            n_empty = int((~filled).sum())
+            centroids[~filled] = x[rng.choice(len(x), size=n_empty, replace=False)]
+    return centroids.astype(np.float32)
+
+
+def _merge_topk(
+    best: np.ndarray, best_ids: np.ndarray, scores: np.ndarray, ids: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the `k` highest of the running best and a new (n_queries, m) block."""
+    cand = np.concatenate([best, scores], axis=1)
+    cand_ids = np.concatenate([best_ids, np.broadcast_to(ids, scores.shape)], axis=1)
+    if cand.shape[1] <= k:
+        return cand, cand_ids
+    top = np.argpartition(-cand, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(cand, top, axis=1), np.take_along_axis(cand_ids, top, axis=1)
+
+
+def _sorted(best: np.ndarray, best_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(-best, axis=1, kind="stable")
+    return np.take_along_axis(best, order, axis=1), np.take_along_axis(best_ids, order, axis=1)
+
+
+def open_backend(name: Optional[str], root: Path, **kwargs: Any) -> Optional[LocalVectorIndex]:
+    """Vector backend by name: "local" (or "faiss", kept as an alias from before a
+    backend shipped) is `LocalVectorIndex`; None/"none" disables indexing."""
+    if name is None or name == "none":
+        return None
+    if name in {"local", "faiss"}:
+        return LocalVectorIndex(root, **kwargs)
+    raise ConfigError(f"Unknown vector backend: {name}")
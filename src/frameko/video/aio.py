@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Dict, List, Optional, Sequence, TypeVar
+
+from ..instrument import subprocess_done
+from .extract import (
+    AUTO_MAX_GAP_SEC,
+    SEEK,
+    DecodeBatch,
+    _extract_cmd,
+    _has_output,
+    _place_selected,
+    _select_cmd,
+    _select_dir,
+    _unbatched,
+    choose_strategy,
+    plan_decode_batches,
+)
+from .ffmpeg import _parse_probe, _probe_cmd
+
+T = TypeVar("T")
+
+
+async def run_async(
+    cmd: List[str],
+    *,
+    timeout: Optional[float] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+) -> subprocess.CompletedProcess:
+    """asyncio counterpart of `ffmpeg.run`.
+
+    `limit` caps how many processes run at once. If the call is cancelled or takes
+    longer than `timeout` seconds, the child process is killed and reaped before
+    `CancelledError` / `TimeoutError` propagates.
+    """
+    if limit is not None:
+        async with limit:
+            return await run_async(cmd, timeout=timeout)
+
+    t0 = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+            await asyncio.shield(proc.wait())
+        raise
+    finally:
+        subprocess_done(cmd, time.perf_counter() - t0)
+    return subprocess.CompletedProcess(
+        cmd,
+        proc.returncode,
+        stdout.decode("utf-8", errors="replace"),
+        stderr.decode("utf-8", errors="replace"),
+    )
+
+
+async def probe_video_async(
+    video_path: Path,
+    *,
+    timeout: Optional[float] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+) -> Dict[str, Any]:
+    """asyncio counterpart of `ffmpeg.probe_video`."""
+    video_path = Path(video_path)
+    if not video_path.exists():
+        raise FileNotFoundError(str(video_path))
+
+    p = await run_async(_probe_cmd(video_path), timeout=timeout, limit=limit)
+    if p.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {p.stderr[:500]}")
+    return _parse_probe(p.stdout)
+
+
+async def extract_frame_async(
+    video_path: Path,
+    t_sec: float,
+    out_path: Path,
+    jpeg_quality: int = 2,
+    *,
+    timeout: Optional[float] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+) -> None:
+    """asyncio counterpart of `extract.extract_frame`."""
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    cmd = _extract_cmd(video_path, t_sec, out_path, jpeg_quality)
+    p = await run_async(cmd, timeout=timeout, limit=limit)
+    if p.returncode != 0:
+        raise RuntimeError(f"ffmpeg extract failed: {p.stderr[:500]}")
+
+    if not _has_output(out_path):
+        cmd = _extract_cmd(video_path, t_sec, out_path, jpeg_quality, input_seek=False)
+        p2 = await run_async(cmd, timeout=timeout, limit=limit)
+        if p2.returncode != 0 or not _has_output(out_path):
+            raise RuntimeError(
+                f"ffmpeg produced empty output at t={t_sec:.3f}. "
+                f"stderr: {(p2.stderr or p.stderr)[:500]}"
+            )
+
+
+async def extract_frames_async(
+    video_path: Path,
+    timestamps: Sequence[float],
+    out_paths: Sequence[Path],
+    *,
+    jpeg_quality: int = 2,
+    fps: Optional[float] = None,
+    strategy: str = "auto",
+    max_gap_sec: float = AUTO_MAX_GAP_SEC,
+    keyframes: Optional[Sequence[float]] = None,
+    video_start: float = 0.0,
+    timeout: Optional[float] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+) -> str:
+    """asyncio counterpart of `extract.extract_frames`.
+
+    Uses the same strategies and decode batches: one subprocess per single-pass,
+    GOP or keyframes batch and one per seek, all started concurrently under
+    `limit`. `timeout` applies to each process, so a single-pass batch must finish
+    within it as a whole. If any extraction fails, the others are cancelled
+    (killing their ffmpeg processes) and the first error is raised.
+
+    Returns the strategy that was used.
+    """
+    video_path = Path(video_path)
+    out_paths = [Path(p) for p in out_paths]
+    if len(timestamps) != len(out_paths):
+        raise ValueError("timestamps and out_paths must have the same length")
+    if not out_paths:
+        return SEEK
+
+    picked = choose_strategy(
+        timestamps, fps, strategy=strategy, max_gap_sec=max_gap_sec, keyframes=keyframes
+    )
+    if picked != SEEK and len({p.suffix.lower() for p in out_paths}) > 1:
+        picked = SEEK
+    batches = plan_decode_batches(
+        timestamps, picked, fps=fps, keyframes=keyframes, video_start=video_start
+    )
+
+    async def decode(batch: DecodeBatch) -> List[int]:
+        positions, input_args, indices = batch
+        paths = [out_paths[pos] for pos in positions]
+        tmp_dir = _select_dir(paths)
+        try:
+            cmd = _select_cmd(video_path, input_args, indices, paths, tmp_dir, jpeg_quality)
+            p = await run_async(cmd, timeout=timeout, limit=limit)
+            if p.returncode != 0:
+                raise RuntimeError(f"ffmpeg batch extract failed: {p.stderr[:500]}")
+            return [positions[j] for j in _place_selected(tmp_dir, indices, paths)]
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    async def seek(pos: int) -> List[int]:
+        await extract_frame_async(
+            video_path, timestamps[pos], out_paths[pos], jpeg_quality, timeout=timeout, limit=limit
+        )
+        return []
+
+    # Batches and the positions no batch covers run together; frames a batch
+    # could not produce are seeked afterwards
+    runs = [decode(b) for b in batches]
+    runs += [seek(pos) for pos in _unbatched(len(out_paths), batches)]
+    missing = [pos for left in await _gather_or_cancel(runs) for pos in left]
+    await _gather_or_cancel([seek(pos) for pos in sorted(missing)])
+    return picked
+
+
+async def _gather_or_cancel(coros: Sequence[Awaitable[T]]) -> List[T]:
+    """Run `coros` concurrently; on the first failure (or cancellation) cancel
+    the rest, wait for them to finish and re-raise."""
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -1,11 +1,34 @@
 from __future__ import annotations
 
+import bisect
+import math
+import shutil
 import subprocess
+import tempfile
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from ..concurrency import ordered_map
 from .ffmpeg import run
 
 
+# Batch extraction strategies
+SEEK = "seek"  # one `ffmpeg -ss` process per timestamp
+SINGLE_PASS = "single_pass"  # decode once, pick frames with a select filter
+GOP = "gop"  # one decode per keyframe interval (GOP) holding requested frames
+KEYFRAMES = "keyframes"  # decode keyframes only (`-skip_frame nokey`)
+
+# Average spacing (seconds) between requested timestamps above which per-timestamp
+# seeking is expected to be cheaper than decoding the whole span sequentially.
+AUTO_MAX_GAP_SEC = 4.0
+
+# Expressions longer than this go through a filter script instead of argv.
+_MAX_INLINE_FILTER = 16_000
+
+# One ffmpeg decode run: (positions, input args, decoded frame number per position)
+DecodeBatch = Tuple[List[int], List[str], List[int]]
+
+
 def extract_frame(
     video_path: Path,
     t_sec: float,
@@ -15,38 +38,354 @@ def extract_frame(
     out_path = Path(out_path)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    cmd = [
-        "ffmpeg",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-ss",
-        f"{t_sec:.3f}",
-        "-i",
-        str(video_path),
-        "-frames:v",
-        "1",
-    ]
+    p = run(_extract_cmd(video_path, t_sec, out_path, jpeg_quality))
+    if p.returncode != 0:
+        raise RuntimeError(f"ffmpeg extract failed: {p.stderr[:500]}")
+
+    if not _has_output(out_path):
+        # Input seeking can land past the last decodable frame; retry decoding up to t
+        p2 = run(_extract_cmd(video_path, t_sec, out_path, jpeg_quality, input_seek=False))
+        if p2.returncode != 0 or not _has_output(out_path):
+            raise RuntimeError(f"ffmpeg produced empty output at t={t_sec:.3f}. stderr: {(p2.stderr or p.stderr)[:500]}")
 
-    if out_path.suffix.lower() in {".jpg", ".jpeg"}:
+
+def _extract_cmd(
+    video_path: Path,
+    t_sec: float,
+    out_path: Path,
+    jpeg_quality: int = 2,
+    input_seek: bool = True,
+) -> List[str]:
+    """ffmpeg command writing the frame at `t_sec` to `out_path`.
+
+    `input_seek` puts `-ss` before `-i` (fast keyframe seek); otherwise the video
+    is decoded up to `t_sec`.
+    """
+    seek = ["-ss", f"{t_sec:.3f}"]
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if input_seek:
+        cmd += seek + ["-i", str(video_path)]
+    else:
+        cmd += ["-i", str(video_path)] + seek
+    cmd += ["-frames:v", "1"]
+
+    if Path(out_path).suffix.lower() in {".jpg", ".jpeg"}:
         cmd += ["-q:v", str(int(jpeg_quality))]
 
     cmd += ["-y", str(out_path)]
+    return cmd
 
-    p = run(cmd)
-    if p.returncode != 0:
-        raise RuntimeError(f"ffmpeg extract failed: {p.stderr[:500]}")
 
-    if (not out_path.exists()) or out_path.stat().st_size == 0:
-        cmd2 = [
-            "ffmpeg","-hide_banner","-loglevel","error",
-            "-i", str(video_path),
-            "-ss", f"{t_sec:.3f}",
-            "-frames:v","1",
-        ]
-        if out_path.suffix.lower() in {".jpg",".jpeg"}:
-            cmd2 += ["-q:v", str(int(jpeg_quality))]
-        cmd2 += ["-y", str(out_path)]
-        p2 = run(cmd2)
-        if p2.returncode != 0 or (not out_path.exists()) or out_path.stat().st_size == 0:
-            raise RuntimeError(f"ffmpeg produced empty output at t={t_sec:.3f}. stderr: {(p2.stderr or p.stderr)[:500]}")
+def _has_output(path: Path) -> bool:
+    return path.exists() and path.stat().st_size > 0
+
+
+def choose_strategy(
+    timestamps: Sequence[float],
+    fps: Optional[float],
+    strategy: str = "auto",
+    max_gap_sec: float = AUTO_MAX_GAP_SEC,
+    keyframes: Optional[Sequence[float]] = None,
+) -> str:
+    """Pick how a batch of timestamps should be extracted.
+
+    Single-pass and GOP extraction need a known frame rate to map timestamps to
+    frame numbers; without one (or with fewer than two timestamps) it always
+    seeks. GOP and keyframe-only extraction also need the keyframe times; when
+    they are known, `auto` groups sparse timestamps by GOP instead of seeking.
+
+    The mapping assumes a constant frame rate: frame n is shown at
+    `video_start + n / fps`. Pass `fps=None` for variable-frame-rate video
+    (`ffmpeg.decode_fps` does) so its frames are seeked instead.
+    """
+    if strategy not in {"auto", SEEK, SINGLE_PASS, GOP, KEYFRAMES}:
+        raise ValueError(f"Unknown extract strategy: {strategy}")
+    if strategy == KEYFRAMES:
+        return KEYFRAMES if keyframes else SEEK
+    if not fps or fps <= 0 or len(timestamps) < 2:
+        return SEEK
+    if strategy == GOP and not keyframes:
+        return SEEK
+    if strategy != "auto":
+        return strategy
+
+    span = max(timestamps) - min(timestamps)
+    avg_gap = span / (len(timestamps) - 1)
+    if avg_gap <= max_gap_sec:
+        return SINGLE_PASS
+    return GOP if keyframes else SEEK
+
+
+def plan_gop_groups(timestamps: Sequence[float], keyframes: Sequence[float]) -> List[List[int]]:
+    """Group timestamp positions by the keyframe interval (GOP) they fall in.
+
+    Groups come out in keyframe order with positions sorted by time, so each GOP
+    is decoded at most once and the file is read front to back.
+    """
+    kf = sorted(keyframes)
+    groups: Dict[int, List[int]] = {}
+    for pos, t in enumerate(timestamps):
+        g = max(0, bisect.bisect_right(kf, float(t) + 1e-6) - 1)
+        groups.setdefault(g, []).append(pos)
+    return [
+        sorted(groups[g], key=lambda pos: float(timestamps[pos])) for g in sorted(groups)
+    ]
+
+
+def plan_batches(
+    timestamps: Sequence[float], batch_size: int, keyframes: Optional[Sequence[float]] = None
+) -> List[List[int]]:
+    """Split time-ordered positions into consecutive batches of about `batch_size`.
+
+    With `keyframes` a batch only ends where a new GOP starts, so extracting the
+    batches one after another never decodes a GOP twice.
+    """
+    size = max(1, int(batch_size))
+    kf = sorted(keyframes or [])
+    batches: List[List[int]] = []
+    current: List[int] = []
+    gop = None
+    for pos, t in enumerate(timestamps):
+        g = bisect.bisect_right(kf, float(t) + 1e-6) if kf else None
+        if len(current) >= size and (not kf or g != gop):
+            batches.append(current)
+            current = []
+        current.append(pos)
+        gop = g
+    if current:
+        batches.append(current)
+    return batches
+
+
+def keyframe_ordinals(timestamps: Sequence[float], keyframes: Sequence[float]) -> List[int]:
+    """Index of the keyframe nearest to each timestamp (its frame number when
+    decoding with `-skip_frame nokey`)."""
+    kf = sorted(keyframes)
+    out = []
+    for t in timestamps:
+        i = bisect.bisect_left(kf, float(t))
+        if i == len(kf) or (i > 0 and float(t) - kf[i - 1] <= kf[i] - float(t)):
+            i -= 1
+        out.append(max(0, i))
+    return out
+
+
+def frame_index(t_sec: float, fps: float, video_start: float = 0.0) -> int:
+    """Index of the first frame at or after `t_sec` (what `-ss t_sec` lands on).
+
+    `video_start` is when frame 0 is shown, counted like `t_sec` from the
+    container start.
+    """
+    return max(0, int(math.ceil((float(t_sec) - video_start) * float(fps) - 1e-6)))
+
+
+def select_expr(indices: Sequence[int]) -> str:
+    """Build a `select` expression matching the given sorted frame numbers.
+
+    A balanced if() tree keeps per-frame evaluation at O(log n) comparisons even
+    when thousands of frames are requested.
+    """
+
+    def build(lo: int, hi: int) -> str:
+        if hi - lo <= 4:
+            return "+".join(f"eq(n,{k})" for k in indices[lo:hi])
+        mid = (lo + hi) // 2
+        return f"if(lt(n,{indices[mid]}),{build(lo, mid)},{build(mid, hi)})"
+
+    return build(0, len(indices))
+
+
+def extract_frames(
+    video_path: Path,
+    timestamps: Sequence[float],
+    out_paths: Sequence[Path],
+    *,
+    jpeg_quality: int = 2,
+    fps: Optional[float] = None,
+    strategy: str = "auto",
+    max_gap_sec: float = AUTO_MAX_GAP_SEC,
+    max_workers: int = 1,
+    keyframes: Optional[Sequence[float]] = None,
+    video_start: float = 0.0,
+) -> str:
+    """Extract one frame per timestamp into the matching `out_paths` entry.
+
+    With the single-pass strategy the video is decoded once from the first
+    requested frame and every wanted frame is written by that one ffmpeg process.
+    The GOP strategy (needs `keyframes`) does the same per keyframe interval, so
+    frames sharing a GOP cost a single decode of it. The keyframes strategy decodes
+    only keyframes and writes the keyframe nearest to each timestamp.
+    Frames a batch could not produce (e.g. timestamps past the last frame) are
+    retried with per-timestamp seeking. Up to `max_workers` ffmpeg processes run
+    at once for seeks and GOP groups. `video_start` is the probed
+    `info["video_start"]`.
+
+    Returns the strategy that was used.
+    """
+    video_path = Path(video_path)
+    out_paths = [Path(p) for p in out_paths]
+    if len(timestamps) != len(out_paths):
+        raise ValueError("timestamps and out_paths must have the same length")
+    if not out_paths:
+        return SEEK
+
+    picked = choose_strategy(
+        timestamps, fps, strategy=strategy, max_gap_sec=max_gap_sec, keyframes=keyframes
+    )
+    if picked != SEEK and len({p.suffix.lower() for p in out_paths}) > 1:
+        picked = SEEK
+    batches = plan_decode_batches(
+        timestamps, picked, fps=fps, keyframes=keyframes, video_start=video_start
+    )
+
+    def decode(batch: DecodeBatch) -> List[int]:
+        positions, input_args, indices = batch
+        left = _extract_select(
+            video_path, input_args, indices, [out_paths[pos] for pos in positions], jpeg_quality
+        )
+        return [positions[j] for j in left]
+
+    missing = _unbatched(len(timestamps), batches)
+    for left in ordered_map(decode, batches, max_workers=max_workers):
+        missing += left
+
+    def seek(pos: int) -> None:
+        extract_frame(
+            video_path=video_path,
+            t_sec=float(timestamps[pos]),
+            out_path=out_paths[pos],
+            jpeg_quality=jpeg_quality,
+        )
+
+    for _ in ordered_map(seek, sorted(missing), max_workers=max_workers):
+        pass
+    return picked
+
+
+def plan_decode_batches(
+    timestamps: Sequence[float],
+    picked: str,
+    *,
+    fps: Optional[float] = None,
+    keyframes: Optional[Sequence[float]] = None,
+    video_start: float = 0.0,
+) -> List[DecodeBatch]:
+    """The decode runs of a strategy returned by `choose_strategy`.
+
+    Each batch is one ffmpeg run: (positions, input args, decoded frame number per
+    position). Single-pass decoding starts half a frame before the first requested
+    frame, so that frame becomes frame 0 of the run. Positions in no batch (every
+    one for `seek`, lone frames of a GOP) are extracted by seeking.
+    """
+    positions = list(range(len(timestamps)))
+    if picked == KEYFRAMES:
+        assert keyframes is not None
+        return [(positions, ["-skip_frame", "nokey"], keyframe_ordinals(timestamps, keyframes))]
+    if picked == SINGLE_PASS:
+        groups = [positions]
+    elif picked == GOP:
+        assert keyframes is not None
+        groups = [g for g in plan_gop_groups(timestamps, keyframes) if len(g) > 1]
+    else:
+        return []
+
+    assert fps is not None
+    return [decode_batch(timestamps, group, float(fps), video_start) for group in groups]
+
+
+def decode_batch(
+    timestamps: Sequence[float], group: List[int], fps: float, video_start: float = 0.0
+) -> DecodeBatch:
+    """One sequential decode of the frames at `group`'s timestamps, starting half
+    a frame before the first of them."""
+    indices = [frame_index(timestamps[pos], fps, video_start) for pos in group]
+    first = min(indices)
+    input_args = ["-ss", f"{video_start + (first - 0.5) / fps:.6f}"] if first > 0 else []
+    return group, input_args, [k - first for k in indices]
+
+
+def _unbatched(n: int, batches: Sequence[DecodeBatch]) -> List[int]:
+    covered = {pos for positions, _, _ in batches for pos in positions}
+    return [pos for pos in range(n) if pos not in covered]
+
+
+def _extract_select(
+    video_path: Path,
+    input_args: List[str],
+    indices: Sequence[int],
+    out_paths: Sequence[Path],
+    jpeg_quality: int,
+) -> List[int]:
+    """Write decoded frame number `indices[i]` (counted after `input_args` are
+    applied) to `out_paths[i]` with one ffmpeg run; return positions left unwritten."""
+    tmp_dir = _select_dir(out_paths)
+    try:
+        p = run(_select_cmd(video_path, input_args, indices, out_paths, tmp_dir, jpeg_quality))
+        if p.returncode != 0:
+            raise RuntimeError(f"ffmpeg batch extract failed: {p.stderr[:500]}")
+        return _place_selected(tmp_dir, indices, out_paths)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _select_dir(out_paths: Sequence[Path]) -> Path:
+    """Scratch directory for a batch, next to its outputs so results can be moved."""
+    out_dir = Path(out_paths[0]).parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(prefix=".frameko-", dir=out_dir))
+
+
+def _select_cmd(
+    video_path: Path,
+    input_args: List[str],
+    indices: Sequence[int],
+    out_paths: Sequence[Path],
+    tmp_dir: Path,
+    jpeg_quality: int,
+) -> List[str]:
+    """ffmpeg command writing the wanted frames as numbered images into `tmp_dir`."""
+    wanted = sorted(set(indices))
+    suffix = Path(out_paths[0]).suffix
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    cmd += input_args + ["-i", str(video_path), "-map", "0:v:0"]
+
+    graph = f"select='{select_expr(wanted)}'"
+    if len(graph) > _MAX_INLINE_FILTER:
+        script = tmp_dir / "select.txt"
+        script.write_text(graph, encoding="utf-8")
+        cmd += ["-filter_script:v", str(script)]
+    else:
+        cmd += ["-vf", graph]
+
+    cmd += ["-vsync", "0", "-frames:v", str(len(wanted))]
+    if suffix.lower() in {".jpg", ".jpeg"}:
+        cmd += ["-q:v", str(int(jpeg_quality))]
+    cmd += ["-start_number", "0", "-y", str(tmp_dir / f"%06d{suffix}")]
+    return cmd
+
+
+def _place_selected(tmp_dir: Path, indices: Sequence[int], out_paths: Sequence[Path]) -> List[int]:
+    """Move the images `_select_cmd` wrote to their `out_paths`; return positions
+    whose frame was not produced."""
+    wanted = sorted(set(indices))
+    suffix = Path(out_paths[0]).suffix
+    produced = {}
+    for j, k in enumerate(wanted):
+        src = tmp_dir / f"{j:06d}{suffix}"
+        if src.exists() and src.stat().st_size > 0:
+            produced[k] = src
+
+    missing: List[int] = []
+    placed = {}
+    for pos, k in enumerate(indices):
+        if k not in produced:
+            missing.append(pos)
+            continue
+        dst = Path(out_paths[pos])
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if k in placed:
+            shutil.copyfile(placed[k], dst)
+        else:
+            shutil.move(str(produced[k]), str(dst))
+            placed[k] = dst
+    return missing
@@ -1,52 +1,293 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 import shutil
 import subprocess
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from ..errors import ExternalToolMissingError
+from ..instrument import subprocess_done
+
+
+_which_cache: Dict[Tuple[str, str], str] = {}
+
+
+def which(tool: str) -> Optional[str]:
+    """`shutil.which(tool)`, remembered per PATH value. Only hits are kept, so a
+    tool installed while the process runs is still found."""
+    key = (tool, os.environ.get("PATH", ""))
+    found = _which_cache.get(key)
+    if found is None:
+        found = shutil.which(tool)
+        if found is not None:
+            _which_cache[key] = found
+    return found
 
 
 def ensure_ffmpeg() -> None:
-    if shutil.which("ffmpeg") is None:
+    if which("ffmpeg") is None:
         raise ExternalToolMissingError(
             "ffmpeg not found in PATH. Install ffmpeg and ensure it's available."
         )
 
 
 def ensure_ffprobe() -> None:
-    if shutil.which("ffprobe") is None:
+    if which("ffprobe") is None:
         raise ExternalToolMissingError(
             "ffprobe not found in PATH. Install ffmpeg (includes ffprobe)."
         )
 
 
+def user_cache_dir() -> Path:
+    """frameko's per-user cache: `$XDG_CACHE_HOME/frameko` (default `~/.cache/frameko`)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "frameko"
+
+
+_CAPS_SCHEMA = 1
+_caps_memo: Dict[str, Dict[str, Any]] = {}
+_caps_lock = threading.Lock()
+
+
+def ffmpeg_capabilities(tool: str = "ffmpeg", *, refresh: bool = False) -> Dict[str, Any]:
+    """What the `tool` binary found on PATH supports.
+
+    Returns `{"path", "version", "configuration", "threads", "filters", "encoders",
+    "hwaccels"}`; `filters` and `encoders` are sorted name lists and `threads`
+    tells whether the build has threading. Probing runs the binary four times,
+    so the result is kept in memory and in `user_cache_dir()/ffmpeg/`, keyed by
+    the binary's resolved path, size and mtime: replacing the binary (an
+    upgrade) probes again.
+    """
+    path = which(tool)
+    if path is None:
+        raise ExternalToolMissingError(f"{tool} not found in PATH.")
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    ident = f"{real}|{st.st_size}|{st.st_mtime_ns}|{_CAPS_SCHEMA}"
+    key = hashlib.sha1(ident.encode("utf-8")).hexdigest()[:20]
+    with _caps_lock:
+        if not refresh and key in _caps_memo:
+            return _caps_memo[key]
+        cache_file = user_cache_dir() / "ffmpeg" / f"{key}.json"
+        caps: Optional[Dict[str, Any]] = None
+        if not refresh:
+            try:
+                caps = json.loads(cache_file.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                caps = None
+        if not isinstance(caps, dict) or caps.get("path") != real:
+            caps = _probe_capabilities(real)
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp = cache_file.with_name(f".tmp-{os.getpid()}-{cache_file.name}")
+                tmp.write_text(json.dumps(caps), encoding="utf-8")
+                os.replace(tmp, cache_file)
+            except OSError:
+                pass  # read-only home: keep the in-memory copy only
+        _caps_memo[key] = caps
+        return caps
+
+
+def has_filter(name: str, tool: str = "ffmpeg") -> bool:
+    return name in ffmpeg_capabilities(tool)["filters"]
+
+
+def has_encoder(name: str, tool: str = "ffmpeg") -> bool:
+    return name in ffmpeg_capabilities(tool)["encoders"]
+
+
+def require_ffmpeg_features(
+    purpose: str,
+    *,
+    filters: Sequence[str] = (),
+    encoders: Sequence[str] = (),
+    tool: str = "ffmpeg",
+) -> None:
+    """Raise `ExternalToolMissingError` before any work starts if the `tool` build
+    lacks a filter or encoder that `purpose` needs."""
+    missing = [f"filter {n}" for n in filters if not has_filter(n, tool)]
+    missing += [f"encoder {n}" for n in encoders if not has_encoder(n, tool)]
+    if missing:
+        raise ExternalToolMissingError(
+            f"{purpose} needs {', '.join(missing)}, which the {tool} build at "
+            f"{ffmpeg_capabilities(tool)['path']} lacks."
+        )
+
+
+def _listed(stdout: str, *, skip_until: Optional[str] = None, column: int = 1) -> List[str]:
+    """Names from one of ffmpeg's `-filters`/`-encoders`/`-hwaccels` listings."""
+    names = set()
+    started = skip_until is None
+    for line in stdout.splitlines():
+        if not started:
+            started = line.strip().startswith(skip_until or "")
+            continue
+        parts = line.split()
+        if len(parts) > column:
+            names.add(parts[column])
+    return sorted(names)
+
+
+def _probe_capabilities(binary: str) -> Dict[str, Any]:
+    p = run([binary, "-hide_banner", "-version"])
+    if p.returncode != 0:
+        raise RuntimeError(f"{binary} -version failed: {p.stderr[:500]}")
+    lines = p.stdout.splitlines()
+    version = lines[0].split()[2] if lines and len(lines[0].split()) > 2 else None
+    conf = next(
+        (ln.split(":", 1)[1].strip() for ln in lines if ln.startswith("configuration:")), ""
+    )
+
+    def listing(flag: str) -> str:
+        q = run([binary, "-hide_banner", flag])
+        return q.stdout if q.returncode == 0 else ""
+
+    # `-filters` rows are "flags name in->out description"; the legend lines
+    # above them have no "->" column
+    filters = [
+        ln.split()[1]
+        for ln in listing("-filters").splitlines()
+        if len(ln.split()) > 2 and "->" in ln.split()[2]
+    ]
+    return {
+        "path": binary,
+        "version": version,
+        "configuration": conf,
+        "threads": not any(f"--disable-{t}" in conf for t in ("pthreads", "w32threads")),
+        "filters": sorted(set(filters)),
+        "encoders": _listed(listing("-encoders"), skip_until="------"),
+        "hwaccels": _listed(
+            listing("-hwaccels"), skip_until="Hardware acceleration methods:", column=0
+        ),
+    }
+
+
+# Optional global cap on concurrently running ffmpeg/ffprobe processes
+_process_limit: Optional[int] = None
+_process_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def set_process_limit(limit: Optional[int]) -> None:
+    """Cap how many ffmpeg/ffprobe processes frameko runs at once (None = no cap).
+
+    Callers already holding a slot keep it; the new limit applies to later calls.
+    """
+    global _process_limit, _process_slots
+    if limit is None:
+        _process_limit, _process_slots = None, None
+    else:
+        _process_limit = max(1, int(limit))
+        _process_slots = threading.BoundedSemaphore(_process_limit)
+
+
+def get_process_limit() -> Optional[int]:
+    return _process_limit
+
+
+@contextmanager
+def process_slot() -> Iterator[None]:
+    """Hold one of the global process slots for the duration of the block."""
+    slots = _process_slots
+    if slots is None:
+        yield
+        return
+    with slots:
+        yield
+
+
 def run(cmd: List[str]) -> subprocess.CompletedProcess:
-    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, text=True)
+    with process_slot():
+        t0 = time.perf_counter()
+        p = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, text=True
+        )
+        subprocess_done(cmd, time.perf_counter() - t0)
+        return p
 
 
-def probe_video(video_path: Path) -> Dict[str, Any]:
+def _probe_cmd(video_path: Path) -> List[str]:
+    return [
+        "ffprobe",
+        "-v",
+        "error",
+        "-print_format",
+        "json",
+        "-show_streams",
+        "-show_format",
+        str(video_path),
+    ]
+
+
+def probe_video(video_path: Path, keyframes: bool = False) -> Dict[str, Any]:
+    """Basic video info; with `keyframes=True` also `info["keyframes"]` (see
+    `probe_keyframes`)."""
     video_path = Path(video_path)
     if not video_path.exists():
         raise FileNotFoundError(str(video_path))
 
+    p = run(_probe_cmd(video_path))
+    if p.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {p.stderr[:500]}")
+    info = _parse_probe(p.stdout)
+    if keyframes:
+        info["keyframes"] = container_times(probe_keyframes(video_path), info)
+    return info
+
+
+def probe_keyframes(video_path: Path) -> List[float]:
+    """Sorted presentation times (seconds) of the first video stream's keyframes.
+
+    Reads packet headers only (no decoding), so it costs one pass of demuxing.
+    Times are the raw packet times; `container_times` puts them on the timeline
+    of sample timestamps.
+    """
     cmd = [
         "ffprobe",
         "-v",
         "error",
-        "-print_format",
-        "json",
-        "-show_streams",
-        "-show_format",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts_time,flags",
+        "-of",
+        "csv=p=0",
         str(video_path),
     ]
     p = run(cmd)
     if p.returncode != 0:
-        raise RuntimeError(f"ffprobe failed: {p.stderr[:500]}")
+        raise RuntimeError(f"ffprobe keyframe scan failed: {p.stderr[:500]}")
+
+    times = set()
+    for line in p.stdout.splitlines():
+        pts, _, flags = line.strip().partition(",")
+        if "K" not in flags:
+            continue
+        try:
+            times.add(round(float(pts), 6))
+        except ValueError:
+            continue  # "N/A" pts
+    return sorted(times)
+
+
+def container_times(times: List[float], info: Dict[str, Any]) -> List[float]:
+    """Shift raw stream times (e.g. from `probe_keyframes`) to count from the
+    container start, like `-ss` and sample timestamps do."""
+    start = float(info.get("start_time") or 0.0)
+    if not start:
+        return list(times)
+    return [round(t - start, 6) for t in times]
 
-    data = json.loads(p.stdout)
+
+def _parse_probe(stdout: str) -> Dict[str, Any]:
+    """Reduce ffprobe's JSON output to frameko's video info dict."""
+    data = json.loads(stdout)
     fmt = data.get("format", {})
     streams = data.get("streams", [])
     vstream = None
@@ -58,23 +299,84 @@ def probe_video(video_path: Path) -> Dict[str, Any]:
     duration = float(fmt.get("duration", 0.0) or 0.0)
 
     fps = None
+    vfr = False
     if vstream:
-        # r_frame_rate like "24000/1001"
-        r = vstream.get("r_frame_rate") or vstream.get("avg_frame_rate")
-        if r and isinstance(r, str) and "/" in r:
-            num, den = r.split("/", 1)
-            try:
-                fps = float(num) / float(den)
-            except Exception:
-                fps = None
+        # r_frame_rate like "24000/1001"; "0/0" when unknown
+        r_rate = _rate(vstream.get("r_frame_rate"))
+        avg_rate = _rate(vstream.get("avg_frame_rate"))
+        fps = r_rate or avg_rate
+        # Constant-rate streams report the same base and average rate; VFR (or a
+        # field rate reported as the frame rate) makes them differ
+        vfr = bool(r_rate and avg_rate and abs(r_rate - avg_rate) > 0.01 * r_rate)
+
+    # ffmpeg's `-ss` and frameko's timestamps count from the container start, but
+    # the video stream may begin later (an edit list, audio priming, a TS offset)
+    start_time = _seconds(fmt.get("start_time"))
+    video_start = 0.0
+    if vstream and vstream.get("start_time") not in (None, "N/A"):
+        video_start = round(max(0.0, _seconds(vstream["start_time"]) - start_time), 6)
+
+    rotation = 0
+    if vstream:
+        # Older muxers use a "rotate" tag, newer ones a display matrix side data entry
+        rot = (vstream.get("tags") or {}).get("rotate")
+        for sd in vstream.get("side_data_list") or []:
+            if "rotation" in sd:
+                rot = sd["rotation"]
+        try:
+            rotation = int(float(rot or 0)) % 360
+        except Exception:
+            rotation = 0
 
     info: Dict[str, Any] = {
         "duration": duration,
         "fps": fps,
+        "vfr": vfr,
+        "start_time": start_time,
+        "video_start": video_start,
         "width": vstream.get("width") if vstream else None,
         "height": vstream.get("height") if vstream else None,
+        "rotation": rotation,
         "codec": vstream.get("codec_name") if vstream else None,
         "format": fmt.get("format_name"),
         "size": int(fmt.get("size", 0) or 0),
     }
     return info
+
+
+def _rate(value: Any) -> Optional[float]:
+    """Parse an ffprobe rate like "30000/1001"; None when missing or "0/0"."""
+    if not value or not isinstance(value, str) or "/" not in value:
+        return None
+    num, den = value.split("/", 1)
+    try:
+        rate = float(num) / float(den)
+    except Exception:
+        return None
+    return rate if rate > 0 else None
+
+
+def _seconds(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def decode_fps(info: Dict[str, Any]) -> Optional[float]:
+    """Frame rate for mapping timestamps to frame numbers in batch extraction.
+
+    None for variable-frame-rate video: frame n is not at n / fps there, so its
+    frames are extracted by seeking (see `extract.choose_strategy`).
+    """
+    return None if info.get("vfr") else info.get("fps")
+
+
+def display_size(info: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """(width, height) of decoded frames after ffmpeg's autorotation."""
+    w, h = info.get("width"), info.get("height")
+    if not w or not h:
+        return None
+    if int(info.get("rotation") or 0) % 180 == 90:
+        return int(h), int(w)
+    return int(w), int(h)
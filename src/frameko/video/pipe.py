@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..instrument import subprocess_done
+from .extract import (
+    AUTO_MAX_GAP_SEC,
+    GOP,
+    KEYFRAMES,
+    SINGLE_PASS,
+    _MAX_INLINE_FILTER,
+    choose_strategy,
+    decode_batch,
+    keyframe_ordinals,
+    plan_gop_groups,
+    select_expr,
+)
+from .ffmpeg import process_slot
+
+
+_CHANNELS = {"rgb24": 3, "gray": 1}
+
+
+def iter_raw_frames(
+    video_path: Path,
+    timestamps: Sequence[float],
+    *,
+    size: Tuple[int, int],
+    fps: Optional[float] = None,
+    pix_fmt: str = "rgb24",
+    strategy: str = "auto",
+    max_gap_sec: float = AUTO_MAX_GAP_SEC,
+    keyframes: Optional[Sequence[float]] = None,
+    video_start: float = 0.0,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Decode the frames at `timestamps` straight into NumPy arrays.
+
+    ffmpeg streams `rawvideo` over a pipe, so nothing touches the disk. Frames are
+    scaled to `size` (width, height) and yielded as `(position, array)` in position
+    order; the array is (h, w, 3) for `rgb24` and (h, w) for `gray`. Positions that
+    map to the same frame share one array. Strategies and `video_start` are those
+    of `extract.extract_frames`.
+    """
+    if pix_fmt not in _CHANNELS:
+        raise ValueError(f"Unsupported pix_fmt: {pix_fmt}")
+    video_path = Path(video_path)
+    w, h = int(size[0]), int(size[1])
+    shape = (h, w, 3) if _CHANNELS[pix_fmt] == 3 else (h, w)
+    if not timestamps:
+        return
+
+    picked = choose_strategy(
+        timestamps, fps, strategy=strategy, max_gap_sec=max_gap_sec, keyframes=keyframes
+    )
+
+    # Each batch is one ffmpeg run: (positions, input args, decoded frame number per
+    # position). Batches without input args are accurate seeks, one position each.
+    batches: List[Tuple[List[int], Optional[List[str]], List[int]]] = []
+    if picked == KEYFRAMES:
+        assert keyframes is not None
+        ordinals = keyframe_ordinals(timestamps, keyframes)
+        batches.append((list(range(len(timestamps))), ["-skip_frame", "nokey"], ordinals))
+    elif picked in {SINGLE_PASS, GOP}:
+        assert fps is not None
+        if picked == GOP:
+            assert keyframes is not None
+            groups = plan_gop_groups(timestamps, keyframes)
+        else:
+            groups = [list(range(len(timestamps)))]
+        for group in groups:
+            if len(group) == 1 and picked == GOP:
+                batches.append((group, None, []))
+                continue
+            batches.append(decode_batch(timestamps, group, float(fps), video_start))
+    else:
+        batches = [([pos], None, []) for pos in range(len(timestamps))]
+
+    # Frames are released strictly by position so consumers (dedup, resume
+    # checkpoints) never see a later frame before an earlier one.
+    done: set = set()
+    pending: Dict[int, np.ndarray] = {}
+    nxt = 0
+    for group, input_args, indices in batches:
+        if input_args is not None:
+            for pos, arr in _stream_select(video_path, input_args, group, indices, (w, h), pix_fmt):
+                done.add(pos)
+                pending[pos] = arr
+                while nxt in pending:
+                    yield nxt, pending.pop(nxt)
+                    nxt += 1
+        # Seek batches, and anything a decode batch did not produce, use an accurate seek
+        for pos in group:
+            if pos not in done:
+                done.add(pos)
+                pending[pos] = _seek_frame(video_path, float(timestamps[pos]), shape, pix_fmt)
+        while nxt in pending:
+            yield nxt, pending.pop(nxt)
+            nxt += 1
+
+
+def iter_frames_at_rate(
+    video_path: Path,
+    *,
+    rate: float,
+    size: Tuple[int, int],
+    pix_fmt: str = "gray",
+    start_sec: float = 0.0,
+    end_sec: Optional[float] = None,
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """Decode `[start_sec, end_sec)` resampled to `rate` frames per second.
+
+    One ffmpeg run (`fps` + `scale` filters) streams every output frame as
+    `(t_sec, array)`, with `t_sec` relative to the start of the video. Meant for
+    cheap whole-video passes at a small `size`.
+    """
+    if pix_fmt not in _CHANNELS:
+        raise ValueError(f"Unsupported pix_fmt: {pix_fmt}")
+    w, h = int(size[0]), int(size[1])
+    shape = (h, w, 3) if _CHANNELS[pix_fmt] == 3 else (h, w)
+    start = max(0.0, float(start_sec))
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.6f}"]
+    cmd += ["-i", str(video_path), "-map", "0:v:0", "-an", "-sn", "-dn"]
+    if end_sec is not None:
+        cmd += ["-t", f"{max(0.0, float(end_sec) - start):.6f}"]
+    cmd += ["-vf", f"fps={float(rate):g},scale={w}:{h}"]
+    cmd += ["-f", "rawvideo", "-pix_fmt", pix_fmt, "pipe:1"]
+    for k, arr in enumerate(_stream(cmd, shape)):
+        yield start + k / float(rate), arr
+
+
+def _stream_select(
+    video_path: Path,
+    input_args: List[str],
+    positions: Sequence[int],
+    indices: Sequence[int],
+    size: Tuple[int, int],
+    pix_fmt: str,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """One ffmpeg run yielding `(position, array)` for decoded frame `indices[i]`
+    of every `positions[i]`, in frame order."""
+    w, h = size
+    shape = (h, w, 3) if _CHANNELS[pix_fmt] == 3 else (h, w)
+    wanted = sorted(set(indices))
+    by_frame: Dict[int, List[int]] = defaultdict(list)
+    for pos, k in zip(positions, indices):
+        by_frame[k].append(pos)
+
+    graph = f"select='{select_expr(wanted)}',scale={w}:{h}"
+    with tempfile.TemporaryDirectory(prefix="frameko-") as tmp:
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+        cmd += input_args + ["-i", str(video_path), "-map", "0:v:0"]
+        if len(graph) > _MAX_INLINE_FILTER:
+            script = Path(tmp) / "select.txt"
+            script.write_text(graph, encoding="utf-8")
+            cmd += ["-filter_script:v", str(script)]
+        else:
+            cmd += ["-vf", graph]
+        cmd += ["-vsync", "0", "-frames:v", str(len(wanted))]
+        cmd += ["-f", "rawvideo", "-pix_fmt", pix_fmt, "pipe:1"]
+
+        for j, arr in enumerate(_stream(cmd, shape)):
+            for pos in by_frame[wanted[j]]:
+                yield pos, arr
+
+
+def _seek_frame(video_path: Path, t_sec: float, shape: Tuple[int, ...], pix_fmt: str) -> np.ndarray:
+    """Decode the single frame at `t_sec` with an accurate seek."""
+    h, w = shape[0], shape[1]
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-ss", f"{t_sec:.3f}",
+        "-i", str(video_path),
+        "-map", "0:v:0",
+        "-vf", f"scale={w}:{h}",
+        "-frames:v", "1",
+        "-f", "rawvideo", "-pix_fmt", pix_fmt, "pipe:1",
+    ]
+    arr = next(_stream(cmd, shape), None)
+    if arr is None:
+        raise RuntimeError(f"ffmpeg produced no frame at t={t_sec:.3f}")
+    return arr
+
+
+def _stream(cmd: List[str], shape: Tuple[int, ...]) -> Iterator[np.ndarray]:
+    """Run `cmd` and yield fixed-size uint8 frames read from its stdout."""
+    nbytes = int(np.prod(shape))
+    # stderr goes to a file so a chatty ffmpeg can never block on a full pipe
+    with process_slot(), tempfile.TemporaryFile() as err:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err)
+        assert proc.stdout is not None
+        try:
+            while True:
+                buf = bytearray(nbytes)
+                view = memoryview(buf)
+                got = 0
+                while got < nbytes:
+                    n = proc.stdout.readinto(view[got:])
+                    if not n:
+                        break
+                    got += n
+                if got < nbytes:
+                    break
+                yield np.frombuffer(buf, dtype=np.uint8).reshape(shape)
+
+            if proc.wait() != 0:
+                err.seek(0)
+                msg = err.read().decode("utf-8", errors="replace")
+                raise RuntimeError(f"ffmpeg raw decode failed: {msg[:500]}")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            subprocess_done(cmd, time.perf_counter() - t0)
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from frameko.bench.videos import Segment, VideoSpec, ensure_video
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="ffmpeg/ffprobe not installed",
+)
+
+# Hard cuts every 2 s between lavfi test patterns (cuts at 2, 4, ..., 10 s)
+CUTS_SPEC = VideoSpec("cuts-12s", 320, 180, 24, 12, tuple(Segment("cut", 2.0) for _ in range(6)))
+
+
+@pytest.fixture(scope="session")
+def cuts_video(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg not installed")
+    return ensure_video(CUTS_SPEC, tmp_path_factory.mktemp("videos"))
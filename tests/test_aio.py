@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import frameko.video.aio as aio
+from frameko.video.extract import extract_frames
+
+from .conftest import CUTS_SPEC, requires_ffmpeg
+
+# Records its pid, then sleeps far longer than any test waits
+_SLEEPER = "import os, sys, time; open(sys.argv[1], 'w').write(str(os.getpid())); time.sleep(60)"
+
+
+def _sleeper(pid_file: Path):
+    return [sys.executable, "-c", _SLEEPER, str(pid_file)]
+
+
+async def _pid(pid_file: Path) -> int:
+    while not pid_file.exists() or not pid_file.read_text():
+        await asyncio.sleep(0.01)
+    return int(pid_file.read_text())
+
+
+def _reaped(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    return False
+
+
+def test_timeout_kills_child(tmp_path):
+    pid_file = tmp_path / "pid"
+
+    async def main():
+        run = asyncio.ensure_future(aio.run_async(_sleeper(pid_file), timeout=2.0))
+        pid = await _pid(pid_file)
+        with pytest.raises(asyncio.TimeoutError):
+            await run
+        return pid
+
+    assert _reaped(asyncio.run(main()))
+
+
+def test_cancel_kills_child(tmp_path):
+    pid_file = tmp_path / "pid"
+
+    async def main():
+        run = asyncio.ensure_future(aio.run_async(_sleeper(pid_file)))
+        pid = await _pid(pid_file)
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        return pid
+
+    assert _reaped(asyncio.run(main()))
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize("strategy, runs", [("single_pass", 1), ("seek", 8)])
+def test_extract_frames_async_batches_like_sync(strategy, runs, cuts_video, tmp_path, monkeypatch):
+    times = [0.5, 1.0, 2.5, 4.2, 4.6, 7.0, 8.1, 8.3]
+    sync = [tmp_path / "sync" / f"{j}.png" for j in range(len(times))]
+    extract_frames(cuts_video, times, sync, fps=CUTS_SPEC.fps, strategy=strategy)
+
+    cmds = []
+    real = aio.run_async
+
+    async def run_async(cmd, **kw):
+        cmds.append(cmd)
+        return await real(cmd, **kw)
+
+    monkeypatch.setattr(aio, "run_async", run_async)
+    paths = [tmp_path / "async" / f"{j}.png" for j in range(len(times))]
+    picked = asyncio.run(
+        aio.extract_frames_async(cuts_video, times, paths, fps=CUTS_SPEC.fps, strategy=strategy)
+    )
+
+    assert picked == strategy
+    assert len(cmds) == runs
+    for a, b in zip(paths, sync):
+        assert np.array_equal(np.asarray(Image.open(a)), np.asarray(Image.open(b)))
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from frameko.bench.videos import expected_cuts
+from frameko.scenes.chunked import detect_scenes_chunked, plan_windows
+from frameko.scenes.ffmpeg_scenes import detect_scenes_ffmpeg
+from frameko.scenes.scenedetect_adapter import detect_scenes
+from frameko.video.ffmpeg import probe_video
+
+from .conftest import CUTS_SPEC, requires_ffmpeg
+
+FPS = CUTS_SPEC.fps
+CHUNK_SEC = 3.0  # windows end at 3, 6 and 9 s: every window's overlap spans a cut
+
+
+def _cuts(scenes):
+    return [float(s) for s, _ in scenes[1:]]
+
+
+def _single_pass(detector, video, duration):
+    if detector == "ffmpeg":
+        return detect_scenes_ffmpeg(video, 27.0, 15, duration=duration, fps=FPS)
+    return detect_scenes(video, detector, 27.0, 15)
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize("detector", ["ffmpeg", "adaptive"])
+def test_chunked_matches_single_pass(detector, cuts_video):
+    if detector != "ffmpeg":
+        pytest.importorskip("scenedetect")
+    duration = float(probe_video(cuts_video)["duration"])
+    windows = plan_windows(duration, CHUNK_SEC, 1.0)
+    assert len(windows) > 1
+    assert any(w.read_start < c < w.own_start or w.own_end <= c < w.read_end
+               for w in windows for c in expected_cuts(CUTS_SPEC))
+
+    single = _cuts(_single_pass(detector, cuts_video, duration))
+    chunked = _cuts(
+        detect_scenes_chunked(
+            cuts_video,
+            detector,
+            27.0,
+            15,
+            duration=duration,
+            fps=FPS,
+            chunk_sec=CHUNK_SEC,
+            overlap_sec=1.0,
+            max_workers=2,
+        )
+    )
+
+    tol = 1.0 / FPS + 1e-6
+    assert len(single) == len(expected_cuts(CUTS_SPEC))
+    assert len(chunked) == len(single)
+    for a, b in zip(chunked, single):
+        assert abs(a - b) <= tol
+
+
+@requires_ffmpeg
+def test_chunked_from_threads(cuts_video):
+    # ingest_many calls the detector from its prepare threads
+    duration = float(probe_video(cuts_video)["duration"])
+
+    def detect(_):
+        return _cuts(
+            detect_scenes_chunked(
+                cuts_video, "ffmpeg", 27.0, 15, duration=duration, fps=FPS,
+                chunk_sec=CHUNK_SEC, overlap_sec=1.0, max_workers=2,
+            )
+        )
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = list(pool.map(detect, range(3)))
+    assert len(results[0]) == len(expected_cuts(CUTS_SPEC))
+    assert results[1:] == results[:1] * 2
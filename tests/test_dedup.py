@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from frameko.pipelines.dedup import (
+    HammingIndex,
+    dhash_batch,
+    dhash_uint64,
+    greedy_dedup,
+    hamming_distance,
+    hamming_distances,
+    hashes_to_ints,
+    ints_to_hashes,
+)
+
+
+def _near(rng: random.Random, h: int, nbits: int, flips: int) -> int:
+    for b in rng.sample(range(nbits), flips):
+        h ^= 1 << b
+    return h
+
+
+def _brute(stored, q: int, radius: int):
+    dists = ((k, hamming_distance(q, h)) for k, h in enumerate(stored))
+    return [(k, d) for k, d in dists if d <= radius]
+
+
+@pytest.mark.parametrize("nbits, radius", [(64, 6), (64, 0), (256, 12)])
+def test_query_matches_brute_force(nbits, radius):
+    rng = random.Random(nbits + radius)
+    stored = [rng.getrandbits(nbits) for _ in range(300)]
+    # Plenty of neighbours at and around the radius
+    stored += [_near(rng, stored[k], nbits, rng.randint(0, radius + 2)) for k in range(300)]
+    index = HammingIndex(nbits=nbits, radius=radius)
+    for h in stored:
+        index.add(h)
+
+    for _ in range(200):
+        q = _near(rng, rng.choice(stored), nbits, rng.randint(0, radius + 2))
+        expected = _brute(stored, q, radius)
+        assert index.query(q) == expected
+        first = index.find(q)
+        assert (first is None) == (not expected)
+        if first is not None:
+            assert hamming_distance(q, stored[first]) <= radius
+
+
+def test_smaller_query_radius_and_rechunking():
+    rng = random.Random(1)
+    stored = [rng.getrandbits(64) for _ in range(100)]
+    index = HammingIndex(radius=6)
+    for h in stored:
+        index.add(h)
+    q = _near(rng, stored[7], 64, 3)
+
+    assert index.query(q, radius=2) == []
+    assert index.query(q, radius=3) == [(7, 3)]
+    # Never wider than the radius the chunks were built for
+    assert index.query(q, radius=40) == index.query(q)
+    wide = index.with_radius(10)
+    assert wide.query(q) == _brute(stored, q, 10)
+
+
+def test_save_appends_and_load_restores(tmp_path):
+    path = tmp_path / "dedup.bin"
+    index = HammingIndex(nbits=128, radius=4)
+    hashes = [random.Random(k).getrandbits(128) for k in range(5)]
+    for h in hashes[:3]:
+        index.add(h)
+    index.save(path)
+    for h in hashes[3:]:
+        index.add(h)
+    index.save(path)
+    index.save(path)  # nothing new: no write
+
+    loaded = HammingIndex.load(path, nbits=128, radius=4)
+    assert loaded._hashes == hashes
+    assert loaded.find(hashes[4] ^ 0b101) == 4
+    assert len(HammingIndex.load(tmp_path / "missing.bin")) == 0
+
+
+def _images(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=(48, 64), dtype=np.uint8) for _ in range(n)]
+
+
+def _reference_dhash(gray: np.ndarray, hash_size: int) -> int:
+    small = np.asarray(Image.fromarray(gray).resize((hash_size + 1, hash_size)), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return sum(1 << i for i, b in enumerate(bits) if b)
+
+
+@pytest.mark.parametrize("hash_size", [8, 12, 16])
+def test_dhash_batch_matches_per_image_hash(hash_size, tmp_path):
+    grays = _images(6)
+    words = dhash_batch(grays, hash_size=hash_size)
+    assert words.shape == (6, (hash_size * hash_size + 63) // 64)
+    expected = [_reference_dhash(g, hash_size) for g in grays]
+    assert hashes_to_ints(words) == expected
+    assert [dhash_uint64(g, hash_size=hash_size) for g in grays] == expected
+    # Stacked arrays, RGB arrays and image paths hash the same way
+    assert np.array_equal(dhash_batch(np.stack(grays), hash_size=hash_size), words)
+    rgb = np.repeat(grays[0][:, :, None], 3, axis=2)
+    path = tmp_path / "frame.png"
+    Image.fromarray(grays[0]).save(path)
+    assert dhash_uint64(rgb, hash_size) == dhash_uint64(path, hash_size) == expected[0]
+    assert ints_to_hashes(expected, nbits=hash_size * hash_size).tolist() == words.tolist()
+    assert dhash_batch([], hash_size=hash_size).shape == (0, words.shape[1])
+
+
+def test_packed_distances_and_greedy_dedup():
+    rng = random.Random(3)
+    values = [rng.getrandbits(256) for _ in range(40)]
+    values += [_near(rng, values[k], 256, rng.randint(0, 12)) for k in range(40)]
+    rng.shuffle(values)
+    packed = ints_to_hashes(values, nbits=256)
+
+    dists = hamming_distances(packed, packed, block=7)
+    assert dists.tolist() == [[hamming_distance(a, b) for b in values] for a in values]
+    assert hamming_distances(packed[3], packed).tolist() == dists[3].tolist()
+
+    kept = []
+    for h in values:
+        if all(hamming_distance(h, k) > 8 for k in kept):
+            kept.append(h)
+    keep = greedy_dedup(packed, 8, block=16)
+    assert [h for h, k in zip(values, keep) if k] == kept
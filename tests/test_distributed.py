@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+import frameko.distributed as distributed
+from frameko.checkpoint import save_checkpoint
+from frameko.core import IngestResult
+from frameko.distributed import Lease, merge_indexes, run_worker
+from frameko.store import open_store
+
+from .conftest import requires_ffmpeg
+
+
+def _age(path: Path, sec: float) -> None:
+    t = time.time() - sec
+    os.utime(path, (t, t))
+
+
+def test_lease_contention(tmp_path):
+    a = Lease(tmp_path, "k", "worker-a", ttl_sec=60)
+    b = Lease(tmp_path, "k", "worker-b", ttl_sec=60)
+    assert a.acquire()
+    assert not b.acquire()
+    assert a.held() and not b.held()
+
+    a.release()
+    assert b.acquire()
+    assert b.held()
+    b.release()
+
+
+def test_stale_lease_is_taken_over(tmp_path):
+    a = Lease(tmp_path, "k", "worker-a", ttl_sec=1.0)
+    assert a.acquire()
+    # Worker a hangs: no more heartbeats, and its lease expires
+    a._stop.set()
+    a._thread.join()
+    _age(a.path, 5.0)
+
+    b = Lease(tmp_path, "k", "worker-b", ttl_sec=1.0)
+    assert b.acquire()
+    assert b.held() and not a.held()
+    a.release()  # must leave b's lease alone
+    assert b.path.exists() and b.held()
+    b.release()
+
+
+def test_heartbeat_stops_once_lease_is_lost(tmp_path):
+    a = Lease(tmp_path, "k", "worker-a", ttl_sec=0.2)
+    assert a.acquire()
+    # Another worker took it over while a stalled
+    distributed._write_atomic(a.path, {"owner": "worker-b", "token": "b"})
+    _age(a.path, 10.0)
+
+    a._thread.join(timeout=2.0)
+    assert not a._thread.is_alive()
+    assert time.time() - a.path.stat().st_mtime > 5.0
+    a.release()
+    assert json.loads(a.path.read_text())["token"] == "b"
+
+
+@requires_ffmpeg
+def test_worker_drops_result_after_losing_lease(tmp_path, monkeypatch):
+    def ingest_many(self, paths, **kw):
+        # The lease is taken over while the video is being ingested
+        lease = tmp_path / "root" / "leases" / f"{distributed.entry_key(paths[0])}.lease"
+        distributed._write_atomic(lease, {"owner": "worker-b", "token": "b"})
+        return [IngestResult(str(paths[0]), "vid", True, 3, None, 0.1)]
+
+    monkeypatch.setattr(distributed.Frameko, "ingest_many", ingest_many)
+    results = run_worker(tmp_path / "root", ["video.mp4"], worker_id="worker-a")
+
+    assert results == []
+    assert not list((tmp_path / "root" / "leases").glob("*.done"))
+    assert not list((tmp_path / "root" / "leases").glob("*.failed"))
+
+
+def _worker_index(path: Path, video_id: str, hashes, done: bool = True) -> None:
+    store = open_store(path)
+    store.add_video({"video_id": video_id, "video_path": f"{video_id}.mp4", "info": {}})
+    for k, h in enumerate(hashes):
+        store.add_frame(
+            {
+                "video_id": video_id,
+                "frame_idx": k,
+                "frame_uid": sum(map(ord, video_id)) * 100 + k,
+                "t_sec": float(k),
+                "scene_idx": 0,
+                "dhash": h,
+                "blur_var": 100.0,
+                "frame_path": "",
+            }
+        )
+    store.close()
+    save_checkpoint(path, video_id, next_index=len(hashes), total=len(hashes), done=done)
+
+
+def test_merge_with_global_dedup(tmp_path):
+    rng = random.Random(0)
+    a_hashes = [rng.getrandbits(64) for _ in range(4)]
+    # Video b repeats a's second frame with one bit flipped
+    b_hashes = [rng.getrandbits(64), a_hashes[1] ^ 1, rng.getrandbits(64)]
+    _worker_index(tmp_path / "w1", "vid-a", a_hashes)
+    _worker_index(tmp_path / "w2", "vid-b", b_hashes)
+    _worker_index(tmp_path / "w2", "vid-c", [rng.getrandbits(64)], done=False)
+    # The same video finished by two workers is merged once
+    _worker_index(tmp_path / "w3", "vid-a", a_hashes)
+
+    dest = tmp_path / "merged"
+    sources = [tmp_path / "w1", tmp_path / "w2", tmp_path / "w3"]
+    result = merge_indexes(sources, dest, dedup=True)
+
+    assert (result.videos, result.frames, result.duplicates, result.skipped) == (2, 6, 1, 1)
+    store = open_store(dest)
+    assert [r["video_id"] for r in store.videos()] == ["vid-a", "vid-b"]
+    assert [r["frame_idx"] for r in store.frames(video_id="vid-b")] == [0, 2]
+    assert [c["status"] for c in store.candidates("vid-b")] == ["duplicate"]
+    store.close()
+
+    again = merge_indexes(sources, dest, dedup=True)
+    assert (again.videos, again.frames, again.skipped) == (0, 0, 3)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from frameko.embed import CallableEmbedder, ColorGradientEmbedder, Embedder, get_embedder
+from frameko.errors import ConfigError
+
+
+def _images():
+    rng = np.random.default_rng(0)
+    return [
+        rng.integers(0, 256, size=(48, 64, 3), dtype=np.uint8),
+        rng.integers(0, 256, size=(90, 120, 3), dtype=np.uint8),
+    ]
+
+
+def test_color_gradient_vectors_are_unit_length():
+    emb = ColorGradientEmbedder()
+    images = _images()
+    out = emb.encode(images)
+    assert out.shape == (2, emb.dim) and out.dtype == np.float32
+    assert np.allclose(np.linalg.norm(out, axis=1), 1.0, atol=1e-5)
+    assert np.allclose(emb.encode(images[:1])[0], out[0])
+    assert emb.encode([]).shape == (0, emb.dim)
+    with pytest.raises(ValueError):
+        ColorGradientEmbedder(grid=3, size=64)
+
+
+def test_get_embedder_specs():
+    assert get_embedder(None) is None and get_embedder("none") is None
+    assert isinstance(get_embedder("color_gradient"), ColorGradientEmbedder)
+    emb = ColorGradientEmbedder()
+    assert get_embedder(emb) is emb
+
+    def mean_rgb(images):
+        return [im.reshape(-1, 3).mean(axis=0) for im in images]
+
+    wrapped = get_embedder(mean_rgb)
+    assert isinstance(wrapped, CallableEmbedder) and wrapped.name == "mean_rgb"
+    assert wrapped.encode(_images()).shape == (2, 3) and wrapped.dim == 3
+    with pytest.raises(ValueError):
+        CallableEmbedder(lambda images: np.zeros((1, 3))).encode(_images())
+    with pytest.raises(ConfigError):
+        get_embedder("clip")
+    with pytest.raises(ConfigError):
+        get_embedder(3)
+
+
+def test_embedder_without_encode_cannot_be_created():
+    class Nameless(Embedder):
+        name = "nameless"
+
+    with pytest.raises(TypeError, match="abstract"):
+        Nameless()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import subprocess
+
+import numpy as np
+import pytest
+
+from frameko.video.extract import SEEK, SINGLE_PASS, choose_strategy, plan_decode_batches
+from frameko.video.ffmpeg import _parse_probe, container_times, decode_fps, probe_video
+from frameko.video.pipe import iter_raw_frames
+
+from .conftest import requires_ffmpeg
+
+
+def _probe_json(fmt_start="0.000000", v_start="0.000000", r="24/1", avg="24/1") -> str:
+    stream = {
+        "codec_type": "video",
+        "codec_name": "h264",
+        "width": 320,
+        "height": 180,
+        "r_frame_rate": r,
+        "avg_frame_rate": avg,
+        "start_time": v_start,
+    }
+    fmt = {"duration": "12.0", "start_time": fmt_start, "format_name": "mpegts", "size": "1"}
+    return json.dumps({"format": fmt, "streams": [{"codec_type": "audio"}, stream]})
+
+
+def test_probe_reports_start_offsets_and_vfr():
+    info = _parse_probe(_probe_json())
+    assert (info["fps"], info["vfr"], info["start_time"], info["video_start"]) == (
+        24.0, False, 0.0, 0.0
+    )
+    info = _parse_probe(_probe_json(fmt_start="1.400000", v_start="1.483333"))
+    assert info["start_time"] == 1.4 and info["video_start"] == pytest.approx(0.083333)
+    assert container_times([1.483333, 3.483333], info) == [0.083333, 2.083333]
+
+    vfr = _parse_probe(_probe_json(r="30/1", avg="2997/125"))
+    assert vfr["vfr"] and vfr["fps"] == 30.0 and decode_fps(vfr) is None
+    # "0/0" means unknown, not variable
+    assert decode_fps(_parse_probe(_probe_json(r="25/1", avg="0/0"))) == 25.0
+    # Probe results cached before these fields existed still work
+    assert decode_fps({"fps": 25.0}) == 25.0 and container_times([1.0], {}) == [1.0]
+
+
+def test_vfr_video_is_seeked():
+    ts = [0.5, 1.0, 1.5]
+    vfr = _parse_probe(_probe_json(r="30/1", avg="2997/125"))
+    assert choose_strategy(ts, decode_fps(vfr)) == SEEK
+    assert plan_decode_batches(ts, SEEK, fps=decode_fps(vfr)) == []
+
+
+def test_batches_count_frames_from_the_video_start():
+    ts = [0.0, 1.0, 2.0]
+    ((positions, args, indices),) = plan_decode_batches(ts, SINGLE_PASS, fps=24.0)
+    assert args == [] and indices == [0, 24, 48]
+    # Frame 0 is shown at 0.5 s: 0.0 s lands on it, 1.0 s on frame 12
+    ((_, args, indices),) = plan_decode_batches(ts, SINGLE_PASS, fps=24.0, video_start=0.5)
+    assert args == [] and indices == [0, 12, 36]
+    ((_, args, indices),) = plan_decode_batches(
+        [1.0, 2.0], SINGLE_PASS, fps=24.0, video_start=0.5
+    )
+    assert args == ["-ss", f"{0.5 + 11.5 / 24:.6f}"] and indices == [0, 24]
+
+
+@requires_ffmpeg
+def test_single_pass_matches_seek_when_video_starts_late(cuts_video, tmp_path):
+    # Audio from 0 s, video from 0.5 s: `-ss` counts from the audio's start
+    delayed = tmp_path / "delayed.mp4"
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "lavfi"]
+    cmd += ["-i", "anullsrc=r=48000:cl=mono", "-itsoffset", "0.5", "-i", str(cuts_video)]
+    cmd += ["-map", "0:a", "-map", "1:v", "-c:v", "copy", "-c:a", "aac", "-t", "12.5"]
+    subprocess.run(cmd + ["-y", str(delayed)], check=True)
+    info = probe_video(delayed)
+    assert info["video_start"] == pytest.approx(0.5, abs=0.05)
+
+    ts = [0.0, 1.9, 2.1, 4.05, 6.0, 8.2]
+    kw = dict(size=(64, 36), fps=decode_fps(info), video_start=info["video_start"])
+    batch = dict(iter_raw_frames(delayed, ts, strategy="single_pass", **kw))
+    seek = dict(iter_raw_frames(delayed, ts, strategy="seek", **kw))
+    for pos in range(len(ts)):
+        assert np.abs(batch[pos].astype(int) - seek[pos].astype(int)).mean() < 3
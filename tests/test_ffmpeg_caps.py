@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import pytest
+
+import frameko.video.ffmpeg as ffmpeg
+from frameko.bench.videos import ensure_video
+from frameko.errors import ExternalToolMissingError
+from frameko.scenes.chunked import detect_scenes_chunked
+from frameko.scenes.ffmpeg_scenes import detect_scenes_ffmpeg
+
+from .conftest import CUTS_SPEC, requires_ffmpeg
+
+
+@pytest.fixture
+def bare_ffmpeg(monkeypatch):
+    """An ffmpeg build with no filters or encoders that must never be run."""
+    caps = {"path": "/opt/ffmpeg", "filters": ["scale"], "encoders": ["mjpeg"]}
+    monkeypatch.setattr(ffmpeg, "ffmpeg_capabilities", lambda tool="ffmpeg", **kw: caps)
+
+    def run(cmd, **kw):
+        raise AssertionError(f"ran {cmd[0]} despite the missing features")
+
+    monkeypatch.setattr(ffmpeg, "run", run)
+    monkeypatch.setattr("frameko.scenes.ffmpeg_scenes.run", run)
+    monkeypatch.setattr("frameko.bench.videos.run", run)
+
+
+def test_ffmpeg_scene_detector_fails_fast(bare_ffmpeg):
+    with pytest.raises(ExternalToolMissingError, match="filter select, filter metadata"):
+        detect_scenes_ffmpeg("clip.mp4", duration=10.0)
+    with pytest.raises(ExternalToolMissingError, match="/opt/ffmpeg"):
+        detect_scenes_chunked("clip.mp4", detector="ffmpeg", duration=100.0, chunk_sec=10.0)
+
+
+def test_bench_render_fails_fast(bare_ffmpeg, tmp_path):
+    with pytest.raises(ExternalToolMissingError, match="encoder libx264"):
+        ensure_video(CUTS_SPEC, tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+@requires_ffmpeg
+def test_capabilities_are_probed_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(ffmpeg, "_caps_memo", {})
+    caps = ffmpeg.ffmpeg_capabilities()
+    assert ffmpeg.has_filter("select") and ffmpeg.has_encoder("mjpeg")
+    assert not ffmpeg.has_filter("no-such-filter")
+    assert len(list((tmp_path / "frameko" / "ffmpeg").glob("*.json"))) == 1
+
+    # Later lookups come from memory, then from the disk cache
+    def run(cmd, **kw):
+        raise AssertionError("probed again")
+
+    monkeypatch.setattr(ffmpeg, "run", run)
+    assert ffmpeg.ffmpeg_capabilities() is caps
+    monkeypatch.setattr(ffmpeg, "_caps_memo", {})
+    assert ffmpeg.ffmpeg_capabilities() == caps
+    ffmpeg.require_ffmpeg_features("scene detection", filters=("select",), encoders=("mjpeg",))
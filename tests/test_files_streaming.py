@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+
+import frameko.core as core
+from frameko import Frameko, FramekoConfig
+
+from .conftest import requires_ffmpeg
+
+# Files mode, extracting 4 sampled frames per batch
+CONFIG = {
+    "scene_detector": "none",
+    "sampling_mode": "seconds",
+    "every_sec": 0.5,
+    "enable_dedup": False,
+    "enable_cache": False,
+    "ingest_mode": "files",
+    "extract_batch": 4,
+}
+
+
+def _count_batches(monkeypatch, on_batch=None) -> list:
+    calls: list = []
+    real = core.extract_frames
+
+    def extract_frames(video_path, timestamps, out_paths, **kw):
+        calls.append(len(timestamps))
+        if on_batch is not None:
+            on_batch()
+        return real(video_path, timestamps, out_paths, **kw)
+
+    monkeypatch.setattr(core, "extract_frames", extract_frames)
+    return calls
+
+
+@requires_ffmpeg
+def test_files_mode_yields_before_extraction_finishes(cuts_video, tmp_path, monkeypatch):
+    calls = _count_batches(monkeypatch)
+    fk = Frameko(tmp_path / "index", config=FramekoConfig.from_dict(CONFIG))
+
+    frames = fk.iter_ingest(cuts_video, queue_size=1)
+    next(frames)
+    batches_at_first_yield = len(calls)
+    rest = list(frames)
+
+    assert len(rest) > 4
+    assert len(calls) > 2
+    assert batches_at_first_yield < len(calls)
+
+
+@requires_ffmpeg
+def test_files_mode_checkpoints_every_extraction_batch(cuts_video, tmp_path, monkeypatch):
+    index_dir = tmp_path / "index"
+    seen: list = []
+
+    def checkpointed() -> None:
+        ckpts = list((index_dir / "checkpoints").glob("*.json"))
+        seen.append(json.loads(ckpts[0].read_text())["next_index"] if ckpts else None)
+
+    calls = _count_batches(monkeypatch, checkpointed)
+    fk = Frameko(index_dir, config=FramekoConfig.from_dict({**CONFIG, "checkpoint_every": 1000}))
+    fk.ingest(cuts_video)
+
+    # Batch k + 1 starts extracting once batch k - 1 is fully handled
+    assert len(calls) > 2
+    assert seen[1:] == [sum(calls[: k - 1]) for k in range(1, len(calls))]
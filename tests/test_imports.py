@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+from frameko.bench.runner import measure_imports, over_budget
+
+
+# Must stay unloaded by `import frameko`; they come in on first use
+LAZY = ("frameko.core", "frameko.vectors", "frameko.embed", "numpy", "PIL", "scenedetect")
+
+
+def test_import_frameko_stays_light():
+    probe = f"json.dumps([m for m in {LAZY!r} if m in sys.modules])"
+    code = f"import frameko, json, sys; print({probe})"
+    p = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert json.loads(p.stdout) == []
+
+
+def test_import_budgets():
+    imports = measure_imports(("frameko", "frameko.cli"), repeat=3)
+    assert over_budget(imports) == []
+    assert imports["frameko"]["loads"] == []
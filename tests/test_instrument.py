@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import time
+
+from frameko import instrument
+from frameko.concurrency import ordered_map
+from frameko.instrument import IngestHooks, Recorder
+
+
+class _Collect(IngestHooks):
+    def __init__(self) -> None:
+        self.events: list = []
+
+    def on_stage(self, report, stage, seconds):
+        self.events.append(("stage", stage))
+
+    def on_count(self, report, name, n):
+        self.events.append(("count", name, n))
+
+    def on_subprocess(self, report, tool, seconds):
+        self.events.append(("subprocess", tool))
+
+    def on_report(self, report):
+        self.events.append(("report", report.video_id))
+
+
+def test_module_functions_are_no_ops_without_a_recorder():
+    assert instrument.current() is None
+    with instrument.timed("extract"):
+        instrument.count("frames_accepted")
+        instrument.reject("blurry")
+        instrument.subprocess_done(["/usr/bin/ffmpeg"], 1.0)
+    items = iter([1, 2])
+    assert instrument.timed_iter(items, "extract") is items
+    with instrument.activate(None):
+        assert instrument.current() is None
+
+
+def test_recorder_collects_a_report_and_calls_hooks():
+    hooks = _Collect()
+    rec = Recorder("clip.mp4", [hooks])
+    with instrument.activate(rec):
+        assert instrument.current() is rec
+        with instrument.timed("extract"):
+            time.sleep(0.01)
+        instrument.count("bytes_written", 100)
+        instrument.count("bytes_written", 20)
+        instrument.reject("duplicate", 2)
+        instrument.subprocess_done(["/usr/bin/ffmpeg", "-i", "x"], 0.5)
+        instrument.subprocess_done(["ffprobe"], 0.25)
+        assert list(instrument.timed_iter(iter(range(3)), "decode")) == [0, 1, 2]
+    assert instrument.current() is None
+    report = rec.finish("vid")
+
+    assert report.stages["extract"] >= 0.01 and "decode" in report.stages
+    assert report.bytes_written == 120
+    assert report.rejected == {"duplicate": 2}
+    assert report.subprocesses == {"ffmpeg": 1, "ffprobe": 1}
+    assert report.subprocess_sec == {"ffmpeg": 0.5, "ffprobe": 0.25}
+    assert (report.video_id, report.video_path) == ("vid", "clip.mp4")
+    assert report.wall_sec > 0
+    d = json.loads(json.dumps(report.to_dict()))
+    assert d["counters"] == {"bytes_written": 120}
+    assert hooks.events[:2] == [("stage", "extract"), ("count", "bytes_written", 100)]
+    assert ("count", "rejected.duplicate", 2) in hooks.events
+    assert hooks.events[-1] == ("report", "vid")
+
+
+def test_worker_threads_report_to_the_active_recorder():
+    rec = Recorder("clip.mp4")
+
+    def score(i: int) -> int:
+        with instrument.timed("score"):
+            instrument.count("scored")
+        return i
+
+    with rec.active():
+        assert list(ordered_map(score, range(50), max_workers=4)) == list(range(50))
+    assert rec.report.counters == {"scored": 50}
+    assert rec.report.stages["score"] > 0
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import numpy as np
+
+from frameko.video.pipe import iter_raw_frames
+
+
+# 2.5 s and 7.0 s are alone in their GOP and get decoded by seeking
+TIMESTAMPS = [0.5, 1.0, 2.5, 4.2, 4.6, 7.0, 8.1, 8.3]
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+
+
+def test_gop_frames_come_out_in_position_order(cuts_video):
+    kw = dict(size=(64, 36), fps=24.0, keyframes=KEYFRAMES)
+    gop = list(iter_raw_frames(cuts_video, TIMESTAMPS, strategy="gop", **kw))
+    seek = list(iter_raw_frames(cuts_video, TIMESTAMPS, strategy="seek", **kw))
+
+    assert [pos for pos, _ in gop] == list(range(len(TIMESTAMPS)))
+    assert [pos for pos, _ in seek] == list(range(len(TIMESTAMPS)))
+    for (_, a), (_, b) in zip(gop, seek):
+        assert np.abs(a.astype(int) - b.astype(int)).mean() < 3
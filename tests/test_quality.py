@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from frameko.pipelines.dedup import dhash_uint64
+from frameko.pipelines.quality import frame_metrics, frame_metrics_batch, variance_of_laplacian
+
+
+def _reference_laplacian(gray: np.ndarray) -> np.ndarray:
+    p = np.pad(gray.astype(np.float64), 1, mode="edge")
+    return p[:-2, 1:-1] + p[2:, 1:-1] + p[1:-1, :-2] + p[1:-1, 2:] - 4.0 * p[1:-1, 1:-1]
+
+
+def _images():
+    rng = np.random.default_rng(0)
+    flat = np.full((20, 30), 200, dtype=np.uint8)
+    checker = (np.indices((24, 32)).sum(axis=0) % 2 * 255).astype(np.uint8)
+    noise = rng.integers(0, 256, size=(20, 30), dtype=np.uint8)
+    # Sizes alternate so the shared Laplacian buffer is resized between frames
+    return [noise, checker, flat, rng.integers(0, 256, size=(24, 32, 3), dtype=np.uint8)]
+
+
+def test_batch_matches_separate_kernels():
+    images = _images()
+    metrics = frame_metrics_batch(
+        images, hash_size=8, blur=True, luma=True, contrast=True, uniform=True, uniform_tol=2.0
+    )
+    assert len(metrics) == len(images)
+    for im, m in zip(images, metrics):
+        gray = im if im.ndim == 2 else None
+        assert m.dhash == dhash_uint64(im)
+        assert m.blur_var == variance_of_laplacian(im)
+        if gray is not None:
+            lap = _reference_laplacian(gray)
+            assert m.blur_var == pytest.approx(lap.var(), rel=1e-6)
+            assert m.uniform_frac == pytest.approx(np.mean(np.abs(lap) <= 2.0))
+            assert m.mean_luma == pytest.approx(gray.mean())
+            assert m.contrast == pytest.approx(gray.std())
+        assert m == frame_metrics(
+            im, blur=True, luma=True, contrast=True, uniform=True, uniform_tol=2.0
+        )
+
+    noise, checker, flat, _ = metrics
+    assert flat.blur_var == 0.0 and flat.uniform_frac == 1.0 and flat.contrast == 0.0
+    assert flat.mean_luma == 200.0
+    assert checker.uniform_frac == 0.0 and checker.blur_var > noise.blur_var
+
+
+def test_only_requested_signals_are_computed():
+    m = frame_metrics_batch(_images(), hash_size=16, blur=False)
+    assert all(
+        (x.blur_var, x.mean_luma, x.contrast, x.uniform_frac) == (None, None, None, None)
+        for x in m
+    )
+    assert m[0].dhash == dhash_uint64(_images()[0], hash_size=16)
+
+    only_uniform = frame_metrics(_images()[0], blur=False, uniform=True)
+    assert only_uniform.blur_var is None and only_uniform.uniform_frac is not None
+    only_contrast = frame_metrics(_images()[0], blur=False, contrast=True)
+    assert only_contrast.mean_luma is None and only_contrast.contrast is not None
+    assert frame_metrics_batch([]) == []
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from frameko import Frameko, FramekoConfig
+from frameko.pipelines.quality import frame_metrics
+
+from .conftest import CUTS_SPEC, requires_ffmpeg
+
+CONFIG = {
+    "scene_detector": "none",
+    "sampling_mode": "seconds",
+    "every_sec": 0.25,
+    "enable_cache": False,
+    "record_candidates": True,
+    "prefilter": True,
+}
+
+_LOW = 0x0F0F_0F0F_0F0F_0F0F
+
+
+def _statuses(fk: Frameko, video_id: str):
+    return {c["frame_idx"]: c["status"] for c in fk.store.candidates(video_id)}
+
+
+def _accepted(fk: Frameko, video_id: str):
+    return [r["frame_idx"] for r in fk.store.frames(video_id=video_id)]
+
+
+@requires_ffmpeg
+def test_refilter_matches_a_fresh_prefilter_ingest(cuts_video, tmp_path):
+    fk = Frameko(tmp_path / "index", config=FramekoConfig.from_dict(CONFIG))
+    video_id = fk.ingest(cuts_video)
+    before = (_statuses(fk, video_id), _accepted(fk, video_id))
+
+    # Same settings: nothing changes
+    fk.refilter(video_id)
+    assert (_statuses(fk, video_id), _accepted(fk, video_id)) == before
+
+    strict = FramekoConfig.from_dict({**CONFIG, "max_hamming": 20})
+    frames = fk.refilter(video_id, strict)
+    fk.close()
+
+    fresh = Frameko(tmp_path / "fresh", config=strict)
+    fresh_id = fresh.ingest(cuts_video)
+    assert [r.frame_idx for r in frames] == _accepted(fresh, fresh_id)
+    fresh.close()
+
+
+@requires_ffmpeg
+def test_refilter_compares_hashes_of_one_tier(cuts_video, tmp_path):
+    cfg = FramekoConfig.from_dict({**CONFIG, "enable_blur_filter": False})
+    fk = Frameko(tmp_path / "index", config=cfg)
+    info = {"fps": CUTS_SPEC.fps, "width": CUTS_SPEC.width, "height": CUTS_SPEC.height}
+    fk.store.add_video({"video_id": "vid", "video_path": str(cuts_video), "info": info})
+
+    def candidate(k, t, dhash, blur_var, low, status):
+        fk.store.add_candidate(
+            {
+                "video_id": "vid",
+                "frame_idx": k,
+                "t_sec": t,
+                "scene_idx": 0,
+                "dhash": dhash,
+                "blur_var": blur_var,
+                "status": status,
+                "prefilter_dhash": low,
+                "prefilter_blur_var": 50.0,
+            }
+        )
+
+    # Scored at both resolutions; its full-resolution hash is far from everything
+    candidate(0, 0.5, 0, 120.0, _LOW, "accepted")
+    # A low-resolution duplicate of frame 0
+    candidate(1, 1.0, _LOW ^ 1, None, _LOW ^ 1, "duplicate")
+    # Rejected as blurry on the low-resolution tier only
+    candidate(2, 3.0, ~_LOW & (2**64 - 1), None, ~_LOW & (2**64 - 1), "blurry")
+
+    frames = fk.refilter("vid")
+    assert [r.frame_idx for r in frames] == [0, 2]
+    assert _statuses(fk, "vid") == {0: "accepted", 1: "duplicate", 2: "accepted"}
+
+    # The newly accepted frame carries full-resolution scores, not the prefilter's
+    rescored = frames[1]
+    assert rescored.dhash == frame_metrics(rescored.frame_path).dhash
+    assert rescored.prefilter_dhash == ~_LOW & (2**64 - 1)
+    cand = next(c for c in fk.store.candidates("vid") if c["frame_idx"] == 2)
+    assert (cand["dhash"], cand["blur_var"] is not None) == (rescored.dhash, True)
+    fk.close()
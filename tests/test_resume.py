@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from frameko import Frameko, FramekoConfig
+from frameko.checkpoint import load_checkpoint
+
+from .conftest import requires_ffmpeg
+
+# Extract in batches of 2 and crash (no cleanup) when the `crash_at`-th batch starts
+_CRASH = """
+import json, os, sys
+import frameko.core as core
+from frameko import Frameko, FramekoConfig
+index_dir, video = sys.argv[1], sys.argv[2]
+cfg, crash_at = json.loads(sys.argv[3]), int(sys.argv[4])
+real, calls = core.extract_frames, []
+def extract_frames(*args, **kw):
+    calls.append(1)
+    if len(calls) == crash_at:
+        os._exit(3)
+    return real(*args, **kw)
+core.extract_frames = extract_frames
+Frameko(index_dir, config=FramekoConfig.from_dict(cfg)).ingest(video)
+"""
+
+# Frames 0 and 1 of the fade are too dark and later ones are near-duplicates of
+# frame 1, so they only stay rejected if frame 1's hash survives the crash
+CONFIG = {
+    "scene_detector": "none",
+    "sampling_mode": "seconds",
+    "every_sec": 0.5,
+    "enable_blur_filter": False,
+    "enable_luma_filter": True,
+    "min_mean_luma": 30.0,
+    "enable_cache": False,
+    "ingest_mode": "files",
+    "extract_batch": 2,
+    "checkpoint_every": 1000,
+}
+
+
+@pytest.fixture(scope="module")
+def fade_video(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """A 6 s fade-in of colour bars followed by 2 s of a moving test pattern."""
+    out = tmp_path_factory.mktemp("fade") / "fade.mp4"
+    graph = "[0]fade=t=in:st=0:d=6[a];[a][1]concat=n=2:v=1[v]"
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", "smptebars=size=320x180:rate=24:duration=6",
+            "-f", "lavfi", "-i", "testsrc=size=320x180:rate=24:duration=2",
+            "-filter_complex", graph, "-map", "[v]",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-g", "24", str(out),
+        ],
+        check=True,
+    )
+    return out
+
+
+def _accepted(index_dir: Path, video_id: str):
+    fk = Frameko(index_dir, config=FramekoConfig.from_dict(CONFIG))
+    try:
+        return [r["frame_idx"] for r in fk.store.frames(video_id=video_id)]
+    finally:
+        fk.close()
+
+
+@requires_ffmpeg
+def test_resume_keeps_dedup_state_of_rejected_frames(fade_video, tmp_path):
+    clean = Frameko(tmp_path / "clean", config=FramekoConfig.from_dict(CONFIG))
+    video_id = clean.ingest(fade_video)
+    clean.close()
+
+    crashed = tmp_path / "crashed"
+    p = subprocess.run(
+        [sys.executable, "-c", _CRASH, str(crashed), str(fade_video), json.dumps(CONFIG), "5"]
+    )
+    assert p.returncode == 3
+    ckpt = load_checkpoint(crashed, video_id)
+    assert ckpt is not None and not ckpt["done"] and ckpt["next_index"] == 6
+
+    fk = Frameko(crashed, config=FramekoConfig.from_dict(CONFIG))
+    assert fk.ingest(fade_video) == video_id
+    fk.close()
+    assert _accepted(crashed, video_id) == _accepted(tmp_path / "clean", video_id)
+
+
+@requires_ffmpeg
+def test_changed_filter_settings_ingest_under_a_new_id(cuts_video, tmp_path):
+    base = {"scene_detector": "none", "sampling_mode": "seconds", "enable_cache": False}
+    fk = Frameko(tmp_path / "index", config=FramekoConfig.from_dict(base))
+    first = fk.ingest(cuts_video)
+    assert fk.ingest(cuts_video) == first
+    fk.close()
+
+    fk = Frameko(tmp_path / "index", config=FramekoConfig.from_dict({**base, "max_hamming": 2}))
+    second = fk.ingest(cuts_video)
+    assert second != first
+    # Both ingests stay in the index, each with the settings its id was built from
+    settings = {r["video_id"]: r["settings"]["max_hamming"] for r in fk.store.videos()}
+    assert settings == {first: 6, second: 2}
+    fk.close()
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from frameko.pipelines.sampling import sample_adaptive
+
+TIMES = np.round(np.arange(0, 120, 0.1), 6)
+
+
+def _gaps(samples, end=None):
+    ts = [t for t, _ in samples] + ([end] if end is not None else [])
+    return np.diff(ts)
+
+
+def test_empty_input_and_no_budget():
+    assert sample_adaptive([], [], budget=5) == []
+    assert sample_adaptive(TIMES, np.ones_like(TIMES), budget=0) == []
+
+
+def test_uniform_change_spends_the_budget_evenly():
+    out = sample_adaptive(TIMES, np.ones_like(TIMES), budget=12, max_gap_sec=None)
+    assert len(out) == 12
+    assert out[0] == (0.0, 0)
+    assert np.ptp(_gaps(out)[1:]) <= 0.2  # equal steps, up to the frame grid
+
+
+def test_samples_follow_the_change():
+    signal = np.full_like(TIMES, 0.01)
+    busy = (TIMES >= 40) & (TIMES < 60)
+    signal[busy] = 1.0
+    out = sample_adaptive(TIMES, signal, budget=40, threshold=0.02, max_gap_sec=None)
+    inside = sum(40 <= t < 60 for t, _ in out)
+    # Below-threshold noise attracts nothing; only the first frame is outside
+    assert inside == len(out) - 1 and inside >= 35
+
+
+def test_a_hard_cut_takes_one_sample():
+    signal = np.full_like(TIMES, 0.1)
+    signal[500] = 1e6
+    out = sample_adaptive(TIMES, signal, budget=20, min_gap_sec=0.0, max_gap_sec=None)
+    ts = [t for t, _ in out]
+    assert ts.count(TIMES[500]) == 1
+    assert len(out) >= 18
+
+
+def test_min_gap_and_max_gap():
+    rng = np.random.default_rng(0)
+    signal = rng.random(len(TIMES)) ** 8  # a few spikes, long quiet stretches
+    out = sample_adaptive(
+        TIMES, signal, budget=60, min_gap_sec=1.0, max_gap_sec=5.0, end_sec=125.0
+    )
+    gaps = _gaps(out, end=125.0)
+    assert gaps.min() >= 1.0 - 1e-9
+    assert gaps.max() <= 5.0 + 1e-9
+    assert out[-1][0] < 125.0
+
+
+def test_max_gap_fills_beyond_the_budget():
+    out = sample_adaptive(TIMES, np.zeros_like(TIMES), budget=3, max_gap_sec=10.0)
+    # No change at all: the first frame plus even gap filling up to the last time
+    assert len(out) == 12
+    assert _gaps(out, end=float(TIMES[-1])).max() <= 10.0
+
+
+@pytest.mark.parametrize("max_gap", [None, 4.0])
+def test_scene_indices_and_gaps_between_scenes(max_gap):
+    scenes = [(0.0, 30.0), (50.0, 120.0)]
+    out = sample_adaptive(
+        TIMES, np.ones_like(TIMES), budget=30, max_gap_sec=max_gap, scenes=scenes
+    )
+    assert all(30.0 > t for t, s in out if s == 0)
+    assert all(50.0 <= t for t, s in out if s == 1)
+    assert {s for _, s in out} == {0, 1}
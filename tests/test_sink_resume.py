@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from frameko import Frameko, FramekoConfig
+from frameko.sinks import load_frame
+
+from .conftest import requires_ffmpeg
+
+# Ingest in a child process and kill it (no cleanup, no finally blocks) once
+# `stop_after` frames have been recorded, leaving a `.part` shard behind
+_CRASH = """
+import json, os, sys
+from frameko import Frameko, FramekoConfig
+index_dir, video = sys.argv[1], sys.argv[2]
+cfg, stop_after = json.loads(sys.argv[3]), int(sys.argv[4])
+fk = Frameko(index_dir, config=FramekoConfig.from_dict(cfg))
+for i, _ in enumerate(fk.iter_ingest(video)):
+    if i + 1 >= stop_after:
+        fk.store.flush()
+        os._exit(3)
+"""
+
+
+def _config(**overrides) -> FramekoConfig:
+    cfg = FramekoConfig(
+        scene_detector="none",
+        sampling_mode="seconds",
+        every_sec=0.5,
+        enable_dedup=False,
+        shard_size=5,
+        checkpoint_every=2,
+        enable_cache=False,
+    )
+    for k, v in overrides.items():
+        setattr(cfg, k, v)
+    return cfg
+
+
+def _ingest(index_dir: Path, video: Path, cfg: FramekoConfig):
+    fk = Frameko(index_dir, config=cfg)
+    try:
+        vid = fk.ingest(video)
+        return [(r["frame_idx"], load_frame(r)) for r in fk.frames(vid)]
+    finally:
+        fk.close()
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize("output_format", ["tar", "npy"])
+@pytest.mark.parametrize("ingest_mode", ["files", "pipe"])
+def test_shard_resume_after_crash(tmp_path, cuts_video, output_format, ingest_mode):
+    cfg = _config(output_format=output_format, ingest_mode=ingest_mode)
+    expected = _ingest(tmp_path / "reference", cuts_video, cfg)
+    assert len(expected) > 2 * cfg.shard_size
+
+    index_dir = tmp_path / "crashed"
+    child = subprocess.run(
+        [sys.executable, "-c", _CRASH, str(index_dir), str(cuts_video),
+         json.dumps(cfg.to_dict()), "7"],
+        capture_output=True,
+        text=True,
+    )
+    assert child.returncode == 3, child.stderr
+    assert list((index_dir / "shards").glob("*.part"))
+
+    resumed = _ingest(index_dir, cuts_video, cfg)
+    assert [i for i, _ in resumed] == [i for i, _ in expected]
+    for (_, a), (_, b) in zip(resumed, expected):
+        assert a.shape == b.shape
+        assert np.abs(a.astype(int) - b).mean() < 3
+    assert not list((index_dir / "shards").glob("*.part"))
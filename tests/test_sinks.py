@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+import tarfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from frameko.errors import ConfigError
+from frameko.sinks import FileSink, FrameSink, _ShardSink, fanout_path, load_frame, open_sink
+
+SIZE = (32, 24)
+
+
+def _frames(n: int, size=SIZE):
+    rng = np.random.default_rng(n)
+    return [rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8) for _ in range(n)]
+
+
+def _sink(fmt: str, tmp_path: Path, records=()):
+    return open_sink(
+        fmt,
+        index_dir=tmp_path,
+        frames_dir=tmp_path / "frames",
+        video_id="vid",
+        image_format="png",
+        shard_size=3,
+        size=SIZE,
+        records=records,
+    )
+
+
+def _put(sink, k: int, arr: np.ndarray):
+    path = sink.staging_path(k, 1000 + k)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(arr).save(path)
+    frame_path, offset = sink.put(k, path, {"frame_idx": k})
+    assert not path.exists()  # moved into the shard
+    return {"frame_path": frame_path, "shard_offset": offset}
+
+
+def test_fanout_path():
+    assert fanout_path(Path("root"), "a.jpg", 0xABCD << 48, 0) == Path("root/a.jpg")
+    assert fanout_path(Path("root"), "a.jpg", 0xABCD << 48, 2) == Path("root/ab/cd/a.jpg")
+    # Negative (signed) ids map onto the same unsigned layout
+    assert fanout_path(Path("r"), "a", -1, 1) == fanout_path(Path("r"), "a", (1 << 64) - 1, 1)
+
+
+def test_file_sink_keeps_staged_files(tmp_path):
+    sink = _sink("files", tmp_path)
+    assert isinstance(sink, FileSink)
+    path = sink.staging_path(3, 7)
+    assert path == tmp_path / "frames" / "vid_000003.png"
+    path.parent.mkdir(parents=True)
+    Image.fromarray(_frames(1)[0]).save(path)
+    assert sink.put(3, path, {}) == (str(path), None)
+    assert sink.bytes_written == path.stat().st_size
+    with pytest.raises(TypeError):
+        sink.put(4, _frames(1)[0], {})
+
+
+@pytest.mark.parametrize("fmt", ["tar", "npy"])
+def test_shards_round_trip(fmt, tmp_path):
+    frames = _frames(7)
+    sink = _sink(fmt, tmp_path)
+    recs = [_put(sink, k, arr) for k, arr in enumerate(frames)]
+    # Frames of the shard still being written are readable
+    assert np.array_equal(load_frame(recs[6]), frames[6])
+    assert Path(recs[6]["frame_path"] + ".part").exists()
+    sink.close()
+
+    shards = sorted(p.name for p in (tmp_path / "shards").glob("vid-*"))
+    assert shards == [f"vid-{n:06d}.{fmt}" for n in range(3)]
+    assert [r["frame_path"] for r in recs] == [
+        str(tmp_path / "shards" / f"vid-{k // 3:06d}.{fmt}") for k in range(7)
+    ]
+    for rec, arr in zip(recs, frames):
+        assert np.array_equal(load_frame(rec), arr)
+    assert sink.bytes_written > 0
+
+
+def test_tar_shards_are_plain_tar_files(tmp_path):
+    sink = _sink("tar", tmp_path)
+    for k, arr in enumerate(_frames(2)):
+        _put(sink, k, arr)
+    sink.close()
+    with tarfile.open(tmp_path / "shards" / "vid-000000.tar") as tar:
+        names = tar.getnames()
+        meta = json.loads(tar.extractfile("vid_000001.json").read())
+    assert names == ["vid_000000.png", "vid_000000.json", "vid_000001.png", "vid_000001.json"]
+    assert meta == {"frame_idx": 1}
+
+
+def test_npy_shards_map_and_resize(tmp_path):
+    sink = _sink("npy", tmp_path)
+    frames = _frames(2)
+    _put(sink, 0, frames[0])
+    # Arrays are stored directly; other sizes are resized to the shard's
+    sink.put(1, frames[1], {})
+    sink.put(2, _frames(1, size=(64, 48))[0], {})
+    sink.close()
+    shard = np.load(tmp_path / "shards" / "vid-000000.npy", mmap_mode="r")
+    assert shard.shape == (3, SIZE[1], SIZE[0], 3)
+    assert np.array_equal(shard[1], frames[1])
+
+
+@pytest.mark.parametrize("fmt", ["tar", "npy"])
+def test_reopened_sink_resumes_after_the_last_record(fmt, tmp_path):
+    frames = _frames(8)
+    crashed = _sink(fmt, tmp_path)
+    recs = [_put(crashed, k, arr) for k, arr in enumerate(frames[:6])]
+    # Never closed; only the first four frames made it into the metadata
+    sink = _sink(fmt, tmp_path, records=[(r["frame_path"], r["shard_offset"]) for r in recs[:4]])
+    recs = recs[:4] + [_put(sink, k, frames[k]) for k in range(4, 8)]
+    sink.close()
+
+    # Frames 4 and 5 are rewritten in place of the unrecorded ones
+    assert [r["frame_path"] for r in recs] == [
+        str(tmp_path / "shards" / f"vid-{k // 3:06d}.{fmt}") for k in range(8)
+    ]
+    assert sorted(p.name for p in (tmp_path / "shards").glob("vid-*")) == [
+        f"vid-{n:06d}.{fmt}" for n in range(3)
+    ]
+    for rec, arr in zip(recs, frames):
+        assert np.array_equal(load_frame(rec), arr)
+
+
+def test_open_sink_errors(tmp_path):
+    with pytest.raises(ConfigError):
+        open_sink("npy", index_dir=tmp_path, frames_dir=tmp_path, video_id="v", image_format="png")
+    with pytest.raises(ConfigError):
+        _sink("parquet", tmp_path)
+
+
+def test_incomplete_sinks_cannot_be_created(tmp_path):
+    class NoPut(FrameSink):
+        def staging_path(self, frame_idx, frame_uid):
+            return tmp_path / f"{frame_idx}.png"
+
+    class NoTruncate(_ShardSink):
+        def _append(self, key, source, meta):
+            return 0
+
+    with pytest.raises(TypeError, match="abstract"):
+        NoPut()
+    with pytest.raises(TypeError, match="abstract"):
+        NoTruncate(tmp_path, "vid", image_format="png", shard_size=3)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import pytest
+
+from frameko.errors import ConfigError
+from frameko.store import JsonlStore, MetadataStore, SqliteStore, import_jsonl, open_store
+
+BACKENDS = ("jsonl", "sqlite")
+
+
+def _frame(video_id: str, k: int, t: float) -> dict:
+    return {
+        "video_id": video_id,
+        "frame_idx": k,
+        # Ids above 2**63 must survive SQLite's signed INTEGER column
+        "frame_uid": (1 << 63) + 1000 * ord(video_id) + k,
+        "t_sec": t,
+        "scene_idx": 0,
+        "dhash": (1 << 64) - 1 - k,
+        "blur_var": 12.5,
+        "frame_path": f"frames/{video_id}/{k:06d}.jpg",
+        "caption": "café",
+    }
+
+
+def _fill(store) -> None:
+    store.add_video({"video_id": "b", "video_path": "b.mp4", "info": {"fps": 24.0}})
+    store.add_video({"video_id": "a", "video_path": "a.mp4", "info": {"fps": 30.0}})
+    store.add_frames([_frame("b", k, 3.0 - k) for k in range(3)])
+    for k in range(4):
+        store.add_frame(_frame("a", k, 0.5 * k))
+    store.add_candidate({"video_id": "a", "frame_idx": 1, "status": "accepted"})
+    store.add_candidate({"video_id": "a", "frame_idx": 0, "status": "blurry"})
+    store.add_candidate({"video_id": "a", "frame_idx": 1, "status": "duplicate"})
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("batch_size", [1, 256])
+def test_round_trip(backend, batch_size, tmp_path):
+    store = open_store(tmp_path, backend=backend, batch_size=batch_size)
+    _fill(store)
+    # Buffered records are visible before any explicit flush
+    assert [r["frame_idx"] for r in store.frames(video_id="b")] == [2, 1, 0]
+    store.close()
+
+    store = open_store(tmp_path, backend=backend)
+    frames = store.frames()
+    assert [(r["video_id"], r["frame_idx"]) for r in frames] == [
+        ("a", 0), ("a", 1), ("a", 2), ("a", 3), ("b", 2), ("b", 1), ("b", 0)
+    ]
+    assert frames[0] == _frame("a", 0, 0.0)
+    assert [r["frame_idx"] for r in store.frames(start_sec=1.0, end_sec=2.0)] == [2, 3, 2, 1]
+    assert [r["frame_idx"] for r in store.frames("a", start_sec=1.0)] == [2, 3]
+
+    uid = _frame("b", 1, 2.0)["frame_uid"]
+    assert store.get_frame(uid) == _frame("b", 1, 2.0)
+    assert store.get_frame(7) is None
+    assert set(store.get_frames([uid, 7, _frame("a", 3, 1.5)["frame_uid"]])) == {
+        uid, _frame("a", 3, 1.5)["frame_uid"]
+    }
+
+    assert {v["video_id"]: v["info"]["fps"] for v in store.videos()} == {"a": 30.0, "b": 24.0}
+    assert [(c["frame_idx"], c["status"]) for c in store.candidates("a")] == [
+        (0, "blurry"), (1, "duplicate")
+    ]
+    assert store.candidates("b") == []
+    store.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_rewritten_video_and_deleted_frames(backend, tmp_path):
+    store = open_store(tmp_path, backend=backend)
+    _fill(store)
+    store.add_video({"video_id": "a", "video_path": "a.mp4", "info": {"fps": 60.0}})
+    drop = [_frame("a", k, 0.5 * k)["frame_uid"] for k in (1, 3)]
+    # Only frames of the named video are removed
+    store.delete_frames("b", drop)
+    assert len(store.frames("a")) == 4
+    store.delete_frames("a", drop)
+
+    assert [r["frame_idx"] for r in store.frames("a")] == [0, 2]
+    assert len(store.frames("b")) == 3
+    assert len(store.videos()) == 2
+    assert next(v for v in store.videos() if v["video_id"] == "a")["info"]["fps"] == 60.0
+    store.close()
+
+
+def test_jsonl_skips_a_torn_final_line(tmp_path):
+    store = open_store(tmp_path)
+    _fill(store)
+    store.close()
+    with (tmp_path / "frames.jsonl").open("a", encoding="utf-8") as f:
+        f.write('{"video_id": "a", "frame_')
+
+    store = open_store(tmp_path)
+    assert len(store.frames()) == 7
+    store.add_frame(_frame("a", 4, 2.0))
+    assert [r["frame_idx"] for r in store.frames("a")] == [0, 1, 2, 3, 4]
+    store.close()
+
+
+def test_import_jsonl_into_sqlite(tmp_path):
+    src = open_store(tmp_path / "jsonl")
+    _fill(src)
+    src.close()
+    assert isinstance(src, JsonlStore)
+
+    dest = open_store(tmp_path / "sqlite", backend="sqlite")
+    assert isinstance(dest, SqliteStore)
+    counts = import_jsonl(dest, src.videos_path, src.frames_path, src.candidates_path)
+    assert counts == (2, 7)
+    # Importing again replaces records instead of duplicating them
+    import_jsonl(dest, src.videos_path, src.frames_path, src.candidates_path)
+
+    src = open_store(tmp_path / "jsonl")
+    assert dest.frames() == src.frames()
+    assert sorted(dest.videos(), key=str) == sorted(src.videos(), key=str)
+    assert dest.candidates("a") == src.candidates("a")
+    dest.close()
+    src.close()
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ConfigError):
+        open_store(tmp_path, backend="parquet")
+
+
+def test_incomplete_backend_cannot_be_created():
+    class WriteOnly(MetadataStore):
+        def _write(self, videos, frames, candidates):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        WriteOnly()
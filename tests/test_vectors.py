@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from frameko.errors import ConfigError
+from frameko.vectors import LocalVectorIndex, _kmeans, _Segment
+
+
+def _blobs(n: int, dim: int = 16, centers: int = 20, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    mu = rng.normal(size=(centers, dim)).astype(np.float32) * 4.0
+    x = mu[rng.integers(0, centers, size=n)] + rng.normal(size=(n, dim)).astype(np.float32)
+    return mu, x.astype(np.float32)
+
+
+def _brute(ids: np.ndarray, vecs: np.ndarray, q: np.ndarray, k: int):
+    scores = q @ vecs.T
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return ids[top], np.take_along_axis(scores, top, axis=1)
+
+
+def _index(tmp_path, **kw) -> LocalVectorIndex:
+    return LocalVectorIndex(tmp_path / "vectors", segment_rows=50, block_rows=16, **kw)
+
+
+def test_exact_search_matches_brute_force_across_segments(tmp_path):
+    _, x = _blobs(300)
+    ids = np.arange(300, dtype=np.uint64) + (1 << 63)
+    index = _index(tmp_path)
+    index.upsert(ids[:200], x[:200])
+    index.upsert(ids[200:], x[200:])
+    # Replace some vectors and remove others: their old rows become tombstones
+    x[10:20] = -x[10:20]
+    index.upsert(ids[10:20], x[10:20])
+    index.remove(ids[40:60])
+    live = np.ones(300, dtype=bool)
+    live[40:60] = False
+    assert len(index) == 280 and len(index._segments) == 7
+
+    q = _blobs(5, seed=1)[1]
+    want_ids, want = _brute(ids[live], x[live], q, 10)
+    got_ids, got = index.search(q, k=10)
+    assert np.array_equal(got_ids, want_ids)
+    assert np.allclose(got, want, rtol=1e-5)
+    found, vecs = index.get([int(ids[12]), int(ids[45]), 7])
+    assert found.tolist() == [int(ids[12])] and np.array_equal(vecs[0], x[12])
+    index.close()
+
+    reopened = _index(tmp_path)
+    assert len(reopened) == 280
+    assert np.array_equal(reopened.search(q, k=10)[0], want_ids)
+    assert reopened.contains([int(ids[45]), int(ids[46]) + 1000, int(ids[0])]).tolist() == [
+        False, False, True
+    ]
+
+
+def test_ivf_recall_and_full_probe(tmp_path):
+    _, x = _blobs(2000)
+    ids = np.arange(2000, dtype=np.uint64)
+    index = _index(tmp_path)
+    index.upsert(ids, x)
+    index.build_ivf(nlist=20, nprobe=4)
+    assert index.nlist == 20
+
+    q = x[::50] + np.random.default_rng(2).normal(size=(40, 16)).astype(np.float32) * 0.1
+    exact_ids, exact = index.search(q, k=10, exact=True)
+    ivf_ids, _ = index.search(q, k=10)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(exact_ids, ivf_ids)])
+    assert recall >= 0.9
+    # Probing every cluster is exhaustive
+    all_ids, all_scores = index.search(q, k=10, nprobe=20)
+    assert np.array_equal(all_ids, exact_ids) and np.allclose(all_scores, exact)
+
+    # Rows added after training join the trained lists; removed rows never come back
+    index.upsert([5000], q[:1] * 10)
+    index.remove(exact_ids[1, :5])
+    ids_after, _ = index.search(q, k=10, nprobe=20)
+    assert ids_after[0, 0] == 5000
+    assert not set(exact_ids[1, :5].tolist()) & set(ids_after.ravel().tolist())
+    index.close()
+
+    reopened = _index(tmp_path)
+    assert reopened.nlist == 20 and reopened.nprobe == 4
+    assert np.array_equal(reopened.search(q, k=10, nprobe=20)[0], ids_after)
+    reopened.drop_ivf()
+    assert reopened.nlist == 0
+    assert np.array_equal(reopened.search(q, k=10)[0], ids_after)
+
+
+def test_ivf_pads_when_probed_clusters_are_short(tmp_path):
+    _, x = _blobs(100, centers=4)
+    index = _index(tmp_path)
+    index.upsert(np.arange(100), x)
+    index.build_ivf(nlist=50, nprobe=1)
+    ids, scores = index.search(x[:1], k=60)
+    assert ids.shape == scores.shape == (1, 60)
+    assert np.isneginf(scores[0, -1])
+    finite = np.isfinite(scores[0])
+    assert np.all(np.diff(scores[0][finite]) <= 0)
+
+
+def test_kmeans_finds_separated_clusters():
+    mu, x = _blobs(1000, centers=5, seed=3)
+    centroids = _kmeans(x, 5, iters=25, rng=np.random.default_rng(0))
+    assert centroids.shape == (5, 16) and centroids.dtype == np.float32
+    dist = np.linalg.norm(mu[:, None, :] - centroids[None, :, :], axis=2)
+    # Every true center has a centroid nearby (a few init seeds may share a blob)
+    assert (dist.min(axis=1) < 1.5).sum() >= 4
+
+    # Duplicate points leave clusters empty; those are re-seeded, never NaN
+    dup = np.repeat(x[:2], 10, axis=0)
+    assert np.isfinite(_kmeans(dup, 6, iters=3, rng=np.random.default_rng(0))).all()
+
+
+def test_torn_append_and_unretired_rows_are_repaired(tmp_path):
+    index = _index(tmp_path)
+    _, x = _blobs(30)
+    index.upsert(np.arange(30), x)
+    index.close()
+
+    seg = _Segment(tmp_path / "vectors", 0, 16, np.dtype(np.float32))
+    # A crash after appending id 3 again but before its old row was retired ...
+    seg.append(np.array([3], dtype=np.uint64), -x[3:4], None)
+    # ... and a torn append: vector bytes without an id or live flag
+    with open(seg.vec_path, "ab") as f:
+        f.write(b"\0" * 40)
+
+    reopened = _index(tmp_path)
+    assert len(reopened) == 30
+    assert reopened._segments[0].rows == 31
+    found, vecs = reopened.get([3])
+    assert np.array_equal(vecs[0], -x[3])
+    assert reopened.search(-x[3:4], k=1)[0].tolist() == [[3]]
+
+
+def test_dtype_and_dimension_checks(tmp_path):
+    with pytest.raises(ConfigError):
+        LocalVectorIndex(tmp_path / "a", dtype="int8")
+    index = LocalVectorIndex(tmp_path / "b", dtype="float16")
+    index.upsert([1, 2], np.eye(2, 4, dtype=np.float32))
+    assert index.search(np.eye(1, 4), k=5)[0].tolist() == [[1, 2]]
+    with pytest.raises(ValueError):
+        index.upsert([3], np.zeros((1, 3)))
+    with pytest.raises(ValueError):
+        index.search(np.zeros(3))
+    # The dtype is fixed by the first open
+    assert LocalVectorIndex(tmp_path / "b", dtype="float32").dtype == np.float16